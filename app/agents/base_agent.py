@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from app.orchestrator.deadline import remaining_time
 
 
 class BaseAgent(ABC):
@@ -11,11 +13,18 @@ class BaseAgent(ABC):
         self.llm = llm_service
         self.selector = model_selector
 
-    def _get_model(self, task_type: str, input_length: int) -> str:
+    @staticmethod
+    def _remaining_time() -> Optional[float]:
+        """Bu stage'in kalan süre bütçesi (saniye); deadline yoksa None."""
+        return remaining_time()
+
+    def _get_model(self, task_type: str, input_length: int, prefer_fast: bool = False) -> str:
         return self.selector.select_model(
             task_type=task_type,
             input_length=input_length,
             reasoning_depth=self.reasoning_depth,
+            time_budget_s=self._remaining_time(),
+            prefer_fast=prefer_fast,
         )
 
     @abstractmethod
@@ -1,17 +1,131 @@
 from __future__ import annotations
 
+import asyncio
 import codecs
 import json
+import logging
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from app.agents.base_agent import BaseAgent
+from app.config import settings
 from app.models.schemas import FinalAnswer
 
+_CODE_RULES = {
+    "websocket": (
+        "code_example MUST include: WebSocket route (@app.websocket), "
+        "websocket.accept(), receive_text(), send_text(), WebSocketDisconnect handler."
+    ),
+    "dependency_injection": (
+        "code_example MUST include: a dependency function, Depends() in a route parameter, "
+        "and at least one route that uses the dependency."
+    ),
+    "authentication": (
+        "code_example MUST include: token/JWT validation, a protected route, "
+        "HTTPException with 401 status for unauthorized access."
+    ),
+    "rest_api": (
+        "code_example MUST include: FastAPI(), at least one HTTP route "
+        "(@app.get or @app.post), proper return value or Pydantic model."
+    ),
+    "middleware": (
+        "code_example MUST include: @app.middleware decorator or "
+        "app.add_middleware(), request/response handling."
+    ),
+    "database": (
+        "code_example MUST include: database session setup, "
+        "a model definition, and a route that queries the database."
+    ),
+}
+
+_FALLBACK_CODE = {
+    "websocket": """from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+app = FastAPI()
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        while True:
+            msg = await websocket.receive_text()
+            await websocket.send_text(f"echo: {msg}")
+    except WebSocketDisconnect:
+        pass
+
+# Run: uvicorn main:app --reload
+""",
+    "rest_api": """from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+app = FastAPI()
+
+class Item(BaseModel):
+    name: str
+    price: float
+
+items: dict[int, dict] = {}
+
+@app.get("/items/{item_id}")
+def get_item(item_id: int):
+    if item_id not in items:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return items[item_id]
+
+@app.post("/items/{item_id}")
+def create_item(item_id: int, item: Item):
+    items[item_id] = item.model_dump()
+    return items[item_id]
+
+# Run: uvicorn main:app --reload
+""",
+    "authentication": """from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+
+app = FastAPI()
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+def verify_token(token: str) -> str:
+    if token != "secret-token":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return "user@example.com"
+
+@app.get("/protected")
+def protected_route(token: str = Depends(oauth2_scheme)):
+    user = verify_token(token)
+    return {"user": user, "message": "Access granted"}
+
+# Run: uvicorn main:app --reload
+""",
+}
+
+_CODE_BLOCK_RE = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+logger = logging.getLogger(__name__)
+
 
 class CodeExplainerAgent(BaseAgent):
     reasoning_depth = "deep"
 
+    def __init__(
+        self,
+        llm_service: Any,
+        model_selector: Any,
+        blocking_detector: Any = None,
+        mode: Optional[str] = None,
+        line_explainer: Any = None,
+        context_packer: Any = None,
+    ):
+        super().__init__(llm_service, model_selector)
+        self.blocking_detector = blocking_detector
+        # Varsa line_by_line AST kurallarından üretilir; LLM sadece kalan satırlar için çağrılır
+        self.line_explainer = line_explainer
+        # Varsa doc/web bağlamı ilk 3'er parça yerine token bütçesine göre seçilir
+        self.context_packer = context_packer
+        # "single": tek büyük JSON üretimi | "fanout": bölüm bazlı eşzamanlı üretim
+        self.mode = (mode or settings.EXPLAIN_MODE).lower()
+
     # -------------------------
     # JSON extraction utilities
     # -------------------------
@@ -65,9 +179,9 @@ class CodeExplainerAgent(BaseAgent):
     # -------------------------
     # Context formatting
     # -------------------------
-    def _format_doc_snippets(self, snippets: list) -> str:
+    def _format_doc_snippets(self, snippets: list, limit: Optional[int] = 3) -> str:
         lines = []
-        for s in (snippets or [])[:3]:
+        for s in (snippets or [])[:limit]:
             if isinstance(s, dict):
                 source = s.get("source", "docs")
                 text = s.get("text", "")
@@ -78,9 +192,9 @@ class CodeExplainerAgent(BaseAgent):
                 lines.append(f"[Source: {source}]\n{str(text).strip()}")
         return "\n\n---\n\n".join(lines) if lines else "No documentation found."
 
-    def _format_web_results(self, results: list) -> str:
+    def _format_web_results(self, results: list, limit: Optional[int] = 3) -> str:
         lines = []
-        for i, r in enumerate((results or [])[:3], 1):
+        for i, r in enumerate((results or [])[:limit], 1):
             if isinstance(r, dict):
                 title = r.get("title", "No title")
                 url = r.get("url", "")
@@ -92,6 +206,16 @@ class CodeExplainerAgent(BaseAgent):
             lines.append(f"[{i}] {title}\nURL: {url}\n{str(snippet).strip()}")
         return "\n\n".join(lines) if lines else "No web results found."
 
+    @staticmethod
+    def _format_validation(validation: Dict[str, Any]) -> str:
+        # valid None: analiz yapılmadı; model bunu sözdizimi hatası sanmasın
+        if validation.get("valid") is None and validation.get("skipped_reason"):
+            return (
+                f"Not analyzed ({validation['skipped_reason']}); validity unknown. "
+                "Do not assume the code has syntax errors."
+            )
+        return str(validation)
+
     # -------------------------
     # Escape decoding (fixes \\u003c etc)
     # -------------------------
@@ -128,42 +252,68 @@ class CodeExplainerAgent(BaseAgent):
         topic = (analysis.get("topic") or "unknown").strip()
         framework = (analysis.get("framework") or "unknown").strip()
 
-        model = self._get_model("explain", len(query) + 500)
-
-        doc_context = self._format_doc_snippets(documentation.get("snippets", []) or [])
-        web_context = self._format_web_results(examples.get("results", []) or [])
-
-        _CODE_RULES = {
-            "websocket": (
-                "code_example MUST include: WebSocket route (@app.websocket), "
-                "websocket.accept(), receive_text(), send_text(), WebSocketDisconnect handler."
-            ),
-            "dependency_injection": (
-                "code_example MUST include: a dependency function, Depends() in a route parameter, "
-                "and at least one route that uses the dependency."
-            ),
-            "authentication": (
-                "code_example MUST include: token/JWT validation, a protected route, "
-                "HTTPException with 401 status for unauthorized access."
-            ),
-            "rest_api": (
-                "code_example MUST include: FastAPI(), at least one HTTP route "
-                "(@app.get or @app.post), proper return value or Pydantic model."
-            ),
-            "middleware": (
-                "code_example MUST include: @app.middleware decorator or "
-                "app.add_middleware(), request/response handling."
-            ),
-            "database": (
-                "code_example MUST include: database session setup, "
-                "a model definition, and a route that queries the database."
-            ),
-        }
+        # Planner lokal dokümanlara yeterince güvendiyse küçük model yeter
+        model = self._get_model("explain", len(query) + 500, prefer_fast=bool(payload.get("prefer_fast_model")))
+
+        snippets = documentation.get("snippets", []) or []
+        results = examples.get("results", []) or []
+        packing = None
+        if self.context_packer is not None:
+            packing = self.context_packer.pack(
+                [s if isinstance(s, dict) else s.model_dump() for s in snippets],
+                [r if isinstance(r, dict) else r.model_dump() for r in results],
+            )
+            doc_context = self._format_doc_snippets(packing["snippets"], limit=None)
+            web_context = self._format_web_results(packing["results"], limit=None)
+        else:
+            doc_context = self._format_doc_snippets(snippets)
+            web_context = self._format_web_results(results)
+
         code_rule = _CODE_RULES.get(
             topic,
             f"code_example MUST be a complete, self-contained {framework} example that directly answers the user question."
         )
 
+        if self.mode == "fanout":
+            data = await self._generate_fanout(
+                query, doc_context, web_context, validation, complexity, framework, topic, code_rule, model
+            )
+        else:
+            data = await self._generate_single(
+                query, doc_context, web_context, validation, complexity, framework, topic, code_rule, model
+            )
+        final = self._normalize(data, framework, topic, examples)
+        if packing is not None:
+            final["meta"]["context"] = packing["report"]
+        if self.line_explainer is not None:
+            final = await self._explain_lines(final, framework, model)
+        return final
+
+    # -------------------------
+    # Tek çağrı: tüm cevap tek JSON (+ repair turları)
+    # -------------------------
+    async def _generate_single(
+        self,
+        query: str,
+        doc_context: str,
+        web_context: str,
+        validation: Dict[str, Any],
+        complexity: Dict[str, Any],
+        framework: str,
+        topic: str,
+        code_rule: str,
+        model: str,
+    ) -> Dict[str, Any]:
+        # line_by_line AST'den geliyorsa modelden istenmez (daha kısa çıktı)
+        lbl_schema, lbl_rule = "", ""
+        if self.line_explainer is None:
+            lbl_schema = """
+  "line_by_line": [
+    "Line 1 does X because Y",
+    "Line 2 does X because Y"
+  ],"""
+            lbl_rule = "\n- line_by_line MUST have at least 6 items."
+
         prompt = f"""
 You are a senior software engineer and teacher.
 
@@ -177,7 +327,7 @@ Context (web results):
 {web_context}
 
 Code validation result:
-{validation}
+{self._format_validation(validation)}
 
 Complexity info:
 {complexity}
@@ -185,11 +335,7 @@ Complexity info:
 Return ONLY valid JSON in this schema:
 {{
   "explanation": "2-3 sentence explanation of the concept",
-  "code_example": "complete runnable python code here",
-  "line_by_line": [
-    "Line 1 does X because Y",
-    "Line 2 does X because Y"
-  ],
+  "code_example": "complete runnable python code here",{lbl_schema}
   "best_practices": [
     "Always do X to avoid Y",
     "Use Z when W"
@@ -202,19 +348,22 @@ Rules:
 - No extra text, only JSON.
 - NEVER copy the example values above — replace them with real content.
 - code_example MUST be a complete, runnable {framework} example relevant to: {topic}.
-- {code_rule}
-- line_by_line MUST have at least 6 items.
+- {code_rule}{lbl_rule}
 - best_practices MUST have at least 4 items.
 - sources MUST contain real URLs from the web results context above.
 """.strip()
 
-        raw = self.llm.generate(prompt, model=model, temperature=0.1)
+        raw = await self.llm.agenerate(prompt, model=model, temperature=0.1)
         print("RAW MODEL OUTPUT:\n", raw)
 
         # ---------- PARSE + REPAIR (never crash) ----------
         try:
             data = self._safe_extract_json(raw)
         except Exception:
+            # Deadline yakınsa repair turlarını atla; normalize aşaması fallback'leri doldurur
+            budget = self._remaining_time()
+            skip_repair = budget is not None and budget < settings.MIN_REPAIR_BUDGET_S
+
             repair_prompt = f"""Convert the content below into VALID JSON that EXACTLY matches this schema.
 Return ONLY JSON. No markdown. No extra keys.
 IMPORTANT:
@@ -235,7 +384,9 @@ Schema:
 Content:
 {raw}
 """
-            raw2 = self.llm.generate(repair_prompt, model=model, temperature=0.0)
+            raw2 = "" if skip_repair else await self.llm.agenerate(
+                repair_prompt, model=model, temperature=0.0
+            )
             print("REPAIRED MODEL OUTPUT:\n", raw2)
 
             try:
@@ -256,7 +407,9 @@ topic="{topic}"
 Content:
 {raw2}
 """
-                raw3 = self.llm.generate(hard_repair, model=model, temperature=0.0)
+                raw3 = "" if skip_repair else await self.llm.agenerate(
+                    hard_repair, model=model, temperature=0.0
+                )
                 print("HARD REPAIRED OUTPUT:\n", raw3)
 
                 try:
@@ -270,7 +423,202 @@ Content:
                         "sources": [],
                         "meta": {"framework": framework, "topic": topic},
                     }
+        return data
+
+    # -------------------------
+    # Fan-out: bölüm başına küçük, eşzamanlı üretimler
+    # -------------------------
+    async def _section(self, prompt: str, model: str, max_tokens: int) -> str:
+        try:
+            return await self.llm.agenerate(prompt, model=model, temperature=0.1, max_tokens=max_tokens)
+        except RuntimeError:
+            # Tek bölüm düşerse normalize aşaması fallback'ini koyar
+            logger.warning("Explain section generation failed", exc_info=True)
+            return ""
+
+    @staticmethod
+    def _extract_code(text: str) -> str:
+        m = _CODE_BLOCK_RE.search(text or "")
+        return (m.group(1) if m else text or "").strip()
+
+    def _extract_list(self, text: str) -> list:
+        text = (text or "").strip()
+        start, end = text.find("["), text.rfind("]")
+        if start != -1 and end > start:
+            try:
+                items = json.loads(text[start : end + 1])
+                if isinstance(items, list):
+                    return [str(i).strip() for i in items if str(i).strip()]
+            except Exception:
+                pass
+        # JSON değilse madde işaretli satırlar
+        return [_BULLET_RE.sub("", ln).strip() for ln in text.splitlines() if _BULLET_RE.match(ln)]
+
+    async def _generate_fanout(
+        self,
+        query: str,
+        doc_context: str,
+        web_context: str,
+        validation: Dict[str, Any],
+        complexity: Dict[str, Any],
+        framework: str,
+        topic: str,
+        code_rule: str,
+        model: str,
+    ) -> Dict[str, Any]:
+        """
+        1) code + explanation eşzamanlı (birbirinden bağımsız)
+        2) line_by_line + best_practices, üretilen koddan eşzamanlı
+           (line_explainer varsa line_by_line sonradan AST'den üretilir)
+        sources LLM'e sorulmaz; normalize web sonuçlarından garanti eder.
+        """
+        context = f"""User question:
+{query}
 
+Context (official documentation snippets):
+{doc_context}
+
+Context (web results):
+{web_context}
+
+Code validation result:
+{self._format_validation(validation)}
+
+Complexity info:
+{complexity}"""
+
+        code_prompt = f"""You are a senior {framework} engineer.
+
+{context}
+
+Write ONE complete, runnable {framework} example relevant to: {topic}.
+- {code_rule}
+Return ONLY the code in a single ```python block. No explanation."""
+
+        explanation_prompt = f"""You are a senior software engineer and teacher.
+
+{context}
+
+Explain the concept in 2-3 sentences of plain text. No code, no markdown, no lists."""
+
+        code_raw, explanation = await asyncio.gather(
+            self._section(code_prompt, model, settings.EXPLAIN_CODE_MAX_TOKENS),
+            self._section(explanation_prompt, model, settings.EXPLAIN_TEXT_MAX_TOKENS),
+        )
+        code = self._extract_code(code_raw)
+        logger.debug("Fanout code section:\n%s", code)
+
+        # Kod üretilemediyse normalize'ın fallback kodu üzerinden devam et
+        code_for_lists = code or _FALLBACK_CODE.get(topic, "")
+
+        bp_prompt = f"""List best practices for the following {framework} code about {topic}.
+
+```python
+{code_for_lists}
+```
+
+Return ONLY a JSON array of at least 4 short, actionable strings."""
+
+        sections = [self._section(bp_prompt, model, settings.EXPLAIN_LIST_MAX_TOKENS)]
+        if self.line_explainer is None:
+            sections.append(self._section(
+                self._line_by_line_prompt(code_for_lists, framework), model, settings.EXPLAIN_LIST_MAX_TOKENS
+            ))
+        bp_raw, *rest = await asyncio.gather(*sections)
+        lbl_raw = rest[0] if rest else ""
+
+        return {
+            "explanation": explanation.strip(),
+            "code_example": code,
+            "line_by_line": self._extract_list(lbl_raw),
+            "best_practices": self._extract_list(bp_raw),
+            "sources": [],
+            "meta": {"framework": framework, "topic": topic, "explain_mode": "fanout"},
+        }
+
+    @staticmethod
+    def _line_by_line_prompt(code: str, framework: str) -> str:
+        return f"""Explain the following {framework} code line by line.
+
+```python
+{code}
+```
+
+Return ONLY a JSON array of at least 6 strings, each "what the line does and why"."""
+
+    # -------------------------
+    # Satır satır açıklama: AST kuralları + kalan satırlar için küçük bir LLM çağrısı
+    # -------------------------
+    async def _explain_lines(self, answer: Dict[str, Any], framework: str, model: str) -> Dict[str, Any]:
+        code = answer.get("code_example") or ""
+        report = self.line_explainer.explain(code)
+        if not report["lines"]:
+            # Parse edilemeyen kod: AST kuralı yok, satır açıklaması LLM'den istenir;
+            # bütçe yoksa / boş dönerse normalize'ın genel listesi kalır ve meta'da işaretlenir
+            lbl: List[str] = []
+            budget = self._remaining_time()
+            if code.strip() and (budget is None or budget >= settings.MIN_REPAIR_BUDGET_S):
+                raw = await self._section(
+                    self._line_by_line_prompt(code, framework), model, settings.EXPLAIN_LIST_MAX_TOKENS
+                )
+                lbl = self._extract_list(raw)
+            if lbl:
+                answer["line_by_line"] = lbl
+            else:
+                logger.info("code_example does not parse; using generic line_by_line fallback")
+            answer["meta"]["line_explainer"] = {"fallback": "llm" if lbl else "generic"}
+            return answer
+
+        uncovered = report["uncovered"][: settings.LINE_EXPLAIN_MAX_LLM_LINES]
+        budget = self._remaining_time()
+        extra: Dict[int, str] = {}
+        if uncovered and (budget is None or budget >= settings.MIN_REPAIR_BUDGET_S):
+            extra = await self._explain_uncovered(code, uncovered, framework, model)
+
+        answer["line_by_line"] = self.line_explainer.as_line_by_line(report, extra)
+        answer["meta"]["line_explainer"] = {
+            "rule_lines": report["covered"],
+            "llm_lines": len(extra),
+            "unexplained_lines": len(report["uncovered"]) - len(extra),
+        }
+        return answer
+
+    async def _explain_uncovered(self, code: str, lines: list, framework: str, model: str) -> Dict[int, str]:
+        numbered = "\n".join(f"{i:>3}: {ln}" for i, ln in enumerate(code.splitlines(), 1))
+        prompt = f"""Here is a {framework} program with line numbers:
+
+{numbered}
+
+Explain ONLY these lines: {", ".join(str(n) for n in lines)}.
+Return ONLY a JSON object mapping each line number to one short sentence, e.g. {{"12": "Computes X so that Y"}}."""
+
+        raw = await self._section(prompt, model, settings.EXPLAIN_LIST_MAX_TOKENS)
+        try:
+            data = self._safe_extract_json(raw)
+        except Exception:
+            return {}
+
+        wanted = set(lines)
+        out: Dict[int, str] = {}
+        for key, text in data.items():
+            try:
+                n = int(str(key).strip().lower().removeprefix("line").strip())
+            except ValueError:
+                continue
+            if n in wanted and isinstance(text, str) and text.strip():
+                out[n] = text.strip()
+        return out
+
+    # -------------------------
+    # Normalize: iki modun çıktısı da buradan geçer
+    # -------------------------
+    def _normalize(
+        self,
+        data: Dict[str, Any],
+        framework: str,
+        topic: str,
+        examples: Dict[str, Any],
+    ) -> Dict[str, Any]:
         # ---------- NORMALIZE ----------
         if not isinstance(data, dict):
             data = {}
@@ -379,66 +727,6 @@ Content:
         data["line_by_line"] = lbl
 
         # ---- code_example (dict normalize + double-escape decode + fallback) ----
-        _FALLBACK_CODE = {
-            "websocket": """from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-
-app = FastAPI()
-
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        while True:
-            msg = await websocket.receive_text()
-            await websocket.send_text(f"echo: {msg}")
-    except WebSocketDisconnect:
-        pass
-
-# Run: uvicorn main:app --reload
-""",
-            "rest_api": """from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-
-app = FastAPI()
-
-class Item(BaseModel):
-    name: str
-    price: float
-
-items: dict[int, dict] = {}
-
-@app.get("/items/{item_id}")
-def get_item(item_id: int):
-    if item_id not in items:
-        raise HTTPException(status_code=404, detail="Item not found")
-    return items[item_id]
-
-@app.post("/items/{item_id}")
-def create_item(item_id: int, item: Item):
-    items[item_id] = item.model_dump()
-    return items[item_id]
-
-# Run: uvicorn main:app --reload
-""",
-            "authentication": """from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-
-app = FastAPI()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-def verify_token(token: str) -> str:
-    if token != "secret-token":
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return "user@example.com"
-
-@app.get("/protected")
-def protected_route(token: str = Depends(oauth2_scheme)):
-    user = verify_token(token)
-    return {"user": user, "message": "Access granted"}
-
-# Run: uvicorn main:app --reload
-""",
-        }
 
         ce = data.get("code_example")
         if isinstance(ce, dict):
@@ -454,6 +742,13 @@ def protected_route(token: str = Depends(oauth2_scheme)):
         ce = ce.replace("\r\n", "\n").strip()
         data["code_example"] = ce
 
+        # ---- async safety: bloklayan çağrılar / eksik await ----
+        async_report = None
+        if self.blocking_detector is not None:
+            async_report = self.blocking_detector.detect(ce)
+            warnings = self.blocking_detector.as_best_practices(async_report)
+            data["best_practices"] = warnings + [b for b in data["best_practices"] if b not in warnings]
+
         # ---- sources: guarantee urls ----
         _FALLBACK_DOCS = {
             "fastapi": "https://fastapi.tiangolo.com",
@@ -494,6 +789,8 @@ def protected_route(token: str = Depends(oauth2_scheme)):
             data["meta"] = {}
         data["meta"].setdefault("framework", framework)
         data["meta"].setdefault("topic", topic)
+        if async_report is not None:
+            data["meta"]["async_safety"] = async_report
 
         final = FinalAnswer.model_validate(data)
         print("FINAL JSON:", final.model_dump())
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List, Optional
 
 from app.agents.base_agent import BaseAgent
+from app.config import settings
 from app.models.schemas import DocumentationResult, DocSnippet
 
 
@@ -13,22 +15,24 @@ class DocumentationReaderAgent(BaseAgent):
         super().__init__(llm_service, model_selector)
         self.rag = rag_service
 
-    async def execute(self, input_data: Any) -> Dict[str, Any]:
-        """
-        input_data: QueryAnalysis dict
-        output: DocumentationResult dict
-        """
-        analysis = input_data if isinstance(input_data, dict) else {}
+    @staticmethod
+    def build_query(analysis: Dict[str, Any]) -> str:
         keywords = analysis.get("keywords", [])
         topic = analysis.get("topic", "unknown")
-
         # RAG query: keywords + topic
-        rag_query = " ".join(keywords) if keywords else str(topic)
+        return " ".join(keywords) if keywords else str(topic)
 
-        # rag_service.search(query) -> list of records/snippets
-        # Senin rag_service'in dönüş formatı farklıysa burayı uyarlayacağız.
-        hits = self.rag.search(rag_query)
+    @staticmethod
+    def build_lexical_query(analysis: Dict[str, Any], query: str) -> str:
+        """
+        BM25 sorgusu: ham kullanıcı sorusu + keyword'ler. LLM keyword'leri birebir
+        API isimlerini (WebSocketDisconnect, model_validate, ...) düşürebiliyor.
+        """
+        keywords = analysis.get("keywords", [])
+        return " ".join([query, *keywords]).strip()
 
+    @staticmethod
+    def _to_result(rag_query: str, hits: List[Dict[str, Any]]) -> Dict[str, Any]:
         snippets = []
         for h in hits or []:
             # beklenen: {"source": "...", "text": "...", "score": ...} gibi
@@ -46,10 +50,73 @@ class DocumentationReaderAgent(BaseAgent):
                 rel = 0.0
 
             if text.strip():
-                snippets.append(DocSnippet(source=source, text=text, relevance=rel))
+                snippets.append(DocSnippet(source=source, text=text, relevance=rel, rank=h.get("rank")))
 
+        hybrid = any("rrf" in h for h in hits or [])
         result = DocumentationResult(
             snippets=snippets,
-            meta={"query": rag_query, "top_k": len(snippets), "source": "faiss"},
+            meta={
+                "query": rag_query,
+                "top_k": len(snippets),
+                "source": "hybrid" if hybrid else "faiss",
+                "reranked": any("rerank_score" in h for h in hits or []),
+                "partition": (hits[0].get("partition") if hits else None) or "global",
+            },
         )
         return result.model_dump()
+
+    @staticmethod
+    def build_variants(analysis: Dict[str, Any], query: str) -> List[str]:
+        """
+        Keyword sorgusuna ek ifadeler: ham kullanıcı sorusu ve topic + subtopic.
+        Hepsi RAGService'te aynı encode + aynı FAISS aramasına girer.
+        """
+        if not settings.RAG_MULTI_QUERY_ENABLED:
+            return []
+        variants = [query]
+        topic = str(analysis.get("topic") or "unknown")
+        if topic != "unknown":
+            variants.append(" ".join(p for p in (topic.replace("_", " "), analysis.get("subtopic")) if p))
+        return [v for v in variants if v and v.strip()]
+
+    @staticmethod
+    def partition(analysis: Dict[str, Any]) -> Optional[str]:
+        """Topic biliniyorsa RAG o topic'in alt index'inde arar (yoksa global)."""
+        topic = analysis.get("topic")
+        return topic if topic and topic != "unknown" else None
+
+    async def search(
+        self,
+        rag_query: str,
+        lexical_query: Optional[str] = None,
+        partition: Optional[str] = None,
+        variants: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        rag_query (+ variants) için FAISS (+ BM25) araması (event loop'u bloklamadan).
+        output: DocumentationResult dict
+        """
+        # rag_service.search(query) -> list of records/snippets
+        hits = await asyncio.to_thread(self.rag.search, rag_query, None, lexical_query, partition, variants)
+        return self._to_result(rag_query, hits)
+
+    async def search_many(
+        self,
+        rag_queries: List[str],
+        lexical_queries: Optional[List[str]] = None,
+        partitions: Optional[List[Optional[str]]] = None,
+        variants: Optional[List[List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Batch: tüm query'ler (ve ifadeleri) tek encode + hedef index başına tek FAISS search ile aranır."""
+        hits = await asyncio.to_thread(
+            self.rag.search_many, rag_queries, None, lexical_queries, partitions, variants
+        )
+        return [self._to_result(q, h) for q, h in zip(rag_queries, hits)]
+
+    async def execute(self, input_data: Any) -> Dict[str, Any]:
+        """
+        input_data: QueryAnalysis dict
+        output: DocumentationResult dict
+        """
+        analysis = input_data if isinstance(input_data, dict) else {}
+        return await self.search(self.build_query(analysis), partition=self.partition(analysis))
@@ -1,51 +1,50 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict, List, Optional
 
 from app.agents.base_agent import BaseAgent
 from app.models.schemas import ExampleFinderResult, WebResult
-
-# Kod içerdiğine dair güvenilir sinyaller
-_CODE_SIGNALS = [
-    "def ", "class ", "import ", "from ", "async def ",
-    "@app.", "=>", "const ", "return ", "await ",
-    "function ", "export ", "module.", "require(",
-]
+from app.tools.code_ranker import CodeCandidateRanker
 
 
 class ExampleFinderAgent(BaseAgent):
     reasoning_depth = "shallow"
 
-    def __init__(self, llm_service: Any, model_selector: Any, web_search_tool: Any):
+    def __init__(
+        self,
+        llm_service: Any,
+        model_selector: Any,
+        web_search_tool: Any,
+        ranker: Optional[CodeCandidateRanker] = None,
+    ):
         super().__init__(llm_service, model_selector)
         self.web = web_search_tool
+        self.ranker = ranker or CodeCandidateRanker()
 
-    def _extract_best_code_snippet(self, results_raw: List[Dict]) -> str:
+    def _extract_best_code_snippet(self, results_raw: List[Dict], keywords: Optional[List[str]] = None) -> str:
         """
-        Web sonuçlarının snippet alanlarını tarar.
-        Kod sinyali içeren ilk snippet'i döndürür.
-        Hiçbirinde kod yoksa en uzun snippet'i döndürür (LLM için en iyi bağlam).
+        Web sonuçlarının snippet alanlarını CodeCandidateRanker ile puanlar ve
+        en yüksek puanlı kod adayını döndürür. Kod adayı yoksa en uzun snippet'e
+        düşer (LLM için en iyi bağlam). Analize giden kod bu alan değildir: tools
+        stage'i adayları aynı ranker'la (parse cache'li) kendisi seçer, düz yazı
+        validator/radon'a gitmez.
         """
-        best_with_code: Optional[str] = None
-        longest: str = ""
-
-        for r in results_raw:
-            snippet = (r.get("body") or r.get("snippet") or "").strip()
-            if not snippet:
-                continue
-
-            # Kod sinyali var mı?
-            if best_with_code is None and any(sig in snippet for sig in _CODE_SIGNALS):
-                best_with_code = snippet
-
-            # En uzun snippet'i de takip et (fallback için)
-            if len(snippet) > len(longest):
-                longest = snippet
-
-        return best_with_code or longest
-
-    async def execute(self, input_data: Any) -> Dict[str, Any]:
-        analysis = input_data if isinstance(input_data, dict) else {}
+        candidates = [
+            {
+                "text": r.get("body") or r.get("snippet") or "",
+                "source": "web",
+                "origin": r.get("href") or r.get("url") or "",
+            }
+            for r in results_raw
+        ]
+        best = self.ranker.best(candidates, keywords)
+        if best is not None:
+            return best.code
+        return max((c["text"].strip() for c in candidates), key=len, default="")
+
+    @staticmethod
+    def build_query(analysis: Dict[str, Any]) -> str:
         keywords = analysis.get("keywords", [])
         framework = analysis.get("framework", "unknown")
         topic = analysis.get("topic", "unknown")
@@ -55,8 +54,9 @@ class ExampleFinderAgent(BaseAgent):
         if subtopic:
             q += f" {subtopic}"
         q += " github example"
+        return q
 
-        results_raw = self.web.search(q, max_results=5)  # list[dict]
+    def from_results(self, q: str, results_raw: List[Dict], keywords: Optional[List[str]] = None) -> Dict[str, Any]:
         results: List[WebResult] = []
 
         for r in results_raw or []:
@@ -69,7 +69,7 @@ class ExampleFinderAgent(BaseAgent):
             )
 
         # BUG 1 FIX: snippet'lardan en iyi kod adayını çıkar
-        code_example = self._extract_best_code_snippet(results_raw or [])
+        code_example = self._extract_best_code_snippet(results_raw or [], keywords)
 
         # Bonus: CodeExplainer'ın sources'a yazabilmesi için URL'leri meta'ya ekle
         source_urls = [r.url for r in results if r.url]
@@ -83,4 +83,32 @@ class ExampleFinderAgent(BaseAgent):
                 "urls": source_urls,   # Bug 5 fix için hazır
             },
         )
-        return out.model_dump()
\ No newline at end of file
+        return out.model_dump()
+
+    async def execute(self, input_data: Any) -> Dict[str, Any]:
+        analysis = input_data if isinstance(input_data, dict) else {}
+        q = self.build_query(analysis)
+        results_raw = await asyncio.to_thread(self.web.search, q, max_results=5)  # list[dict]
+        # Snippet'lerin ast.parse ile puanlanması event loop'u bloklamasın
+        return await asyncio.to_thread(self.from_results, q, results_raw, analysis.get("keywords", []))
+
+    async def execute_many(self, analyses: List[Dict[str, Any]], concurrency: int = 4) -> List[Dict[str, Any]]:
+        """
+        Batch: aynı arama cümlesine düşen (aynı keyword seti) analizler tek web
+        aramasını paylaşır; farklı aramalar en fazla `concurrency` paralel çalışır.
+        """
+        queries = [self.build_query(a) for a in analyses]
+        sem = asyncio.Semaphore(concurrency)
+
+        async def fetch(q: str) -> List[Dict]:
+            async with sem:
+                try:
+                    return await asyncio.to_thread(self.web.search, q, max_results=5) or []
+                except Exception:
+                    return []
+
+        unique = list(dict.fromkeys(queries))
+        fetched = dict(zip(unique, await asyncio.gather(*(fetch(q) for q in unique))))
+        return await asyncio.to_thread(
+            lambda: [self.from_results(q, fetched[q], a.get("keywords", [])) for q, a in zip(queries, analyses)]
+        )
@@ -158,6 +158,32 @@ class QueryAnalyzerAgent(BaseAgent):
             "keywords": keywords,
         }
 
+    def heuristic_analysis(self, query: str) -> Dict[str, Any]:
+        """LLM'siz analiz: parse hatasında ve zaman bütçesi dolduğunda kullanılır."""
+        # fallback heuristics (stable & predictable)
+        fw2, tp2 = self._infer_framework_topic(query)
+
+        low = (query or "").lower()
+        _KEYWORD_POOL = [
+            "fastapi", "django", "flask", "react",
+            "websocket", "authentication", "jwt", "token",
+            "dependency", "injection", "rest", "api",
+            "middleware", "database", "sql", "orm",
+            "endpoint", "route", "http", "async",
+        ]
+        keywords = [k for k in _KEYWORD_POOL if k in low]
+        if not keywords:
+            keywords = [fw2] if fw2 != "unknown" else ["python"]
+
+        qa = QueryAnalysis(
+            language="python",
+            framework=fw2,
+            topic=tp2,
+            subtopic=None,
+            keywords=keywords[:8],
+        )
+        return qa.model_dump()
+
     async def execute(self, input_data: Any) -> Dict[str, Any]:
         query = input_data if isinstance(input_data, str) else str(input_data)
         query = query.strip()
@@ -201,7 +227,7 @@ STRICT RULES:
 Query: {query}
 """.strip()
 
-        raw = self.llm.generate(prompt, model=model, temperature=0.0)
+        raw = await self.llm.agenerate(prompt, model=model, temperature=0.0)
 
         try:
             data = self._safe_extract_json(raw)
@@ -218,26 +244,4 @@ Query: {query}
             return validated.model_dump()
 
         except Exception:
-            # fallback heuristics (stable & predictable)
-            fw2, tp2 = self._infer_framework_topic(query)
-
-            low = query.lower()
-            _KEYWORD_POOL = [
-                "fastapi", "django", "flask", "react",
-                "websocket", "authentication", "jwt", "token",
-                "dependency", "injection", "rest", "api",
-                "middleware", "database", "sql", "orm",
-                "endpoint", "route", "http", "async",
-            ]
-            keywords = [k for k in _KEYWORD_POOL if k in low]
-            if not keywords:
-                keywords = [fw2] if fw2 != "unknown" else ["python"]
-
-            qa = QueryAnalysis(
-                language="python",
-                framework=fw2,
-                topic=tp2,
-                subtopic=None,
-                keywords=keywords[:8],
-            )
-            return qa.model_dump()
+            return self.heuristic_analysis(query)
@@ -1,17 +1,173 @@
-from fastapi import APIRouter, Request, HTTPException
-from app.models.schemas import QueryRequest, QueryResponse
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Optional
+
+from fastapi import APIRouter, Header, Query, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.config import settings
+from app.models.schemas import BatchQueryItem, BatchQueryRequest, JobStatus, QueryRequest, QueryResponse
+from app.services.admission import AdmissionRejected
+from app.services.jobs import JobStoreFull
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# nginx'in "client closed request" kodu; client zaten gittiği için kimse okumaz
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def run_until_disconnect(request: Request, work: Awaitable[Any]) -> Any:
+    """
+    `work`ü ayrı task'ta çalıştırır ve client bağlantısını izler.
+    Client koparsa task iptal edilir; iptal graph'taki stage'lere ve açık
+    LLM stream'lerine yayılır.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_S)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
 @router.post("/ask", response_model=QueryResponse)
-async def ask(request: Request, payload: QueryRequest):
+async def ask(
+    request: Request,
+    payload: QueryRequest,
+    x_deadline_ms: Optional[int] = Header(None, gt=0),
+):
+    orchestrator = request.app.state.orchestrator
+    admission = request.app.state.admission
+    deadline_ms = payload.deadline_ms or x_deadline_ms
+
+    async def admitted():
+        # Kuyrukta beklerken client koparsa kuyruktan da çıkar
+        async with admission.slot():
+            return await orchestrator.process_query(
+                payload.query,
+                deadline_s=deadline_ms / 1000 if deadline_ms else None,
+            )
+
     try:
-        orchestrator = request.app.state.orchestrator
-        result = await orchestrator.process_query(payload.query)
+        result = await run_until_disconnect(request, admitted())
         return QueryResponse(**result)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+    except ClientDisconnected:
+        logger.info("Client bağlantıyı kapattı; /ask pipeline'ı iptal edildi")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/ask/batch")
+async def ask_batch(request: Request, payload: BatchQueryRequest):
+    """
+    Sonuçları tamamlandıkça NDJSON olarak akıtır (satır başına BatchQueryItem).
+    Batch tek admission slot'u tutar; içeride BATCH_LLM_CONCURRENCY ile sınırlıdır.
+    """
+    queries = payload.queries
+    if len(queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.BATCH_MAX_QUERIES} queries per batch"
+        )
+
+    orchestrator = request.app.state.orchestrator
+    admission = request.app.state.admission
+
+    async def lines() -> AsyncIterator[Optional[str]]:
+        # Slot generator içinde tutulur: batch hata verse de client kopsa da async with bırakır
+        async with admission.slot():
+            yield None  # slot alındı; StreamingResponse'a gitmeden önce tüketilir
+            # Client koparsa Starlette bu generator'ı iptal eder; process_batch kalan işleri iptal eder
+            async for item in orchestrator.process_batch(
+                queries,
+                deadline_s=payload.deadline_ms / 1000 if payload.deadline_ms else None,
+            ):
+                for index in item["indices"]:
+                    line = BatchQueryItem(
+                        index=index,
+                        query=item["query"],
+                        result=item.get("result"),
+                        error=item.get("error"),
+                    )
+                    yield line.model_dump_json() + "\n"
+
+    body = lines()
+    try:
+        await body.__anext__()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        # Body hiç iterate edilmezse (response başlamadan kopma) slot yine bırakılır; aclose idempotent
+        background=BackgroundTask(body.aclose),
+    )
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    request: Request,
+    response: Response,
+    payload: QueryRequest,
+    x_deadline_ms: Optional[int] = Header(None, gt=0),
+):
+    deadline_ms = payload.deadline_ms or x_deadline_ms
+    try:
+        job = request.app.state.jobs.submit(
+            payload.query,
+            deadline_s=deadline_ms / 1000 if deadline_ms else None,
+        )
+    except JobStoreFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    response.headers["Location"] = f"{request.url.path}/{job.id}"
+    return JobStatus(**job.to_dict())
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(
+    request: Request,
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Long-poll seconds (capped by JOB_MAX_WAIT_S)"),
+    since: Optional[int] = Query(None, ge=0, description="Return as soon as version > since"),
+):
+    runner = request.app.state.jobs
+    job = runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if wait:
+        job = await runner.wait(job, wait, since=since)
+    return JobStatus(**job.to_dict())
+
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+@router.get("/admission")
+async def admission_gauges(request: Request):
+    return request.app.state.admission.gauges()
+
+@router.get("/memo")
+async def memo_stats(request: Request):
+    memo = request.app.state.orchestrator.memo
+    return {"enabled": memo is not None, "stages": memo.stats() if memo is not None else {}}
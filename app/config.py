@@ -21,22 +21,142 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2:1b"  # default
     OLLAMA_TIMEOUT: int = 120
+    # Ollama context penceresi (options.num_ctx); aşan prompt sessizce kırpılır
+    OLLAMA_NUM_CTX: int = 4096
+
+    # İstek deadline'ı (QueryRequest.deadline_ms / X-Deadline-Ms ile override edilir)
+    REQUEST_DEADLINE_S: float = 300.0
+    MAX_REQUEST_DEADLINE_S: float = 900.0
+    # Kalan süre bunun altındaysa POWERFUL yerine FAST model
+    FAST_MODEL_BUDGET_S: float = 20.0
+    # Kalan süre bunun altındaysa CodeExplainer JSON repair turlarını atlar
+    MIN_REPAIR_BUDGET_S: float = 10.0
+    # Client bağlantısı bu aralıkla kontrol edilir; kopmuşsa pipeline iptal edilir
+    DISCONNECT_POLL_S: float = 0.5
+
+    # /ask admission control (worker başına)
+    ASK_MAX_CONCURRENCY: int = 2
+    ASK_MAX_QUEUE: int = 8
+    ASK_MAX_QUEUE_WAIT_S: float = 30.0
+
+    # /ask/batch
+    BATCH_MAX_QUERIES: int = 500
+    BATCH_LLM_CONCURRENCY: int = 2
+    BATCH_WEB_CONCURRENCY: int = 4
+
+    # Asenkron job API
+    JOB_CONCURRENCY: int = 2
+    JOB_MAX_JOBS: int = 1000
+    JOB_TTL_S: float = 3600.0
+    # Long-poll üst sınırı; proxy'lerin 60 s idle kesmesinin altında kalmalı
+    JOB_MAX_WAIT_S: float = 50.0
+
+    # Stage memo (ara ürün cache'i)
+    STAGE_MEMO_ENABLED: bool = True
+    STAGE_MEMO_SIZE: int = 1024
+    MEMO_TTL_ANALYSIS_S: float = 86400.0
+    MEMO_TTL_DOCS_S: float = 86400.0
+    MEMO_TTL_EXAMPLES_S: float = 21600.0
+    MEMO_TTL_TOOLS_S: float = 3600.0
+
+    # Adaptif planner (top doc chunk cosine eşikleri)
+    PLANNER_ENABLED: bool = True
+    PLANNER_SKIP_WEB_COSINE: float = 0.75
+    PLANNER_FAST_EXPLAIN_COSINE: float = 0.9
 
     # LLM params
     TEMPERATURE: float = 0.7
     MAX_TOKENS: int = 512
 
+    # CodeExplainer modu: "single" (tek JSON) | "fanout" (bölüm bazlı eşzamanlı üretim)
+    EXPLAIN_MODE: str = "single"
+    # fanout bölümlerinin num_predict değerleri
+    EXPLAIN_CODE_MAX_TOKENS: int = 384
+    EXPLAIN_TEXT_MAX_TOKENS: int = 128
+    EXPLAIN_LIST_MAX_TOKENS: int = 256
+    # AST kurallarının açıklayamadığı satırlardan en fazla kaçı LLM'e sorulur
+    LINE_EXPLAIN_MAX_LLM_LINES: int = 12
+
+    # CodeExplainer context packing (doc + web parçaları için token bütçesi)
+    CONTEXT_TOKEN_BUDGET: int = 1800
+    # Boşsa tahmin kullanılır; HF hub id ya da tokenizer.json yolu (`tokenizers` gerekir)
+    PROMPT_TOKENIZER: str = ""
+    CONTEXT_TOKEN_ESTIMATE_SCALE: float = 1.0
+    # Shingle'larının bu oranı zaten paketlenmiş metinde olan parça duplicate sayılır
+    CONTEXT_DEDUPE_THRESHOLD: float = 0.6
+
     # Embedding / RAG
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     VECTOR_DB_PATH: str = "./data/vectordb"
     DOCUMENTS_PATH: str = "./data/documents"
     CHUNK_SIZE: int = 600
     CHUNK_OVERLAP: int = 80
+    # .md dosyaları başlık bölümleri + bütün kod blokları olarak chunk'lanır (False: düz splitter)
+    MARKDOWN_CHUNKER_ENABLED: bool = True
+    # Bundan uzun kod blokları top-level statement sınırlarından bölünür
+    MARKDOWN_MAX_CODE_CHUNK: int = 1500
+    # Chunk'lar embedding modelinin tokenizer'ıyla ölçülür; max_seq_length'i aşanlar bölünür
+    EMBEDDING_TOKEN_AWARE_CHUNKS: bool = True
+    # 0: modelin max_seq_length'i - özel token'lar (MiniLM: 254)
+    EMBEDDING_MAX_TOKENS: int = 0
+    # Akışlı index build: embed + FAISS'e ekleme + chunks.jsonl append birimi (checkpoint aralığı)
+    INGEST_BATCH_SIZE: int = 64
+    # Build ilerleme / throughput log'u en fazla bu aralıkla
+    INGEST_LOG_INTERVAL_S: float = 5.0
     TOP_K_RESULTS: int = 3
+    # Aynı dosyanın ardışık hit'leri overlap'siz tek span'a birleştirilir
+    RAG_MERGE_ADJACENT: bool = True
+    # Small-to-big: her hit'e ±N komşu chunk eklenir (0: kapalı)
+    RAG_EXPAND_NEIGHBORS: int = 0
+    # Topic alt index'leri (QueryAnalysis.topic ile yönlendirme); küçük topic'ler global'de kalır
+    RAG_PARTITIONS_ENABLED: bool = True
+    RAG_PARTITION_MIN_CHUNKS: int = 8
+    # DocumentationReader birden çok ifadeyle arar (keyword'ler, ham soru, topic + subtopic);
+    # ifadelerin hit'leri "max" (en iyi benzerlik) ya da "rrf" ile birleştirilir
+    RAG_MULTI_QUERY_ENABLED: bool = True
+    RAG_MULTI_QUERY_FUSION: str = "max"
+
+    # Hybrid retrieval: BM25 (FAISS index'inin yanında lexical.npz) + vektör, RRF füzyonu
+    HYBRID_SEARCH_ENABLED: bool = True
+    # Her iki aramanın füzyona giren aday sayısı
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+    # Vektör ağırlığı 1.0; sorguda birebir API ismi (CamelCase, snake_case, a.b, f()) varsa ikincisi
+    HYBRID_LEXICAL_WEIGHT: float = 0.5
+    HYBRID_IDENTIFIER_LEXICAL_WEIGHT: float = 1.5
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+
+    # Opsiyonel cross-encoder rerank (sentence-transformers CrossEncoder, CPU)
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 30
+    RERANK_BATCH_SIZE: int = 16
+    # Puanlama bunu aşarsa ANN / füzyon sırası kullanılır
+    RERANK_MAX_LATENCY_S: float = 0.5
+    RERANK_CACHE_SIZE: int = 4096
 
     # (Opsiyonel) RAG filtre eşiği
     MIN_RELEVANCE_SCORE: float = 0.0
 
+    # Kod analizi (tek geçiş AST + radon)
+    CODE_ANALYSIS_CACHE_SIZE: int = 256
+
+    # CPU-bound araçlar için process pool
+    TOOL_POOL_WORKERS: int = 2
+    TOOL_TIMEOUT_S: float = 5.0
+    TOOL_CPU_SECONDS: float = 3.0
+    TOOL_MAX_INPUT_CHARS: int = 20_000
+    TOOL_MAX_INPUT_LINES: int = 800
+
+    # (Opsiyonel) code_example smoke test — izole, warm worker havuzu
+    SANDBOX_ENABLED: bool = False
+    SANDBOX_POOL_SIZE: int = 2
+    SANDBOX_TIMEOUT_S: float = 5.0
+    SANDBOX_CPU_SECONDS: float = 2.0
+    SANDBOX_MEMORY_MB: int = 256
+    SANDBOX_MAX_CODE_CHARS: int = 20_000
+
     class Config:
         env_file = ".env"
         case_sensitive = True
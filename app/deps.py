@@ -1,9 +1,15 @@
 from app.services.llm_service import LLMService
 from app.services.model_selector import ModelSelector
 from app.services.rag_service import RAGService
+from app.services.tool_executor import ToolExecutor
+from app.services.sandbox import SandboxPool
+from app.services.context_packer import ContextPacker
+from app.services.reranker import CrossEncoderReranker
 from app.tools.web_search import WebSearchTool
-from app.tools.code_validator import CodeValidatorTool
-from app.tools.complexity_analyzer import ComplexityAnalyzerTool
+from app.tools.code_analyzer import CodeAnalyzerTool
+from app.tools.code_ranker import CodeCandidateRanker
+from app.tools.blocking_call_detector import BlockingCallDetectorTool
+from app.tools.line_explainer import LineExplainerTool
 
 from app.agents.query_analyzer import QueryAnalyzerAgent
 from app.agents.documentation_reader import DocumentationReaderAgent
@@ -15,23 +21,39 @@ from sentence_transformers import SentenceTransformer
 from app.config import settings
 
 def build_orchestrator() -> AgentOrchestrator:
+    # Sandbox forkserver'ı (fastapi preload'lu) diğer process havuzlarından önce başlamalı
+    sandbox = None
+    if settings.SANDBOX_ENABLED:
+        sandbox = SandboxPool()
+        sandbox.start()
+
     llm = LLMService()
     selector = ModelSelector()
 
     embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
-    rag = RAGService(embedding_model=embedding_model)
+    reranker = CrossEncoderReranker() if settings.RERANK_ENABLED else None
+    rag = RAGService(embedding_model=embedding_model, reranker=reranker)
     web = WebSearchTool()
+    ranker = CodeCandidateRanker()
 
     agents = {
         "query_analyzer": QueryAnalyzerAgent(llm, selector),
         "doc_reader": DocumentationReaderAgent(llm, selector, rag),
-        "example_finder": ExampleFinderAgent(llm, selector, web),
-        "code_explainer": CodeExplainerAgent(llm, selector),
+        "example_finder": ExampleFinderAgent(llm, selector, web, ranker),
+        "code_explainer": CodeExplainerAgent(
+            llm,
+            selector,
+            BlockingCallDetectorTool(),
+            line_explainer=LineExplainerTool(),
+            context_packer=ContextPacker(),
+        ),
     }
 
     tools = {
-        "code_validator": CodeValidatorTool(),
-        "complexity_analyzer": ComplexityAnalyzerTool(),
+        "code_ranker": ranker,
+        "code_analyzer": CodeAnalyzerTool(executor=ToolExecutor()),
     }
+    if sandbox is not None:
+        tools["sandbox"] = sandbox
 
     return AgentOrchestrator(agents, tools)
@@ -2,6 +2,8 @@ from fastapi import FastAPI
 from app.config import settings
 from app.api.routes import router
 from app.deps import build_orchestrator
+from app.services.admission import AdmissionController
+from app.services.jobs import JobRunner
 
 
 def create_app() -> FastAPI:
@@ -10,6 +12,17 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def startup():
         app.state.orchestrator = build_orchestrator()
+        app.state.admission = AdmissionController()
+        app.state.jobs = JobRunner(app.state.orchestrator)
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        jobs = getattr(app.state, "jobs", None)
+        if jobs is not None:
+            await jobs.shutdown()
+        orchestrator = getattr(app.state, "orchestrator", None)
+        if orchestrator is not None:
+            await orchestrator.aclose()
 
     app.include_router(router, prefix=settings.API_PREFIX)
     return app
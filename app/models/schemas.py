@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Literal
+from typing import Annotated, Any, Dict, List, Optional, Literal
 from pydantic import BaseModel, Field
 
 
@@ -9,6 +9,9 @@ from pydantic import BaseModel, Field
 # -----------------------
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1, description="User technical question")
+    deadline_ms: Optional[int] = Field(
+        None, gt=0, description="End-to-end deadline; overrides the X-Deadline-Ms header"
+    )
 
 
 class QueryResponse(BaseModel):
@@ -20,6 +23,34 @@ class QueryResponse(BaseModel):
     meta: Optional[Dict[str, Any]] = None
 
 
+class BatchQueryRequest(BaseModel):
+    queries: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, description="Questions; identical ones are answered once"
+    )
+    deadline_ms: Optional[int] = Field(None, gt=0, description="Per-query deadline")
+
+
+class BatchQueryItem(BaseModel):
+    """One NDJSON line of /ask/batch (emitted in completion order)."""
+    index: int
+    query: str
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+
+class JobStatus(BaseModel):
+    id: str
+    query: str
+    status: Literal["queued", "running", "done", "failed", "cancelled"]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    version: int = Field(0, description="Increments on every update; pass as `since` to long-poll progress")
+    stages: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Per-stage trace so far")
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+
 # -----------------------
 # Agent Contracts
 # -----------------------
@@ -35,6 +66,7 @@ class DocSnippet(BaseModel):
     source: str
     text: str
     relevance: float = Field(..., ge=0.0, le=1.0)
+    rank: Optional[int] = None  # retrieval sırası (RRF / rerank sonrası, 1 = en iyi)
 
 
 class DocumentationResult(BaseModel):
@@ -58,14 +90,39 @@ class ExampleFinderResult(BaseModel):
 # Tool Contracts
 # -----------------------
 class CodeValidationResult(BaseModel):
-    valid: bool
+    valid: Optional[bool] = None   # None: analiz yapılmadı (bkz. skipped_reason)
     error: Optional[str] = None
+    skipped_reason: Optional[str] = None
+    line: Optional[int] = None
+    offset: Optional[int] = None
 
 
 class ComplexityResult(BaseModel):
-    cyclomatic_complexity: Optional[int] = None
-    rank: Optional[str] = None
+    cyclomatic_complexity: Optional[int] = None  # en karmaşık bloğun CC değeri
+    rank: Optional[str] = None                   # radon A-F
     loc: Optional[int] = None
+    avg_cc: Optional[float] = None
+    imports: List[str] = Field(default_factory=list)
+    async_functions: int = 0
+    sync_functions: int = 0
+    complexity_unavailable: bool = False         # radon kurulu değil
+
+
+class RouteCheck(BaseModel):
+    path: str
+    method: str
+    status: Optional[int] = None
+    latency_ms: float
+    error: Optional[str] = None
+
+
+class SmokeTestResult(BaseModel):
+    ok: bool
+    stage: str  # import | startup | routes | timeout | crashed | skipped | worker
+    error: Optional[str] = None
+    startup_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    routes: List[RouteCheck] = Field(default_factory=list)
 
 
 # -----------------------
@@ -0,0 +1,87 @@
+# app/orchestrator/deadline.py
+"""
+İstek seviyesinde deadline ve stage bütçeleri.
+
+Orchestrator her stage'i kendi bütçesiyle çalıştırır; stage içindeki kod
+(agent'lar, LLMService) kalan süreyi `remaining_time()` ile okuyup daha küçük
+model seçebilir veya opsiyonel işi atlayabilir. Değer ContextVar'da tutulduğu
+için eşzamanlı stage'ler / istekler birbirini etkilemez.
+"""
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Kritik yol üzerindeki fazlar ve ağırlıkları (sıralı)
+_PHASE_WEIGHTS = [
+    ("analysis", 0.15),
+    ("retrieval", 0.15),
+    ("tools", 0.05),
+    ("explain", 0.60),
+    ("post", 0.05),
+]
+
+_STAGE_PHASE: Dict[str, str] = {
+    "query_analyzer": "analysis",
+    "doc_speculative": "retrieval",
+    "doc_reader": "retrieval",
+    "example_finder": "retrieval",
+    "tools": "tools",
+    "code_explainer": "explain",
+    "smoke_test": "post",
+}
+
+
+class Deadline:
+    def __init__(self, seconds: float, expires_at: Optional[float] = None):
+        self.total_s = float(seconds)
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + self.total_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def budget_for(self, stage: str) -> float:
+        """
+        Kalan süreyi stage'in fazı ve sonraki fazlar arasında ağırlıklarıyla böler.
+        Erken biten fazların artan süresi otomatik olarak sonraki fazlara kalır.
+        """
+        remaining = self.remaining()
+        phase = _STAGE_PHASE.get(stage)
+        names = [p for p, _ in _PHASE_WEIGHTS]
+        if phase not in names:
+            return remaining
+
+        idx = names.index(phase)
+        weights = [w for _, w in _PHASE_WEIGHTS[idx:]]
+        return remaining * weights[0] / sum(weights)
+
+    def child(self, seconds: float) -> "Deadline":
+        """Bu deadline'ı aşmayan alt bütçe (stage deadline'ı)."""
+        seconds = min(seconds, self.remaining())
+        return Deadline(seconds, expires_at=time.monotonic() + seconds)
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def set_current_deadline(deadline: Optional[Deadline]):
+    return _current.set(deadline)
+
+
+def reset_current_deadline(token) -> None:
+    _current.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Aktif stage'in kalan süresi (saniye); deadline yoksa None."""
+    d = _current.get()
+    return d.remaining() if d is not None else None
@@ -0,0 +1,270 @@
+# app/orchestrator/graph.py
+"""
+Deklaratif stage grafiği.
+
+Her stage bağımlılıklarını (`after`) bildirir; bağımlılıkları biten her stage
+hemen ve eşzamanlı başlar. Böylece uçtan uca süre kritik yola yaklaşır.
+
+Spekülatif stage'ler bağımlılıksız başlar; sonucu tüketen stage onu tutabilir
+ya da `ctx.discard(name)` ile atabilir. Kimsenin beklemediği, hâlâ çalışan
+spekülatif stage'ler graf bitince iptal edilir.
+
+ctx.deadline verilirse her stage kendi bütçesiyle (Deadline.budget_for) çalışır;
+bütçe dolunca ya da stage hata verince (deadline'dan bağımsız) stage'in fallback'i
+sonucu üretir (kısmi cevap); spekülatif stage'in sonucu None olur.
+
+ctx.on_event verilirse stage başlangıç/bitişleri (name, trace kaydı) ile bildirilir
+(ör. job API ilerleme takibi).
+
+StageGraph'a bir StageMemo verilirse `memo` policy'si olan stage'ler önce cache'e
+bakar; her stage'in trace'ine "memo": "hit" | "miss" yazılır.
+
+ctx.results içinde önceden verilmiş sonuçlar (ör. batch'te paylaşılan retrieval)
+"provided" sayılır; o stage'ler çalıştırılmaz.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.orchestrator.deadline import Deadline, reset_current_deadline, set_current_deadline
+from app.orchestrator.memo import MemoPolicy, StageMemo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[["StageContext"], Awaitable[Any]]
+    after: Tuple[str, ...] = ()
+    speculative: bool = False
+    # Bütçe dolduğunda kullanılacak sonuç; yoksa timeout hatası yükselir
+    fallback: Optional[Callable[["StageContext"], Any]] = None
+    # Cache key / TTL / versiyon; graph'a memo verilmişse kullanılır
+    memo: Optional[MemoPolicy] = None
+
+
+StageEventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class StageContext:
+    def __init__(
+        self,
+        inputs: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        on_event: Optional[StageEventCallback] = None,
+    ):
+        self.inputs: Dict[str, Any] = dict(inputs or {})
+        self.deadline = deadline
+        self.on_event = on_event
+        self.results: Dict[str, Any] = {}
+        self.trace: Dict[str, Dict[str, Any]] = {}
+        self._discarded: Set[str] = set()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._t0 = time.perf_counter()
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results[name]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._t0) * 1000, 2)
+
+    def timed_out(self) -> List[str]:
+        return [n for n, t in self.trace.items() if t.get("timed_out")]
+
+    def emit(self, name: str) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(name, dict(self.trace[name]))
+        except Exception:
+            logger.warning("Stage event callback failed", exc_info=True)
+
+    def discard(self, name: str) -> None:
+        """Spekülatif sonucu at; hâlâ çalışıyorsa iptal et."""
+        self._discarded.add(name)
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            task.cancel()
+        if name in self.trace:
+            self.trace[name]["status"] = "discarded"
+
+
+class StageGraph:
+    def __init__(self, stages: List[Stage], memo: Optional[StageMemo] = None):
+        self.memo = memo
+        self.stages: Dict[str, Stage] = {}
+        for st in stages:
+            if st.name in self.stages:
+                raise ValueError(f"Duplicate stage: {st.name}")
+            self.stages[st.name] = st
+
+        for st in stages:
+            missing = [d for d in st.after if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {st.name} depends on unknown stages: {missing}")
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        state: Dict[str, int] = {}  # 1: ziyarette, 2: bitti
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle detected at stage: {name}")
+            state[name] = 1
+            for dep in self.stages[name].after:
+                visit(dep)
+            state[name] = 2
+
+        for name in self.stages:
+            visit(name)
+
+    def critical_path_ms(self, ctx: StageContext) -> float:
+        """Tamamlanan stage sürelerine göre en uzun bağımlılık zinciri."""
+        memo: Dict[str, float] = {}
+
+        def longest(name: str) -> float:
+            if name not in memo:
+                t = ctx.trace.get(name) or {}
+                own = t.get("duration_ms", 0.0) if t.get("status") == "done" else 0.0
+                memo[name] = own + max((longest(d) for d in self.stages[name].after), default=0.0)
+            return memo[name]
+
+        return round(max((longest(n) for n in self.stages), default=0.0), 2)
+
+    async def _run_stage(self, st: Stage, ctx: StageContext) -> Any:
+        key = None
+        if self.memo is not None and st.memo is not None:
+            key = st.memo.key(ctx)
+            if key is not None:
+                version = st.memo.version()
+                hit, value = self.memo.get(st.name, version, key)
+                ctx.trace[st.name]["memo"] = "hit" if hit else "miss"
+                if hit:
+                    return value
+
+        result = await self._execute(st, ctx)
+        # Fallback (timeout / hata) sonuçları cache'lenmez. Versiyon yeniden okunur:
+        # stage çalışırken değişmiş olabilir (ör. RAG index ilk kez yüklendi).
+        t = ctx.trace[st.name]
+        if key is not None and not t.get("timed_out") and "error" not in t:
+            self.memo.put(st.name, st.memo.version(), key, result, st.memo.ttl_s)
+        return result
+
+    async def _execute(self, st: Stage, ctx: StageContext) -> Any:
+        """
+        Deadline olsun olmasın aynı kurallar: stage timeout'a düşer ya da hata
+        verirse fallback'i varsa o kullanılır; spekülatif stage None döner
+        (tüketen stage kendi aramasını yapar); ikisi de yoksa hata yükselir.
+        """
+        t = ctx.trace[st.name]
+        token = None
+        budget = None
+        if ctx.deadline is not None:
+            budget = ctx.deadline.budget_for(st.name)
+            t["budget_ms"] = round(budget * 1000, 2)
+            # wait_for'un oluşturduğu task context'i kopyalar -> stage kendi bütçesini görür
+            token = set_current_deadline(ctx.deadline.child(budget))
+        try:
+            if budget is None:
+                return await st.run(ctx)
+            return await asyncio.wait_for(st.run(ctx), timeout=budget)
+        except asyncio.TimeoutError:
+            t["timed_out"] = True
+            if st.fallback is None and not st.speculative:
+                raise
+        except Exception as e:
+            t["error"] = f"{type(e).__name__}: {e}"
+            if st.fallback is None and not st.speculative:
+                raise
+            logger.warning("Stage %s failed; using %s", st.name,
+                           "fallback" if st.fallback is not None else "no speculative result", exc_info=True)
+        finally:
+            if token is not None:
+                reset_current_deadline(token)
+        return st.fallback(ctx) if st.fallback is not None else None
+
+    async def run(self, ctx: StageContext) -> StageContext:
+        started: Set[str] = set()
+        finished: Set[str] = set()
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready() -> None:
+            for name, st in self.stages.items():
+                if name in started or not all(d in finished for d in st.after):
+                    continue
+                started.add(name)
+                ctx.trace[name] = {"start_ms": ctx.elapsed_ms(), "status": "running"}
+                task = asyncio.create_task(self._run_stage(st, ctx), name=f"stage:{name}")
+                ctx._tasks[name] = task
+                running[task] = name
+                ctx.emit(name)
+
+        for name in self.stages:
+            if name in ctx.results:
+                started.add(name)
+                finished.add(name)
+                ctx.trace[name] = {"status": "provided", "duration_ms": 0.0}
+
+        try:
+            launch_ready()
+            while running:
+                # Sadece spekülatif stage'ler kaldıysa ve kimse beklemiyorsa bitir
+                waiting_on = {d for n, s in self.stages.items() if n not in started for d in s.after}
+                if all(self.stages[n].speculative and n not in waiting_on for n in running.values()):
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    t = ctx.trace[name]
+                    t["end_ms"] = ctx.elapsed_ms()
+                    t["duration_ms"] = round(t["end_ms"] - t["start_ms"], 2)
+
+                    if task.cancelled():
+                        t["status"] = "discarded" if name in ctx._discarded else "cancelled"
+                        ctx.results[name] = None
+                    else:
+                        exc = task.exception()
+                        if exc is not None:
+                            t["status"] = "failed"
+                            raise exc
+                        ctx.results[name] = task.result()
+                        if name in ctx._discarded:
+                            t["status"] = "discarded"
+                        else:
+                            t["status"] = "failed" if "error" in t else "done"
+                    finished.add(name)
+                    ctx.emit(name)
+
+                launch_ready()
+        finally:
+            for task, name in running.items():
+                task.cancel()
+                ctx.trace[name]["status"] = "discarded" if name in ctx._discarded else "cancelled"
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return ctx
+
+    def summary(self, ctx: StageContext) -> Dict[str, Any]:
+        out = {
+            "stages": ctx.trace,
+            "total_ms": ctx.elapsed_ms(),
+            "critical_path_ms": self.critical_path_ms(ctx),
+        }
+        if self.memo is not None:
+            out["memo"] = {
+                "hits": [n for n, t in ctx.trace.items() if t.get("memo") == "hit"],
+                "misses": [n for n, t in ctx.trace.items() if t.get("memo") == "miss"],
+            }
+        return out
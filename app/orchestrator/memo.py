@@ -0,0 +1,90 @@
+# app/orchestrator/memo.py
+"""
+Stage seviyesinde memoization.
+
+Final cevap farklı ifadeler yüzünden nadiren tekrar eder ama ara ürünler
+(QueryAnalysis, aynı rag_query'nin DocumentationResult'ı, aynı web araması)
+sık tekrar eder. Her stage bir MemoPolicy ile cache key'ini, TTL'ini ve
+versiyonunu (invalidation; ör. RAG index versiyonu) bildirir; StageGraph
+stage'i çalıştırmadan önce memo'ya bakar.
+
+Fallback'e düşmüş (timeout) sonuçlar cache'lenmez.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class MemoPolicy:
+    # None dönerse bu çalıştırma cache'e bakmaz / yazmaz
+    key: Callable[[Any], Optional[str]]
+    ttl_s: float
+    # Değişince o stage'in tüm eski kayıtları geçersiz olur
+    version: Callable[[], str] = lambda: ""
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def digest(*parts: Any) -> str:
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(repr(p).encode("utf-8", "surrogatepass"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class StageMemo:
+    """Stage sonuçları için sınırlı LRU + TTL cache; stage bazında hit/miss sayar."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, stage: str, what: str) -> None:
+        stats = self._stats.setdefault(stage, {"hits": 0, "misses": 0})
+        stats[what] += 1
+
+    def get(self, stage: str, version: str, key: str) -> Tuple[bool, Any]:
+        entry_key = (stage, version, key)
+        entry = self._entries.get(entry_key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[entry_key]
+            self._count(stage, "misses")
+            return False, None
+
+        self._entries.move_to_end(entry_key)
+        self._count(stage, "hits")
+        # Çağıran sonucu değiştirebilir; cache'teki kopya bozulmasın
+        return True, copy.deepcopy(entry[1])
+
+    def contains(self, stage: str, version: str, key: str) -> bool:
+        """Sayaçları etkilemeden geçerli kayıt var mı (planner için)."""
+        entry = self._entries.get((stage, version, key))
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, stage: str, version: str, key: str, value: Any, ttl_s: float) -> None:
+        entry_key = (stage, version, key)
+        self._entries[entry_key] = (time.monotonic() + ttl_s, copy.deepcopy(value))
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, stage: Optional[str] = None) -> None:
+        if stage is None:
+            self._entries.clear()
+            return
+        for k in [k for k in self._entries if k[0] == stage]:
+            del self._entries[k]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {stage: dict(v) for stage, v in self._stats.items()}
@@ -0,0 +1,121 @@
+# app/orchestrator/planner.py
+"""
+Adaptif pipeline planner.
+
+Lokal dokümanlar soruyu açıkça cevaplıyorsa (en iyi RAG chunk'ı yüksek cosine
+ve içinde çalışan kod var) web araması ve büyük model gereksiz maliyettir.
+Planner, query_analyzer + spekülatif RAG bittikten sonra:
+
+- retrieval güveni (top chunk cosine, kod içeriyor mu)
+- cache durumu (example_finder memo'da hazırsa atlamanın kazancı yok)
+- istek bütçesi (stage'in EWMA süresi bütçesine sığıyor mu)
+
+üzerinden opsiyonel stage'lere karar verir. Kararlar ve tahmini kazanılan süre
+(stage'lerin EWMA latency'lerinden) response meta'sına yazılır.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.tools.code_ranker import CodeCandidateRanker
+
+_EWMA_ALPHA = 0.2
+
+
+def relevance_to_cosine(relevance: float) -> float:
+    """
+    RAGService relevance'ı 1 / (1 + d), d = IndexFlatL2'nin kare L2 mesafesi.
+    Normalize embedding'lerde d = 2 - 2·cos  =>  cos = 1 - d / 2.
+    """
+    if relevance <= 0:
+        return -1.0
+    d = 1.0 / relevance - 1.0
+    return max(-1.0, min(1.0, 1.0 - d / 2.0))
+
+
+class PipelinePlanner:
+    def __init__(self, ranker: Optional[CodeCandidateRanker] = None):
+        self.ranker = ranker or CodeCandidateRanker()
+        self._latency_ms: Dict[str, float] = {}
+
+    # -------------------------
+    # Stage latency istatistikleri
+    # -------------------------
+    def observe(self, trace: Dict[str, Dict[str, Any]]) -> None:
+        """Tamamlanan bir pipeline'ın stage sürelerini EWMA'ya ekler (cache hit'ler hariç)."""
+        for name, t in trace.items():
+            if t.get("status") != "done" or t.get("memo") == "hit" or t.get("skipped"):
+                continue
+            key = f"{name}:{t['variant']}" if t.get("variant") else name
+            ms = t.get("duration_ms", 0.0)
+            prev = self._latency_ms.get(key)
+            self._latency_ms[key] = ms if prev is None else prev + _EWMA_ALPHA * (ms - prev)
+
+    def latency_ms(self, key: str) -> Optional[float]:
+        return self._latency_ms.get(key)
+
+    # -------------------------
+    # Karar
+    # -------------------------
+    def plan(
+        self,
+        analysis: Dict[str, Any],
+        docs: Dict[str, Any],
+        examples_cached: bool = False,
+        examples_provided: bool = False,
+        explain_budget_s: Optional[float] = None,
+        examples_budget_s: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        snippets: List[Dict[str, Any]] = docs.get("snippets") or []
+        top_cos = relevance_to_cosine(snippets[0]["relevance"]) if snippets else -1.0
+        doc_code = self.ranker.best(
+            self.ranker.candidates_from({"snippets": snippets[:1]}, {}),
+            analysis.get("keywords"),
+        )
+        # Fenced blok chunk'lamada bölünebilir; ölçüt: ranker'ın parse olan kod bulması
+        doc_has_code = doc_code is not None and doc_code.parses
+        confident = doc_has_code and top_cos >= settings.PLANNER_SKIP_WEB_COSINE
+
+        reasons: Dict[str, str] = {}
+        skip_examples = False
+        if not examples_provided and not examples_cached:
+            ex_ms = self.latency_ms("example_finder")
+            if confident:
+                skip_examples = True
+                reasons["example_finder"] = f"top doc chunk cosine {top_cos:.2f} with code example"
+            elif examples_budget_s is not None and ex_ms is not None and ex_ms / 1000 > examples_budget_s:
+                skip_examples = True
+                reasons["example_finder"] = f"expected {ex_ms:.0f} ms exceeds budget"
+
+        fast_explain = False
+        explain_ms = self.latency_ms("code_explainer")
+        if doc_has_code and top_cos >= settings.PLANNER_FAST_EXPLAIN_COSINE:
+            fast_explain = True
+            reasons["code_explainer"] = f"top doc chunk cosine {top_cos:.2f}; fast model is enough"
+        elif explain_budget_s is not None and explain_ms is not None and explain_ms / 1000 > explain_budget_s:
+            fast_explain = True
+            reasons["code_explainer"] = f"expected {explain_ms:.0f} ms exceeds budget"
+
+        return {
+            "top_cosine": round(top_cos, 4),
+            "doc_has_code": doc_has_code,
+            "examples_cached": examples_cached,
+            "skip_examples": skip_examples,
+            "fast_explain": fast_explain,
+            "reasons": reasons,
+        }
+
+    def estimate_saved_ms(self, plan: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Atlanan / küçültülen stage'ler için EWMA'ya göre tahmini kazanç (bilinmiyorsa None)."""
+        saved: Dict[str, Optional[float]] = {}
+        if plan.get("skip_examples"):
+            ms = self.latency_ms("example_finder")
+            saved["example_finder"] = round(ms, 1) if ms is not None else None
+        if plan.get("skip_tools"):
+            ms = self.latency_ms("tools")
+            saved["tools"] = round(ms, 1) if ms is not None else None
+        if plan.get("fast_explain"):
+            full, fast = self.latency_ms("code_explainer"), self.latency_ms("code_explainer:fast")
+            saved["code_explainer"] = round(full - fast, 1) if full is not None and fast is not None else None
+        return saved
@@ -1,78 +1,474 @@
 # app/orchestrator/workflow.py
 import asyncio
-from typing import Any, Dict
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from app.config import settings
 from app.models.schemas import (
     QueryAnalysis,
     DocumentationResult,
     ExampleFinderResult,
     CodeValidationResult,
     ComplexityResult,
+    SmokeTestResult,
     FinalAnswer,
 )
+from app.orchestrator.deadline import Deadline
+from app.orchestrator.graph import Stage, StageContext, StageEventCallback, StageGraph
+from app.orchestrator.memo import MemoPolicy, StageMemo, digest, normalize_text
+from app.orchestrator.planner import PipelinePlanner
+from app.services.lexical_index import rrf_fuse
+from app.tools.code_analyzer import fallback_result
+
+logger = logging.getLogger(__name__)
 
 
 class AgentOrchestrator:
+    """
+    Pipeline bir stage grafiği olarak tanımlanır:
+
+        query_analyzer ─┬─> doc_reader ───────────┬─> tools ─> code_explainer ─> smoke_test
+        doc_speculative ┴─> plan ─> example_finder ─┘
+
+    doc_speculative ham query ile RAG aramasını, QueryAnalyzer LLM'i beklerken başlatır;
+    doc_reader analiz gelince aramayı keyword'lerle rafine edip sonuçları birleştirir.
+
+    Her stage istek deadline'ından bir bütçe alır; bütçe dolunca stage'in
+    fallback'i devreye girer ve process_query timeout yerine en iyi kısmi
+    FinalAnswer'ı döndürür.
+
+    query_analyzer / doc_* / example_finder / tools sonuçları StageMemo ile
+    cache'lenir (stage başına key, TTL ve versiyon; doküman stage'leri RAG index
+    versiyonu değişince geçersiz olur).
+
+    plan stage'i (PipelinePlanner) retrieval güveni, cache durumu ve bütçeye göre
+    web aramasını atlayabilir, açıklamayı küçük modele verebilir; kod adayı yoksa
+    tools analizi atlanır. Kararlar meta["plan"]'a yazılır.
+    """
+
     def __init__(self, agents: Dict[str, Any], tools: Dict[str, Any]):
         self.agents = agents
         self.tools = tools
+        self.memo = StageMemo(settings.STAGE_MEMO_SIZE) if settings.STAGE_MEMO_ENABLED else None
+        self.planner = PipelinePlanner(tools.get("code_ranker")) if settings.PLANNER_ENABLED else None
+        self.graph = StageGraph(self._build_stages(), memo=self.memo)
+
+    def shutdown(self) -> None:
+        for tool in self.tools.values():
+            if hasattr(tool, "shutdown"):
+                tool.shutdown()
+
+    async def aclose(self) -> None:
+        self.shutdown()
+        # Agent'lar aynı LLMService'i paylaşır; her HTTP client'ı bir kez kapat
+        closed = set()
+        for agent in self.agents.values():
+            llm = getattr(agent, "llm", None)
+            if llm is None or id(llm) in closed or not hasattr(llm, "aclose"):
+                continue
+            closed.add(id(llm))
+            await llm.aclose()
+
+    # -------------------------
+    # Stage tanımları
+    # -------------------------
+    def _build_stages(self) -> List[Stage]:
+        query_key = lambda ctx: normalize_text(ctx.inputs["query"])  # noqa: E731
+        stages = [
+            Stage(
+                "query_analyzer", self._stage_query_analyzer, fallback=self._fallback_query_analyzer,
+                memo=MemoPolicy(key=query_key, ttl_s=settings.MEMO_TTL_ANALYSIS_S),
+            ),
+            Stage(
+                "doc_speculative", self._stage_doc_speculative, speculative=True,
+                memo=MemoPolicy(key=query_key, ttl_s=settings.MEMO_TTL_DOCS_S, version=self._index_version),
+            ),
+            Stage(
+                "doc_reader", self._stage_doc_reader,
+                after=("query_analyzer", "doc_speculative"), fallback=self._fallback_doc_reader,
+                memo=MemoPolicy(
+                    key=self._docs_key,
+                    ttl_s=settings.MEMO_TTL_DOCS_S,
+                    version=self._index_version,
+                ),
+            ),
+            Stage(
+                "example_finder", self._stage_example_finder,
+                after=("query_analyzer", "plan") if self.planner else ("query_analyzer",),
+                fallback=lambda ctx: ExampleFinderResult().model_dump(),
+                memo=MemoPolicy(key=self._examples_memo_key, ttl_s=settings.MEMO_TTL_EXAMPLES_S),
+            ),
+            Stage(
+                "tools", self._stage_tools, after=("doc_reader", "example_finder"), fallback=self._fallback_tools,
+                memo=MemoPolicy(key=self._tools_key, ttl_s=settings.MEMO_TTL_TOOLS_S),
+            ),
+            Stage("code_explainer", self._stage_code_explainer, after=("tools",), fallback=self._partial_answer),
+        ]
+        if self.planner is not None:
+            stages.append(Stage("plan", self._stage_plan, after=("query_analyzer", "doc_speculative")))
+        if "sandbox" in self.tools:
+            stages.append(
+                Stage("smoke_test", self._stage_smoke_test, after=("code_explainer",), fallback=lambda ctx: {})
+            )
+        return stages
+
+    # -------------------------
+    # Stage memo key / versiyonları
+    # -------------------------
+    def _examples_key(self, ctx: StageContext) -> str:
+        return normalize_text(self.agents["example_finder"].build_query(ctx["query_analyzer"]))
+
+    def _examples_memo_key(self, ctx: StageContext) -> Optional[str]:
+        # Planner atlattıysa boş sonuç cache'e yazılmasın
+        if (ctx.get("plan") or {}).get("skip_examples"):
+            return None
+        return self._examples_key(ctx)
+
+    def _index_version(self) -> str:
+        return getattr(self.agents["doc_reader"].rag, "index_version", "")
 
-    async def process_query(self, query: str) -> Dict[str, Any]:
-        # 1) Agent 1 - analyze (validate contract)
-        raw_analysis = await self.agents["query_analyzer"].execute(query)
-        analysis = QueryAnalysis.model_validate(raw_analysis).model_dump()
-
-        # 2) Agent 2 & 3 parallel (validate contracts)
-        doc_task = self.agents["doc_reader"].execute(analysis)
-        ex_task = self.agents["example_finder"].execute(analysis)
-        raw_doc_res, raw_ex_res = await asyncio.gather(doc_task, ex_task)
-
-        doc_res = DocumentationResult.model_validate(raw_doc_res).model_dump()
-        ex_res = ExampleFinderResult.model_validate(raw_ex_res).model_dump()
-
-        # 3) Tools - validate + complexity (validate contracts)
-
-        # BUG 6 FIX: validator'a temiz Python kodu gönder
-        # example_finder snippet'ı ```python ... ``` ile sarılı gelebilir — soy
-        def _strip_fenced(code: str) -> str:
-            code = (code or "").strip()
-            if code.startswith("```"):
-                lines = code.splitlines()
-                inner = [l for l in lines if not l.strip().startswith("```")]
-                return "\n".join(inner).strip()
-            return code
-
-        code_candidate = _strip_fenced(ex_res.get("code_example", "") or "")
-
-        # Hala boşsa doc snippet'lardan kod içeren bir parça dene
-        if not code_candidate:
-            for snip in doc_res.get("snippets", []):
-                text = snip.get("text", "") if isinstance(snip, dict) else getattr(snip, "text", "")
-                if any(sig in text for sig in ("def ", "import ", "class ", "@app.")):
-                    code_candidate = text.strip()
-                    break
-
-        raw_val = self.tools["code_validator"].validate(code_candidate)
-        val = CodeValidationResult.model_validate(raw_val).model_dump()
-
-        if val.get("valid"):
-            raw_cx = self.tools["complexity_analyzer"].analyze(code_candidate)
+    def _docs_key(self, ctx: StageContext) -> str:
+        # BM25 tarafı ham soruyu, alt index seçimi topic'i kullandığı için key hepsini içerir
+        reader = self.agents["doc_reader"]
+        analysis = ctx["query_analyzer"]
+        return digest(
+            normalize_text(reader.build_query(analysis)),
+            normalize_text(ctx.inputs["query"]),
+            reader.partition(analysis),
+            analysis.get("subtopic"),
+        )
+
+    @staticmethod
+    def _tools_key(ctx: StageContext) -> str:
+        # Tools sonucu yalnızca aday havuzuna ve keyword'lere bağlı
+        doc_res, ex_res = ctx["doc_reader"], ctx["example_finder"]
+        return digest(
+            ctx["query_analyzer"].get("keywords"),
+            [(s["source"], s["text"]) for s in doc_res.get("snippets") or []],
+            [(r["url"], r["snippet"]) for r in ex_res.get("results") or []],
+        )
+
+    # -------------------------
+    # Bütçe dolduğunda ya da stage hata verdiğinde kullanılan fallback'ler
+    # -------------------------
+    def _fallback_query_analyzer(self, ctx: StageContext) -> Dict[str, Any]:
+        return self.agents["query_analyzer"].heuristic_analysis(ctx.inputs["query"])
+
+    def _fallback_doc_reader(self, ctx: StageContext) -> Dict[str, Any]:
+        # Spekülatif arama bittiyse onu kullan
+        return ctx.get("doc_speculative") or DocumentationResult().model_dump()
+
+    def _fallback_tools(self, ctx: StageContext) -> Dict[str, Any]:
+        report = fallback_result("deadline" if ctx.trace["tools"].get("timed_out") else "error")
+        return {
+            "best": None,
+            "validation": CodeValidationResult.model_validate(report).model_dump(),
+            "complexity": ComplexityResult.model_validate(report).model_dump(),
+        }
+
+    def _partial_answer(self, ctx: StageContext) -> FinalAnswer:
+        """CodeExplainer bütçeyi aştığında ya da hata verdiğinde eldeki en iyi bağlamdan kısmi cevap."""
+        analysis = ctx.get("query_analyzer") or {}
+        doc_res = ctx.get("doc_reader") or {}
+        ex_res = ctx.get("example_finder") or {}
+        best = (ctx.get("tools") or {}).get("best")
+
+        snippets = doc_res.get("snippets") or []
+        if ctx.trace["code_explainer"].get("timed_out"):
+            explanation = "Zaman bütçesi doldu; tam açıklama üretilemedi."
         else:
-            raw_cx = {}  # boş -> schema Optional alanlar ile sorunsuz geçer
+            explanation = "Açıklama üretilirken hata oluştu; tam açıklama üretilemedi."
+        if snippets:
+            explanation += f"\n\nDokümantasyondan en ilgili bölüm ({snippets[0]['source']}):\n{snippets[0]['text'].strip()}"
+
+        sources = [r["url"] for r in ex_res.get("results") or [] if str(r.get("url", "")).startswith("http")]
+        return FinalAnswer(
+            explanation=explanation,
+            code_example=best.code if best else "",
+            sources=sources,
+            meta={
+                "framework": analysis.get("framework", "unknown"),
+                "topic": analysis.get("topic", "unknown"),
+                "partial": True,
+            },
+        )
+
+    async def _stage_query_analyzer(self, ctx: StageContext) -> Dict[str, Any]:
+        # Agent 1 - analyze (validate contract)
+        raw_analysis = await self.agents["query_analyzer"].execute(ctx.inputs["query"])
+        return QueryAnalysis.model_validate(raw_analysis).model_dump()
+
+    async def _stage_doc_speculative(self, ctx: StageContext) -> Dict[str, Any]:
+        # Analiz gerektirmeyen ilk RAG turu: ham query ile
+        raw = await self.agents["doc_reader"].search(ctx.inputs["query"])
+        return DocumentationResult.model_validate(raw).model_dump()
+
+    async def _stage_doc_reader(self, ctx: StageContext) -> Dict[str, Any]:
+        # Agent 2 - keyword'lerle rafine arama + spekülatif sonuçla birleştirme
+        reader = self.agents["doc_reader"]
+        analysis = ctx["query_analyzer"]
+        spec = ctx.get("doc_speculative") or {}
 
-        cx = ComplexityResult.model_validate(raw_cx).model_dump()
+        rag_query = reader.build_query(analysis)
+        same_query = rag_query.strip().lower() == (spec.get("meta") or {}).get("query", "").strip().lower()
+        # Spekülatif arama global index'te; topic alt index'i varsa yine rafine edilir
+        if spec and same_query and reader.partition(analysis) is None:
+            return spec
 
-        # 4) Agent 4 - final (validate contract)
+        lexical_query = reader.build_lexical_query(analysis, ctx.inputs["query"])
+        refined = DocumentationResult.model_validate(
+            await reader.search(
+                rag_query,
+                lexical_query,
+                reader.partition(analysis),
+                reader.build_variants(analysis, ctx.inputs["query"]),
+            )
+        ).model_dump()
+        merged, kept_spec = self._merge_docs(refined, spec)
+        if spec and not kept_spec:
+            ctx.discard("doc_speculative")
+        return merged
+
+    @staticmethod
+    def _merge_docs(refined: Dict[str, Any], spec: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """
+        Rafine + spekülatif snippet'leri retrieval sıralarıyla (RRF / rerank sonrası rank)
+        RRF'de birleştirir; relevance yalnızca vektör mesafesi olduğu için sıralamada
+        kullanılmaz (BM25'in bulduğu chunk'lar düşmesin). Dönüş: (sonuç, tutulan spekülatif sayısı).
+        """
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        rankings: List[Tuple[List[tuple], float]] = []
+        for origin, res in (("refined", refined), ("speculative", spec)):
+            snippets = res.get("snippets", []) or []
+            order = sorted(range(len(snippets)), key=lambda i: (snippets[i].get("rank") or i + 1, i))
+            keys: List[tuple] = []
+            for i in order:
+                snip = snippets[i]
+                key = (snip["source"], snip["text"])
+                merged.setdefault(key, {**snip, "_origin": origin})
+                keys.append(key)
+            rankings.append((list(dict.fromkeys(keys)), 1.0))
+
+        top_k = max(len(refined.get("snippets", [])), settings.TOP_K_RESULTS)
+        ranked = [
+            {**merged[key], "rank": rank} for rank, (key, _) in enumerate(rrf_fuse(rankings, top_k), 1)
+        ]
+        kept_spec = sum(1 for s in ranked if s["_origin"] == "speculative")
+
+        meta = dict(refined.get("meta") or {})
+        meta["speculative_kept"] = kept_spec
+        meta["top_k"] = len(ranked)
+        result = DocumentationResult(
+            snippets=[{k: v for k, v in s.items() if k != "_origin"} for s in ranked],
+            meta=meta,
+        ).model_dump()
+        return result, kept_spec
+
+    async def _stage_plan(self, ctx: StageContext) -> Dict[str, Any]:
+        deadline = ctx.deadline
+        return self.planner.plan(
+            ctx["query_analyzer"],
+            ctx.get("doc_speculative") or {},
+            examples_cached=self.memo is not None and self.memo.contains("example_finder", "", self._examples_key(ctx)),
+            examples_provided="example_finder" in ctx.results,
+            explain_budget_s=deadline.budget_for("code_explainer") if deadline else None,
+            examples_budget_s=deadline.budget_for("example_finder") if deadline else None,
+        )
+
+    async def _stage_example_finder(self, ctx: StageContext) -> Dict[str, Any]:
+        plan = ctx.get("plan") or {}
+        if plan.get("skip_examples"):
+            ctx.trace["example_finder"]["skipped"] = True
+            return ExampleFinderResult(
+                meta={"skipped": True, "reason": plan["reasons"].get("example_finder")}
+            ).model_dump()
+
+        # Agent 3 - web örnekleri (validate contract)
+        raw_ex_res = await self.agents["example_finder"].execute(ctx["query_analyzer"])
+        return ExampleFinderResult.model_validate(raw_ex_res).model_dump()
+
+    async def _stage_tools(self, ctx: StageContext) -> Dict[str, Any]:
+        # Tools - validate + complexity (validate contracts)
+        doc_res, ex_res = ctx["doc_reader"], ctx["example_finder"]
+
+        # Web + doc snippet'lerini tek havuzda puanla; pahalı AST/radon yolu
+        # sadece en iyi aday üzerinde çalışır (gürültü üzerinde değil).
+        # ExampleFinder / planner'ın parse ettiği metinler ranker cache'inden gelir.
+        ranker = self.tools["code_ranker"]
+        best = await asyncio.to_thread(
+            ranker.best, ranker.candidates_from(doc_res, ex_res), ctx["query_analyzer"].get("keywords")
+        )
+        if best is None:
+            # Analiz edilecek kod yok; process pool'a hiç gitme
+            ctx.trace["tools"]["skipped"] = True
+            if ctx.get("plan") is not None:
+                ctx["plan"]["skip_tools"] = True
+                ctx["plan"]["reasons"]["tools"] = "no code candidate"
+            report = fallback_result("no code candidate")
+            return {
+                "best": None,
+                "validation": CodeValidationResult.model_validate(report).model_dump(),
+                "complexity": ComplexityResult.model_validate(report).model_dump(),
+            }
+        code_candidate = best.code
+
+        # Tek parse: validation + complexity aynı AST'ten (hash cache'li).
+        # Process pool'da, CPU/zaman limitli çalışır; event loop bloklanmaz.
+        code_report = await self.tools["code_analyzer"].analyze_async(code_candidate)
+        return {
+            "best": best,
+            "validation": CodeValidationResult.model_validate(code_report).model_dump(),
+            "complexity": ComplexityResult.model_validate(code_report).model_dump(),
+        }
+
+    async def _stage_code_explainer(self, ctx: StageContext) -> FinalAnswer:
+        # Agent 4 - final (validate contract)
+        tools = ctx["tools"]
+        fast = bool((ctx.get("plan") or {}).get("fast_explain"))
+        if fast:
+            ctx.trace["code_explainer"]["variant"] = "fast"
         raw_final = await self.agents["code_explainer"].execute(
             {
-                "query": query,
-                "analysis": analysis,
-                "documentation": doc_res,
-                "examples": ex_res,
-                "validation": val,
-                "complexity": cx,
+                "query": ctx.inputs["query"],
+                "analysis": ctx["query_analyzer"],
+                "documentation": ctx["doc_reader"],
+                "examples": ctx["example_finder"],
+                "validation": tools["validation"],
+                "complexity": tools["complexity"],
+                "prefer_fast_model": fast,
             }
         )
+        return FinalAnswer.model_validate(raw_final)
+
+    async def _stage_smoke_test(self, ctx: StageContext) -> Dict[str, Any]:
+        # (Opsiyonel) üretilen kodu izole worker'da import edip route'larını dene
+        final: FinalAnswer = ctx["code_explainer"]
+        if not final.code_example:
+            return {}
+        raw_smoke = await self.tools["sandbox"].smoke_test(final.code_example)
+        return SmokeTestResult.model_validate(raw_smoke).model_dump()
+
+    # -------------------------
+    # Giriş noktası
+    # -------------------------
+    async def process_query(
+        self,
+        query: str,
+        deadline_s: Optional[float] = None,
+        on_event: Optional[StageEventCallback] = None,
+    ) -> Dict[str, Any]:
+        deadline = self._deadline(deadline_s)
+        ctx = await self.graph.run(StageContext({"query": query}, deadline=deadline, on_event=on_event))
+        return self._finalize(ctx, deadline)
+
+    @staticmethod
+    def _deadline(deadline_s: Optional[float]) -> Deadline:
+        return Deadline(min(deadline_s or settings.REQUEST_DEADLINE_S, settings.MAX_REQUEST_DEADLINE_S))
+
+    def _finalize(self, ctx: StageContext, deadline: Deadline) -> Dict[str, Any]:
+        final: FinalAnswer = ctx["code_explainer"]
+        best = ctx["tools"]["best"]
+
+        final.meta = final.meta or {}
+        final.meta["code_candidate"] = (
+            {"source": best.source, "origin": best.origin, "score": round(best.score, 4)} if best else None
+        )
+        if ctx.get("smoke_test"):
+            final.meta["smoke_test"] = ctx["smoke_test"]
+        final.meta["pipeline"] = self.graph.summary(ctx)
+        final.meta["deadline"] = {
+            "budget_ms": round(deadline.total_s * 1000),
+            "remaining_ms": round(deadline.remaining() * 1000),
+            "timed_out": ctx.timed_out(),
+        }
+        if ctx.timed_out():
+            final.meta["partial"] = True
+        if self.planner is not None and ctx.get("plan") is not None:
+            final.meta["plan"] = {**ctx["plan"], "est_saved_ms": self.planner.estimate_saved_ms(ctx["plan"])}
+            self.planner.observe(ctx.trace)
+        return final.model_dump()
+
+    async def process_batch(
+        self,
+        queries: List[str],
+        deadline_s: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Çok sayıda query'yi paylaşılan retrieval ile işler; her benzersiz query
+        bitince {"indices", "query", "result" | "error"} üretir (tamamlanma sırasıyla).
+
+        - Aynı query'ler bir kez işlenir (indices hepsini listeler)
+        - Ham ve rafine doküman aramaları: her biri tek encode + tek FAISS search
+        - Aynı arama cümlesine düşen web aramaları paylaşılır
+        - LLM kullanan işler (analiz, tools + açıklama) BATCH_LLM_CONCURRENCY ile sınırlı
+        """
+        indices: Dict[str, List[int]] = {}
+        for i, q in enumerate(queries):
+            indices.setdefault(q.strip(), []).append(i)
+        unique = list(indices)
+
+        reader = self.agents["doc_reader"]
+        llm_sem = asyncio.Semaphore(settings.BATCH_LLM_CONCURRENCY)
+
+        async def analyze(q: str) -> Dict[str, Any]:
+            async with llm_sem:
+                try:
+                    return await self._stage_query_analyzer(StageContext({"query": q}))
+                except Exception:
+                    return self.agents["query_analyzer"].heuristic_analysis(q)
+
+        try:
+            # 1) Ham query'lerle RAG, analizlerle eşzamanlı
+            spec_docs, analyses = await asyncio.gather(
+                reader.search_many(unique),
+                asyncio.gather(*(analyze(q) for q in unique)),
+            )
+
+            # 2) Rafine RAG (tek matris araması) + gruplanmış web aramaları
+            refined_docs, examples = await asyncio.gather(
+                reader.search_many(
+                    [reader.build_query(a) for a in analyses],
+                    [reader.build_lexical_query(a, q) for a, q in zip(analyses, unique)],
+                    [reader.partition(a) for a in analyses],
+                    [reader.build_variants(a, q) for a, q in zip(analyses, unique)],
+                ),
+                self.agents["example_finder"].execute_many(analyses, concurrency=settings.BATCH_WEB_CONCURRENCY),
+            )
+        except Exception as e:
+            # Paylaşılan aşama çökerse her query hata satırı alır; stream yarıda kesilmez
+            logger.exception("Batch shared retrieval failed")
+            for q in unique:
+                yield {"indices": indices[q], "query": q, "error": f"shared retrieval failed: {e}"}
+            return
+
+        async def finish(i: int) -> Dict[str, Any]:
+            q = unique[i]
+            item: Dict[str, Any] = {"indices": indices[q], "query": q}
+            async with llm_sem:
+                deadline = self._deadline(deadline_s)
+                ctx = StageContext({"query": q}, deadline=deadline)
+                ctx.results.update({
+                    "query_analyzer": analyses[i],
+                    "doc_speculative": spec_docs[i],
+                    "doc_reader": self._merge_docs(
+                        DocumentationResult.model_validate(refined_docs[i]).model_dump(),
+                        spec_docs[i],
+                    )[0],
+                    "example_finder": ExampleFinderResult.model_validate(examples[i]).model_dump(),
+                })
+                try:
+                    await self.graph.run(ctx)
+                    item["result"] = self._finalize(ctx, deadline)
+                except Exception as e:
+                    item["error"] = str(e)
+            return item
 
-        final = FinalAnswer.model_validate(raw_final)
-        return final.model_dump()
\ No newline at end of file
+        # 3) Kalan stage'ler (tools, code_explainer, smoke_test) query başına; bitenler hemen akar
+        tasks = [asyncio.create_task(finish(i)) for i in range(len(unique))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
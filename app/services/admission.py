@@ -0,0 +1,131 @@
+# app/services/admission.py
+"""
+/ask için admission control (backpressure).
+
+Tüm istekler aynı Ollama'yı paylaştığı için burst altında herkesin latency'si
+birlikte artar. Bunun yerine:
+- aynı anda en fazla `max_concurrency` pipeline çalışır (worker başına)
+- fazlası sınırlı bir kuyrukta FIFO bekler (`max_queue`)
+- kuyruk doluysa hemen 429, kuyrukta `max_queue_wait_s`'den fazla bekleyene 503
+- iki durumda da tahmini `Retry-After` döner
+Böylece aşırı yükte birkaç istek reddedilir, kabul edilenler normal hızda biter.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after_s: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_queue_wait_s: Optional[float] = None,
+    ):
+        self.max_concurrency = max_concurrency or settings.ASK_MAX_CONCURRENCY
+        self.max_queue = max_queue if max_queue is not None else settings.ASK_MAX_QUEUE
+        self.max_queue_wait_s = max_queue_wait_s or settings.ASK_MAX_QUEUE_WAIT_S
+
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._waiting = 0
+
+        # Gauge / sayaçlar
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_wait_timeout = 0
+        self._avg_wait_s = 0.0
+        self._max_wait_s = 0.0
+        self._avg_service_s: Optional[float] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Event loop'a bağlı; ilk istekte oluştur
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._sem
+
+    def retry_after(self) -> int:
+        """Kuyruğun boşalması için tahmini süre (saniye, 1..60)."""
+        service_s = self._avg_service_s or self.max_queue_wait_s
+        rounds = (self._waiting + 1) / self.max_concurrency
+        return int(min(60, max(1, math.ceil(service_s * rounds))))
+
+    def _record_wait(self, wait_s: float) -> None:
+        self._avg_wait_s += _EWMA_ALPHA * (wait_s - self._avg_wait_s)
+        self._max_wait_s = max(self._max_wait_s, wait_s)
+
+    def _record_service(self, service_s: float) -> None:
+        if self._avg_service_s is None:
+            self._avg_service_s = service_s
+        else:
+            self._avg_service_s += _EWMA_ALPHA * (service_s - self._avg_service_s)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        sem = self._semaphore()
+
+        # Boş slot varsa ve kimse beklemiyorsa kuyruk kontrolüne girmeden geç
+        if self._waiting == 0 and not sem.locked():
+            await sem.acquire()
+            wait_s = 0.0
+        else:
+            if self._waiting >= self.max_queue:
+                self._rejected_queue_full += 1
+                raise AdmissionRejected(429, "Too many queued requests", self.retry_after())
+
+            self._waiting += 1
+            t0 = time.perf_counter()
+            try:
+                await asyncio.wait_for(sem.acquire(), timeout=self.max_queue_wait_s)
+            except asyncio.TimeoutError:
+                self._rejected_wait_timeout += 1
+                raise AdmissionRejected(
+                    503, f"Queued longer than {self.max_queue_wait_s}s", self.retry_after()
+                )
+            finally:
+                self._waiting -= 1
+            wait_s = time.perf_counter() - t0
+
+        self._admitted += 1
+        self._active += 1
+        self._record_wait(wait_s)
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._record_service(time.perf_counter() - t_start)
+            sem.release()
+
+    def gauges(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "queue_depth": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_wait_timeout": self._rejected_wait_timeout,
+            "avg_wait_ms": round(self._avg_wait_s * 1000, 2),
+            "max_wait_ms": round(self._max_wait_s * 1000, 2),
+            "avg_service_ms": round(self._avg_service_s * 1000, 2) if self._avg_service_s is not None else None,
+        }
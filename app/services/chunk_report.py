@@ -0,0 +1,95 @@
+# app/services/chunk_report.py
+"""
+Embedding truncation raporu: doküman korpusunda kaç chunk'ın embedding
+modelinin token sınırını aştığını, karakter bazlı chunk'lama ("before") ve
+tokenizer-farkındalıklı chunk'lama ("after") için yan yana gösterir.
+
+    python -m app.services.chunk_report [--documents data/documents] [--model ...]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.chunk_sizer import EmbeddingTokenBudget
+from app.services.document_service import DocumentService
+
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception:  # pragma: no cover
+    SentenceTransformer = None  # type: ignore
+
+
+def _service(documents_path: str, token_budget: Any = None) -> DocumentService:
+    return DocumentService(
+        documents_path=documents_path,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        structured_markdown=settings.MARKDOWN_CHUNKER_ENABLED,
+        max_code_chunk=settings.MARKDOWN_MAX_CODE_CHUNK,
+        token_budget=token_budget,
+    )
+
+
+def truncation_stats(chunks: List[str], budget: EmbeddingTokenBudget) -> Dict[str, Any]:
+    counts = budget.count_many(chunks)
+    over = [c for c in counts if c > budget.max_tokens]
+    return {
+        "chunks": len(chunks),
+        "truncated": len(over),
+        "lost_tokens": sum(c - budget.max_tokens for c in over),
+        "total_tokens": sum(counts),
+        "max_tokens": max(counts, default=0),
+    }
+
+
+def build_report(documents_path: str, budget: EmbeddingTokenBudget) -> Dict[str, Dict[str, Any]]:
+    """{"before": ..., "after": ...}: aynı korpus, token bütçesi olmadan ve ile."""
+    report = {}
+    for label, service in (
+        ("before", _service(documents_path)),
+        ("after", _service(documents_path, budget)),
+    ):
+        chunks = [chunk for fp in service.list_documents() for _, chunk in service.chunk_document(fp)]
+        report[label] = truncation_stats(chunks, budget)
+    return report
+
+
+def format_report(report: Dict[str, Dict[str, Any]], budget: EmbeddingTokenBudget) -> str:
+    lines = [
+        f"Token budget per chunk: {budget.max_tokens}",
+        f"{'':8}{'chunks':>8}{'truncated':>12}{'%':>8}{'lost tokens':>13}{'max tokens':>12}",
+    ]
+    for label, s in report.items():
+        pct = 100.0 * s["truncated"] / max(1, s["chunks"])
+        lines.append(
+            f"{label:8}{s['chunks']:>8}{s['truncated']:>12}{pct:>7.1f}%"
+            f"{s['lost_tokens']:>13}{s['max_tokens']:>12}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Embedding truncation report for the documents corpus")
+    parser.add_argument("--documents", default=settings.DOCUMENTS_PATH)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    args = parser.parse_args(argv)
+
+    if SentenceTransformer is None:
+        print("sentence_transformers is not installed", file=sys.stderr)
+        return 1
+
+    budget = EmbeddingTokenBudget.from_model(SentenceTransformer(args.model, device="cpu"))
+    if budget is None:
+        print(f"{args.model} has no tokenizer / max_seq_length", file=sys.stderr)
+        return 1
+
+    print(f"Model: {args.model}")
+    print(format_report(build_report(args.documents, budget), budget))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
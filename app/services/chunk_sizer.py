@@ -0,0 +1,132 @@
+# app/services/chunk_sizer.py
+"""
+Embedding modelinin tokenizer'ına göre chunk boyutlandırma.
+
+all-MiniLM-L6-v2 girdiyi `max_seq_length` (256) word piece'te keser; kod
+ağırlıklı 600 karakterlik bir chunk bunu aşabiliyor ve chunk'ın sonu hiç
+embed edilmiyor. EmbeddingTokenBudget modelin kendi (fast) tokenizer'ıyla
+bir dokümanın tüm chunk'larını tek batch çağrıda sayar; bütçeyi aşanları
+token offset'lerinden, mümkünse satır / boşluk sınırında böler.
+
+Bütçe: max_seq_length - özel token'lar ([CLS], [SEP]); EMBEDDING_MAX_TOKENS
+verilirse o kullanılır.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingTokenBudget:
+    def __init__(self, tokenizer: Any, max_tokens: int):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+
+    @classmethod
+    def from_model(cls, model: Any, max_tokens: Optional[int] = None) -> Optional["EmbeddingTokenBudget"]:
+        """SentenceTransformer'dan (tokenizer + max_seq_length); tokenizer'ı olmayan modelde None."""
+        tokenizer = getattr(model, "tokenizer", None)
+        seq_len = getattr(model, "max_seq_length", None)
+        if tokenizer is None or not seq_len:
+            return None
+        if not getattr(tokenizer, "is_fast", False):
+            logger.warning("Embedding tokenizer is not a fast tokenizer; chunk sizing will be slow")
+
+        special = 2
+        if hasattr(tokenizer, "num_special_tokens_to_add"):
+            special = tokenizer.num_special_tokens_to_add()
+        limit = max_tokens or settings.EMBEDDING_MAX_TOKENS or seq_len - special
+        return cls(tokenizer, min(limit, seq_len - special))
+
+    def _encode(self, texts: Sequence[str], offsets: bool = False) -> Any:
+        return self.tokenizer(
+            list(texts),
+            add_special_tokens=False,
+            return_offsets_mapping=offsets,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        return [len(ids) for ids in self._encode(texts)["input_ids"]]
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        reserve: Optional[Sequence[int]] = None,
+    ) -> List[List[Tuple[int, str]]]:
+        """
+        Her metin için [(metin içi offset, parça)]; bütçeye sığan metin tek parçadır.
+        reserve: metin başına önceden harcanmış token (ör. başlık yolu öneki).
+        """
+        if not texts:
+            return []
+        encoded = self._encode(texts, offsets=True)
+        out: List[List[Tuple[int, str]]] = []
+        for i, text in enumerate(texts):
+            spans = encoded["offset_mapping"][i]
+            # reserve bütçeyi yemesin diye başlık önekleri önceden kısaltılır (shorten_headings)
+            limit = max(1, self.max_tokens - (reserve[i] if reserve else 0))
+            if len(spans) <= limit:
+                out.append([(0, text)])
+            else:
+                out.append(self._split(text, spans, limit))
+        return out
+
+    def shorten_headings(self, heads: Sequence[str], sep: str = " > ") -> Tuple[List[str], List[int]]:
+        """
+        Başlık yolu öneklerini bütçenin yarısına sığdırır: önce baştaki (genel)
+        başlıklar atılır, tek başlık hâlâ uzunsa token sınırından kesilir.
+        Dönüş: (başlıklar, başlık başına token sayısı) — fit()'e reserve olarak verilir.
+        """
+        cap = self.max_tokens // 2
+        heads = list(heads)
+        counts = self.count_many(heads)
+        for i, (head, count) in enumerate(zip(heads, counts)):
+            parts = head.split(sep)
+            while count > cap and len(parts) > 1:
+                parts = parts[1:]
+                head = sep.join(parts)
+                count = self.count_many([head])[0]
+            if count > cap:
+                spans = self._encode([head], offsets=True)["offset_mapping"][0]
+                head = head[: spans[cap - 1][1]].rstrip() if cap > 0 else ""
+                count = self.count_many([head])[0] if head else 0
+            heads[i], counts[i] = head, count
+        return heads, counts
+
+    @staticmethod
+    def _split(text: str, spans: Sequence[Tuple[int, int]], limit: int) -> List[Tuple[int, str]]:
+        pieces: List[Tuple[int, str]] = []
+        first = 0
+        while first < len(spans):
+            last = first + limit
+            start = spans[first][0]
+            if last >= len(spans):
+                cut = len(text)
+            else:
+                cut = spans[last][0]
+                # Bütçenin ikinci yarısında satır, yoksa boşluk sınırı ara
+                floor = spans[first + limit // 2][0]
+                for sep in ("\n", " "):
+                    pos = text.rfind(sep, floor, cut)
+                    if pos > start:
+                        cut = pos
+                        break
+                if cut <= start:
+                    cut = spans[last][1]
+
+            piece = text[start:cut]
+            stripped = piece.strip()
+            if stripped:
+                pieces.append((start + len(piece) - len(piece.lstrip()), stripped))
+            while first < len(spans) and spans[first][0] < cut:
+                first += 1
+        return pieces
@@ -0,0 +1,70 @@
+# app/services/chunk_tagger.py
+"""
+Index zamanında chunk etiketleme: kaynak ailesi (fastapi / pydantic / general),
+framework ve QueryAnalysis ile aynı isimlerdeki topic.
+
+Etiketler önce dosya yolundan (data/documents altındaki göreli yol ve dosya
+adı), yol bir şey söylemiyorsa chunk içeriğindeki anahtar kelimelerden çıkar.
+RAGService topic etiketlerine göre alt index'ler kurar; topic'i bilinen
+sorgular önce kendi alt index'inde aranır.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+# (topic, dosya adı kalıpları, içerik anahtar kelimeleri) — QueryAnalyzer topic isimleri
+_TOPIC_RULES: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    ("websocket", ("websocket",), ("websocket", "receive_text", "send_text")),
+    ("authentication", ("security", "oauth", "jwt", "auth"), ("oauth2", "jwt", "bearer", "password", "token")),
+    ("middleware", ("middleware", "cors"), ("middleware", "call_next", "corsmiddleware")),
+    ("dependency_injection", ("dependenc",), ("depends(", "dependency", "dependencies")),
+    ("database", ("sql", "database"), ("sqlalchemy", "session", "database", "sqlmodel")),
+    ("testing", ("testing",), ("testclient", "pytest", "def test_")),
+    ("deployment", ("docker", "deploy"), ("docker", "gunicorn", "uvicorn --workers", "kubernetes")),
+    ("background_tasks", ("background",), ("backgroundtasks", "add_task")),
+    ("rest_api", ("path-params", "query-params", "body", "response-model", "first-steps",
+                  "rest-api", "handling-errors", "request-files", "bigger-applications"),
+     ("@app.get", "@app.post", "@router.", "httpexception", "status_code")),
+]
+_MIN_CONTENT_HITS = 2
+
+
+class ChunkTagger:
+    def tag(self, source: str, text: str) -> Dict[str, str]:
+        """source: documents klasörüne göre göreli yol (ör. "pydantic/api/fields.md")."""
+        path = source.replace("\\", "/").lower()
+        name = path.rsplit("/", 1)[-1]
+        lower = (text or "").lower()
+
+        if path.startswith("pydantic/") or name.startswith("pydantic"):
+            family = "pydantic"
+        elif "fastapi" in name or "fastapi" in lower or name.endswith(".md"):
+            # data/documents kökündeki .md dosyaları FastAPI dokümanları
+            family = "fastapi"
+        else:
+            family = "general"
+
+        if "fastapi" in lower or family == "fastapi":
+            framework = "fastapi"
+        elif family == "pydantic":
+            framework = "pydantic"
+        else:
+            framework = "unknown"
+
+        return {"family": family, "framework": framework, "topic": self._topic(family, name, lower)}
+
+    @staticmethod
+    def _topic(family: str, name: str, lower: str) -> str:
+        for topic, name_patterns, _ in _TOPIC_RULES:
+            if any(p in name for p in name_patterns):
+                return topic
+        # Pydantic örneklerindeki "password", "session" gibi alanlar topic sinyali değil
+        if family == "pydantic":
+            return "general"
+
+        best, best_hits = "general", 0
+        for topic, _, keywords in _TOPIC_RULES:
+            hits = sum(lower.count(k) for k in keywords)
+            if hits > best_hits:
+                best, best_hits = topic, hits
+        return best if best_hits >= _MIN_CONTENT_HITS else "general"
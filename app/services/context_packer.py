@@ -0,0 +1,158 @@
+# app/services/context_packer.py
+"""
+CodeExplainer prompt'u için token bütçeli context packing.
+
+Doc snippet'leri ve web sonuçları boyutlarına bakılmadan ilk 3'er tane alınınca
+prompt `num_ctx`'i aşabiliyor; Ollama sessizce baştan kırpıyor ve prompt
+değerlendirme süresi uzuyor. ContextPacker:
+- token sayısını hedef modelin tokenizer'ı ile (`tokenizers` kuruluysa ve
+  PROMPT_TOKENIZER verilmişse) ya da ona kalibre edilmiş hızlı bir tahminle ölçer
+- doc ve web parçaları arasında örtüşen metni (kelime shingle'ları) eler
+- parçaları "relevance / token" yoğunluğuna göre greedy olarak bütçeye yerleştirir
+- paketlenen / atılan token sayılarını raporlar (response meta'ya yazılır)
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+
+try:
+    from tokenizers import Tokenizer
+except Exception:  # pragma: no cover
+    Tokenizer = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_PIECE_RE = re.compile(r"\w+|[^\w\s]+")
+_SHINGLE = 5
+
+
+class TokenCounter:
+    """
+    Hedef modelin tokenizer'ı yüklenebiliyorsa onu kullanır. Aksi halde Llama-3
+    BPE'sine kalibre tahmin: kelime başına 1 token (+ her 6 karakter için 1),
+    noktalama dizisi başına yarım karakter; CONTEXT_TOKEN_ESTIMATE_SCALE ile ölçeklenir.
+    """
+
+    def __init__(self, tokenizer_name: Optional[str] = None, scale: Optional[float] = None):
+        self.scale = scale if scale is not None else settings.CONTEXT_TOKEN_ESTIMATE_SCALE
+        self.name = "estimate"
+        self._tokenizer = None
+
+        tokenizer_name = tokenizer_name if tokenizer_name is not None else settings.PROMPT_TOKENIZER
+        if tokenizer_name and Tokenizer is not None:
+            try:
+                if tokenizer_name.endswith(".json"):
+                    self._tokenizer = Tokenizer.from_file(tokenizer_name)
+                else:
+                    self._tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+                self.name = tokenizer_name
+            except Exception:
+                logger.warning("Tokenizer %s could not be loaded; using estimate", tokenizer_name, exc_info=True)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+        n = 0
+        for piece in _PIECE_RE.findall(text):
+            if piece[0].isalnum() or piece[0] == "_":
+                n += 1 + (len(piece) - 1) // 6
+            else:
+                n += (len(piece) + 1) // 2
+        return max(1, round(n * self.scale))
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < _SHINGLE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + _SHINGLE]) for i in range(len(words) - _SHINGLE + 1)}
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        counter: Optional[TokenCounter] = None,
+        budget_tokens: Optional[int] = None,
+        dedupe_threshold: Optional[float] = None,
+    ):
+        self.counter = counter or TokenCounter()
+        self.budget_tokens = budget_tokens or settings.CONTEXT_TOKEN_BUDGET
+        self.dedupe_threshold = (
+            dedupe_threshold if dedupe_threshold is not None else settings.CONTEXT_DEDUPE_THRESHOLD
+        )
+
+    def pack(
+        self,
+        snippets: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        budget_tokens: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        snippets: DocSnippet dict'leri (text, relevance)
+        results: WebResult dict'leri (snippet); skor olmadığı için sıradan relevance türetilir
+
+        Dönüş: {"snippets", "results", "report"} — seçilenler orijinal sıralarıyla.
+        """
+        budget = budget_tokens or self.budget_tokens
+
+        items = []
+        for i, s in enumerate(snippets or []):
+            text = str(s.get("text") or "").strip()
+            if text:
+                items.append({"kind": "doc", "pos": i, "value": s, "text": text,
+                              "relevance": float(s.get("relevance") or 0.0)})
+        for i, r in enumerate(results or []):
+            text = f"{r.get('title') or ''}\n{r.get('snippet') or ''}".strip()
+            if text:
+                # Web sonuçları arama motoru sırasında; en iyisi ~ orta seviye bir doc chunk'ı
+                items.append({"kind": "web", "pos": i, "value": r, "text": text,
+                              "relevance": 0.5 / (1 + i)})
+
+        for it in items:
+            it["tokens"] = self.counter.count(it["text"])
+            it["shingles"] = _shingles(it["text"])
+
+        # Yüksek relevance önce: duplicate çiftinde daha alakalı olan kalsın
+        items.sort(key=lambda it: -it["relevance"])
+        seen: Set[Tuple[str, ...]] = set()
+        unique, duplicates = [], []
+        for it in items:
+            sh = it["shingles"]
+            if sh and seen and len(sh & seen) / len(sh) >= self.dedupe_threshold:
+                duplicates.append(it)
+                continue
+            seen |= sh
+            unique.append(it)
+
+        # Greedy: relevance / token yoğunluğu
+        unique.sort(key=lambda it: -(it["relevance"] / max(1, it["tokens"])))
+        packed, dropped, used = [], [], 0
+        for it in unique:
+            if used + it["tokens"] <= budget:
+                packed.append(it)
+                used += it["tokens"]
+            else:
+                dropped.append(it)
+
+        packed.sort(key=lambda it: (it["kind"], it["pos"]))
+        return {
+            "snippets": [it["value"] for it in packed if it["kind"] == "doc"],
+            "results": [it["value"] for it in packed if it["kind"] == "web"],
+            "report": {
+                "tokenizer": self.counter.name,
+                "budget_tokens": budget,
+                "packed_tokens": used,
+                "dropped_tokens": sum(it["tokens"] for it in dropped + duplicates),
+                "packed": len(packed),
+                "dropped": len(dropped),
+                "duplicates": len(duplicates),
+            },
+        }
@@ -1,7 +1,10 @@
+from operator import itemgetter
 from pathlib import Path
-from typing import List
+from typing import Any, List, Optional, Tuple
 import re
 
+from app.services.markdown_chunker import MarkdownChunker
+
 
 class SimpleTextSplitter:
     def __init__(self, chunk_size=500, chunk_overlap=50):
@@ -9,6 +12,14 @@ class SimpleTextSplitter:
         self.chunk_overlap = chunk_overlap
 
     def split_text(self, text: str) -> List[str]:
+        return [chunk for _, chunk in self.split_with_offsets(text)]
+
+    def split_with_offsets(self, text: str) -> List[Tuple[int, str]]:
+        """
+        split_text ile aynı chunk'lar, (başlangıç offset'i, chunk) olarak.
+        Offset strip edilmiş chunk'ın metindeki ilk karakteridir; retrieval'da
+        komşu chunk'ların overlap'ini kesip birleştirmek için kullanılır.
+        """
         chunks = []
         start = 0
         text_len = len(text)
@@ -18,10 +29,11 @@ class SimpleTextSplitter:
 
         while start < text_len:
             end = min(start + self.chunk_size, text_len)
-            chunk = text[start:end].strip()
+            raw = text[start:end]
+            chunk = raw.strip()
 
             if chunk:
-                chunks.append(chunk)
+                chunks.append((start + len(raw) - len(raw.lstrip()), chunk))
 
             next_start = end - self.chunk_overlap
             if next_start <= start:
@@ -32,14 +44,80 @@ class SimpleTextSplitter:
         return chunks
 
 
+# _clean_markdown adımları, sırası önemli: (tetikleyici alt dizgi, derlenmiş pattern, replacement).
+# Satır başı pattern'leri MULTILINE "^" yerine literal ile başlayıp geriye bakar
+# ("///(?<![^\n]///)" == satır başında "///"); böylece regex motoru her pozisyonda
+# lookbehind denemek yerine literal'i hızlıca arar. Grup döndüren replacement'lar
+# r"\1" template'i yerine itemgetter(1): eşleşme başına Python'da template açılmaz.
+# Çıktı eski 15 adımlı zincirle birebir aynı (tests/test_markdown_cleaner.py).
+_GROUP_1 = itemgetter(1)
+_CLEAN_STEPS = [
+    # --- FastAPI DOCS ÖZEL SYNTAX ---
+    # {!> ../path/to/file.py !} — include direktiflerini tamamen sil
+    ("{!>", re.compile(r"\{!>.*?!\}", re.DOTALL), ""),
+    # ```Python hl_lines="1 2 3" → ```python
+    ("hl_lines", re.compile(r"```[Pp]ython\s+hl_lines=[\"'][^\"']*[\"']"), "```python"),
+    # /// tip, /// note, //// tab | Python 3.10+ → satırı sil
+    ("///", re.compile(r"///(?<![^\n]///)[^\n]*"), ""),
+    # --- STANDART MARKDOWN ---
+    # Fenced code blocks — fence marker'ları sil, kodu koru
+    ("```", re.compile(r"```[a-zA-Z]*\n?"), ""),
+    ("```", re.compile(r"```"), ""),
+    # Inline code — backtick'leri sil
+    ("`", re.compile(r"`([^`]+)`"), _GROUP_1),
+    # Images — tamamen sil (önce links'ten işle)
+    ("![", re.compile(r"!\[.*?\]\(.*?\)"), ""),
+    # Links — sadece text'i bırak
+    ("](", re.compile(r"\[([^\]]+)\]\([^)]+\)"), _GROUP_1),
+    # Headers — satır başındaki # işaretlerini sil
+    ("#", re.compile(r"#(?<![^\n]#)#{0,5}\s+"), ""),
+    # Bold + italic — işaretleri sil (kelime sınırında _ yakala, identifier içinde değil)
+    ("*", re.compile(r"\*{1,3}([^*]+)\*{1,3}"), _GROUP_1),
+    ("_", re.compile(r"_(?<!\w_)_{0,2}([^_]+)_{1,3}(?!\w)"), _GROUP_1),
+    # HTML tags
+    ("<", re.compile(r"<[^>]+>"), ""),
+    # Yatay çizgiler — tetikleyici boş: bu adım HER dokümanda çalışır. "-*_" gibi
+    # karışık çizgiler de eski zincirde siliniyordu; bunları kapsayan tek bir
+    # literal yok ("---"/"***"/"___" tetikleyicisi çıktıyı değiştirirdi).
+    ("", re.compile(r"[-*_](?<![^\n][-*_])[-*_]{2,}\s*$", re.MULTILINE), ""),
+    # Fazla boş satırları temizle
+    ("\n\n\n", re.compile(r"\n\n\n+"), "\n\n"),
+]
+
+
+def _with_heading(head: str, body: str) -> str:
+    return f"{head}\n\n{body}" if head else body
+
+
 class DocumentService:
-    def __init__(self, documents_path="data/documents", chunk_size=500, chunk_overlap=50):
+    def __init__(
+        self,
+        documents_path="data/documents",
+        chunk_size=500,
+        chunk_overlap=50,
+        structured_markdown: bool = False,
+        max_code_chunk: Optional[int] = None,
+        token_budget: Any = None,
+    ):
         self.documents_path = Path(documents_path).resolve()
         self.text_splitter = SimpleTextSplitter(chunk_size, chunk_overlap)
+        # .md için yapıya duyarlı chunker (None: temizlenmiş metin düz splitter'a gider)
+        self.markdown_chunker: Optional[MarkdownChunker] = None
+        if structured_markdown:
+            self.markdown_chunker = MarkdownChunker(
+                chunk_size=chunk_size,
+                max_code_size=max_code_chunk or chunk_size * 3,
+                clean=self._clean_markdown,
+            )
+        # Opsiyonel EmbeddingTokenBudget: embedding modelinin keseceği chunk'lar bölünür
+        self.token_budget = token_budget
 
     def split_text(self, text: str):
         return self.text_splitter.split_text(text)
 
+    def split_with_offsets(self, text: str):
+        return self.text_splitter.split_with_offsets(text)
+
     def _clean_markdown(self, text: str) -> str:
         """
         Markdown syntax'ını temizler — RAG'a gürültüsüz metin girer.
@@ -58,52 +136,13 @@ class DocumentService:
         - HTML tags (<tag>) → sil
         - Yatay çizgiler (---) → sil
         - Fazla boş satırlar → tek boş satıra indir
-        """
-        # --- FastAPI DOCS ÖZEL SYNTAX ---
-
-        # {!> ../path/to/file.py !} — include direktiflerini tamamen sil
-        text = re.sub(r"\{!>.*?!\}", "", text, flags=re.DOTALL)
-
-        # ```Python hl_lines="1 2 3" → ```python (hl_lines attribute'unu sil)
-        text = re.sub(r"```[Pp]ython\s+hl_lines=[\"'][^\"']*[\"']", "```python", text)
-
-        # //// tab | Python 3.10+ → tamamen sil
-        text = re.sub(r"^////.*$", "", text, flags=re.MULTILINE)
-
-        # /// tip, /// note, /// warning, /// → tamamen sil
-        text = re.sub(r"^///.*$", "", text, flags=re.MULTILINE)
-
-        # --- STANDART MARKDOWN ---
-
-        # Fenced code blocks — fence marker'ları sil, kodu koru
-        text = re.sub(r"```[a-zA-Z]*\n?", "", text)
-        text = re.sub(r"```", "", text)
-
-        # Inline code — backtick'leri sil
-        text = re.sub(r"`([^`]+)`", r"\1", text)
-
-        # Images — tamamen sil (önce links'ten işle)
-        text = re.sub(r"!\[.*?\]\(.*?\)", "", text)
-
-        # Links — sadece text'i bırak
-        text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-
-        # Headers — # işaretlerini sil
-        text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
-
-        # Bold + italic — işaretleri sil (kelime sınırında _ yakala, identifier içinde değil)
-        text = re.sub(r"\*{1,3}([^*]+)\*{1,3}", r"\1", text)
-        text = re.sub(r"(?<!\w)_{1,3}([^_]+)_{1,3}(?!\w)", r"\1", text)
-
-        # HTML tags
-        text = re.sub(r"<[^>]+>", "", text)
-
-        # Yatay çizgiler
-        text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
-
-        # Fazla boş satırları temizle
-        text = re.sub(r"\n{3,}", "\n\n", text)
 
+        Adımlar modül seviyesinde derlenmiş _CLEAN_STEPS'tir; tetikleyici
+        karakteri metinde geçmeyen adım hiç çalışmaz.
+        """
+        for trigger, pattern, repl in _CLEAN_STEPS:
+            if trigger in text:
+                text = pattern.sub(repl, text)
         return text.strip()
 
     def read_text_file(self, file_path: str) -> str:
@@ -146,19 +185,59 @@ class DocumentService:
 
         raise ValueError(f"Desteklenmeyen dosya türü: {suffix} — sadece .txt ve .md destekleniyor.")
 
+    def chunk_document(self, file_path) -> List[Tuple[int, str]]:
+        """
+        Dosyanın chunk'ları, (başlangıç offset'i, chunk) olarak. MarkdownChunker
+        chunk'ları başlık yolu önekli ve overlap'siz olduğu için offset'leri -1'dir.
+        token_budget varsa embedding modelinin sınırını aşan chunk'lar bölünür.
+        """
+        if self.markdown_chunker is not None and Path(file_path).suffix.lower() == ".md":
+            if not Path(file_path).exists():
+                raise FileNotFoundError(f"Dosya bulunamadı: {file_path}")
+            sections = self.markdown_chunker.sections(self.read_text_file(str(file_path)))
+            if self.token_budget is None:
+                return [(-1, _with_heading(head, body)) for head, body in sections]
+
+            # Başlık öneki her parçada tekrar eder; bütçenin yarısına kısaltılıp kalanından düşülür
+            heads, reserve = self.token_budget.shorten_headings([head for head, _ in sections])
+            fitted = self.token_budget.fit([body for _, body in sections], reserve)
+            return [
+                (-1, _with_heading(head, piece))
+                for head, pieces in zip(heads, fitted)
+                for _, piece in pieces
+            ]
+
+        chunks = self.split_with_offsets(self.read_document(file_path))
+        if self.token_budget is None:
+            return chunks
+        fitted = self.token_budget.fit([chunk for _, chunk in chunks])
+        return [
+            (start + offset, piece)
+            for (start, _), pieces in zip(chunks, fitted)
+            for offset, piece in pieces
+        ]
+
     def process_document(self, file_path):
         text = self.read_document(file_path)
         return self.text_splitter.split_text(text)
 
     def list_documents(self) -> List[str]:
         """
-        data/documents/ altındaki .txt ve .md dosyalarını listeler.
+        data/documents/ altındaki (alt klasörler dahil) .txt ve .md dosyalarını listeler.
         """
         if not self.documents_path.exists():
             return []
 
         docs = []
         for suffix in ("*.txt", "*.md"):
-            docs.extend(str(p) for p in self.documents_path.glob(suffix))
+            docs.extend(str(p) for p in self.documents_path.rglob(suffix))
+
+        return sorted(docs)  # tutarlı sıralama için
 
-        return sorted(docs)  # tutarlı sıralama için
\ No newline at end of file
+    def relative_source(self, file_path) -> str:
+        """Chunk kaynağı: documents klasörüne göre göreli yol (ör. "pydantic/api/fields.md")."""
+        path = Path(file_path).resolve()
+        try:
+            return path.relative_to(self.documents_path).as_posix()
+        except ValueError:
+            return path.name
@@ -0,0 +1,271 @@
+# app/services/ingestion.py
+"""
+RAGService için akışlı (bounded-memory) index build'i.
+
+Eski build tüm chunk'ları bir listede toplayıp korpusu tek `encode` çağrısıyla
+embed ediyordu; tepe bellek korpusla büyüyor, ilerleme görünmüyordu ve çöken
+bir build baştan başlıyordu. IngestionPipeline generator zinciri:
+
+    dosya -> temizle -> chunk'la -> etiketle -> INGEST_BATCH_SIZE'lık batch'ler
+          -> embed -> FAISS'e ekle -> chunk store'a (chunks.jsonl) append
+
+Her batch "commit" edilir: vektörler work_dir/vectors.f32'ye, kayıtlar
+chunks.jsonl'e eklenir, ardından checkpoint.json atomik olarak yazılır.
+Çökmeden sonra checkpoint'teki byte boyutlarına kırpılıp son commit edilen
+(dosya, ordinal)'dan devam edilir. faiss.index en son yazılır; index dosyası
+varsa build tamamlanmıştır.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChunkRecord:
+    source: str       # documents klasörüne göre göreli yol
+    chunk: str        # text chunk
+    ordinal: int = -1  # dosya içindeki sıra (0, 1, 2, ...)
+    start: int = -1    # temizlenmiş metindeki başlangıç offset'i (-1: bilinmiyor / MarkdownChunker)
+    family: str = ""   # fastapi | pydantic | general
+    framework: str = ""
+    topic: str = ""    # QueryAnalysis topic isimleri ya da "general"
+
+
+def read_store(path: Path) -> List[ChunkRecord]:
+    """chunks.jsonl: satır başına bir ChunkRecord."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [ChunkRecord(**json.loads(line)) for line in f if line.strip()]
+
+
+def _count_store(path: Path) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _batched(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        doc_service: Any,
+        tagger: Any,
+        embed: Callable[[List[str]], np.ndarray],
+        store_file: Path,
+        work_dir: Path,
+        batch_size: Optional[int] = None,
+        log_interval_s: Optional[float] = None,
+    ):
+        self.doc_service = doc_service
+        self.tagger = tagger
+        self.embed = embed
+        self.store_file = Path(store_file)
+        self.work_dir = Path(work_dir)
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.log_interval_s = settings.INGEST_LOG_INTERVAL_S if log_interval_s is None else log_interval_s
+
+        self.vectors_file = self.work_dir / "vectors.f32"
+        self.checkpoint_file = self.work_dir / "checkpoint.json"
+
+    # -------------------------
+    # Stream
+    # -------------------------
+    def iter_records(
+        self, files: List[str], resume_at: Tuple[int, int] = (0, -1)
+    ) -> Iterator[Tuple[Tuple[int, int], ChunkRecord]]:
+        """((dosya sırası, ordinal), ChunkRecord); resume_at'e kadarki chunk'lar atlanır."""
+        first_file, last_ordinal = resume_at
+        for file_idx in range(first_file, len(files)):
+            fp = files[file_idx]
+            source = self.doc_service.relative_source(fp)
+            for ordinal, (start, ch) in enumerate(self.doc_service.chunk_document(fp)):
+                if file_idx == first_file and ordinal <= last_ordinal:
+                    continue
+                record = ChunkRecord(
+                    source=source, chunk=ch, ordinal=ordinal, start=start, **self.tagger.tag(source, ch)
+                )
+                yield (file_idx, ordinal), record
+
+    def fingerprint(self, files: List[str]) -> str:
+        """Checkpoint yalnızca aynı dosyalar + aynı chunk'lama ayarlarıyla devam ettirilir."""
+        h = hashlib.sha1()
+        for fp in files:
+            st = os.stat(fp)
+            h.update(f"{fp}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        h.update(
+            json.dumps([
+                settings.EMBEDDING_MODEL,
+                settings.CHUNK_SIZE,
+                settings.CHUNK_OVERLAP,
+                settings.MARKDOWN_CHUNKER_ENABLED,
+                settings.MARKDOWN_MAX_CODE_CHUNK,
+                settings.EMBEDDING_TOKEN_AWARE_CHUNKS,
+                settings.EMBEDDING_MAX_TOKENS,
+            ]).encode("utf-8")
+        )
+        return h.hexdigest()
+
+    # -------------------------
+    # Checkpoint
+    # -------------------------
+    def _read_checkpoint(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        if not self.checkpoint_file.exists():
+            return None
+        try:
+            ckpt = json.loads(self.checkpoint_file.read_text(encoding="utf-8"))
+        except Exception:
+            logger.warning("Ingest checkpoint unreadable; starting over", exc_info=True)
+            return None
+        if ckpt.get("fingerprint") != fingerprint:
+            logger.info("Documents or chunking settings changed; discarding ingest checkpoint")
+            return None
+        if (
+            not self.store_file.exists()
+            or not self.vectors_file.exists()
+            or self.store_file.stat().st_size < ckpt["store_bytes"]
+            or self.vectors_file.stat().st_size < ckpt["vector_bytes"]
+        ):
+            logger.warning("Ingest files shorter than checkpoint; starting over")
+            return None
+        return ckpt
+
+    def _write_checkpoint(self, ckpt: Dict[str, Any]) -> None:
+        tmp = self.checkpoint_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(ckpt), encoding="utf-8")
+        os.replace(tmp, self.checkpoint_file)
+
+    def _restore(self, ckpt: Dict[str, Any]) -> Optional[Tuple[faiss.IndexFlatL2, int]]:
+        """Son commit'ten sonraki yarım yazılmış veriyi kırpar, index'i vektör dosyasından kurar."""
+        for path, size in ((self.store_file, ckpt["store_bytes"]), (self.vectors_file, ckpt["vector_bytes"])):
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+        dim = ckpt["dim"]
+        index = faiss.IndexFlatL2(dim)
+        rows = max(1, self.batch_size * 16)
+        with open(self.vectors_file, "rb") as f:
+            while True:
+                block = np.fromfile(f, dtype="float32", count=rows * dim)
+                if not block.size:
+                    break
+                index.add(block.reshape(-1, dim))
+        count = _count_store(self.store_file)
+        if index.ntotal != count:
+            logger.warning("Ingest checkpoint inconsistent (%d vectors, %d records); starting over",
+                           index.ntotal, count)
+            return None
+        return index, count
+
+    def discard(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    # -------------------------
+    # Run
+    # -------------------------
+    def run(self, index_file: Path) -> Tuple[Optional[faiss.IndexFlatL2], List[ChunkRecord]]:
+        """
+        Index'i build eder (ya da checkpoint'ten devam eder), faiss.index'i en son
+        yazar. Dönüş: (index, records); doküman ya da chunk yoksa (None, []).
+
+        Build sırasında chunk metinleri bellekte biriktirilmez (yalnızca chunks.jsonl'e
+        yazılır, records build bitince oradan okunur); sınırlı olan embedding çalışma
+        kümesidir. FAISS index'in kendisi (IndexFlatL2) vektör başına büyümeye devam eder.
+        """
+        files = self.doc_service.list_documents()
+        fingerprint = self.fingerprint(files)
+        # Eski / yarım index, store ile uyumsuz kalmasın
+        Path(index_file).unlink(missing_ok=True)
+        ckpt = self._read_checkpoint(fingerprint)
+        restored = self._restore(ckpt) if ckpt is not None else None
+
+        index: Optional[faiss.IndexFlatL2] = None
+        count = 0
+        resume_at = (0, -1)
+        if restored is not None:
+            index, count = restored
+            resume_at = (ckpt["file_index"], ckpt["ordinal"])
+            logger.info("Resuming ingest after %d chunks (file %d/%d)", count, resume_at[0] + 1, len(files))
+        else:
+            self.discard()
+            self.store_file.unlink(missing_ok=True)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+        t0 = last_log = time.perf_counter()
+        done = 0
+        with open(self.store_file, "ab") as store, open(self.vectors_file, "ab") as vectors:
+            for batch in _batched(self.iter_records(files, resume_at), self.batch_size):
+                emb = np.ascontiguousarray(self.embed([r.chunk for _, r in batch]), dtype="float32")
+                if index is None:
+                    index = faiss.IndexFlatL2(emb.shape[1])
+
+                vectors.write(emb.tobytes())
+                store.write(b"".join(
+                    json.dumps(asdict(r), ensure_ascii=False).encode("utf-8") + b"\n" for _, r in batch
+                ))
+                vectors.flush()
+                store.flush()
+                os.fsync(vectors.fileno())
+                os.fsync(store.fileno())
+
+                file_index, ordinal = batch[-1][0]
+                self._write_checkpoint({
+                    "fingerprint": fingerprint,
+                    "file_index": file_index,
+                    "ordinal": ordinal,
+                    "chunks": count + len(batch),
+                    "dim": int(emb.shape[1]),
+                    "store_bytes": store.tell(),
+                    "vector_bytes": vectors.tell(),
+                })
+                index.add(emb)
+                count += len(batch)
+                done += len(batch)
+
+                now = time.perf_counter()
+                if now - last_log >= self.log_interval_s:
+                    last_log = now
+                    logger.info(
+                        "Ingest: file %d/%d, %d chunks (%.1f chunks/s)",
+                        file_index + 1, len(files), count, done / max(now - t0, 1e-9),
+                    )
+
+        if index is None or not count:
+            self.discard()
+            self.store_file.unlink(missing_ok=True)
+            return None, []
+
+        tmp = Path(str(index_file) + ".tmp")
+        faiss.write_index(index, str(tmp))
+        os.replace(tmp, index_file)
+        self.discard()
+        records = read_store(self.store_file)
+
+        elapsed = time.perf_counter() - t0
+        logger.info(
+            "Ingest finished: %d files, %d chunks, %.1fs (%.1f chunks/s)",
+            len(files), count, elapsed, done / max(elapsed, 1e-9),
+        )
+        return index, records
@@ -0,0 +1,176 @@
+# app/services/jobs.py
+"""
+Uzun süren açıklamalar için asenkron job API.
+
+Proxy'ler idle bağlantıyı 60 s'de kesiyor; tam bir process_query daha uzun
+sürebilir. Bunun yerine:
+- POST /jobs job'u kuyruğa alır ve hemen id döner
+- JobRunner job'ları en fazla `concurrency` paralel çalıştırır
+- orchestrator stage başlangıç/bitişlerini job kaydına yazar (ilerleme)
+- GET /jobs/{id}?wait=..&since=.. long-poll: job değişene / bitene kadar bekler
+- biten job'lar sınırlı, TTL'li bir store'da tutulur
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_FINISHED = {"done", "failed", "cancelled"}
+
+
+class JobStoreFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    query: str
+    deadline_s: Optional[float] = None
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    version: int = 0
+    stages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED
+
+    def touch(self) -> None:
+        """Versiyonu artırır ve long-poll bekleyenleri uyandırır."""
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "query": self.query,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "version": self.version,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobStore:
+    """Sınırlı, TTL'li job store. Dolarsa önce süresi geçmiş, sonra en eski biten job atılır."""
+
+    def __init__(self, max_jobs: Optional[int] = None, ttl_s: Optional[float] = None):
+        self.max_jobs = max_jobs or settings.JOB_MAX_JOBS
+        self.ttl_s = ttl_s or settings.JOB_TTL_S
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _evict(self) -> None:
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished_at > self.ttl_s]:
+            del self._jobs[job_id]
+
+        if len(self._jobs) < self.max_jobs:
+            return
+        for job in list(self._jobs.values()):  # ekleme sırası = en eski önce
+            if job.finished:
+                del self._jobs[job.id]
+                if len(self._jobs) < self.max_jobs:
+                    return
+
+    def create(self, query: str, deadline_s: Optional[float] = None) -> Job:
+        self._evict()
+        if len(self._jobs) >= self.max_jobs:
+            raise JobStoreFull(f"{len(self._jobs)} jobs pending")
+        job = Job(id=uuid.uuid4().hex, query=query, deadline_s=deadline_s)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.finished and time.time() - job.finished_at > self.ttl_s:
+            del self._jobs[job_id]
+            return None
+        return job
+
+
+class JobRunner:
+    def __init__(self, orchestrator: Any, store: Optional[JobStore] = None, concurrency: Optional[int] = None):
+        self.orchestrator = orchestrator
+        self.store = store or JobStore()
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, query: str, deadline_s: Optional[float] = None) -> Job:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        job = self.store.create(query, deadline_s)
+        task = asyncio.create_task(self._run(job), name=f"job:{job.id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job) -> None:
+        def on_event(stage: str, trace: Dict[str, Any]) -> None:
+            job.stages[stage] = trace
+            job.touch()
+
+        try:
+            async with self._sem:
+                job.status = "running"
+                job.started_at = time.time()
+                job.touch()
+                job.result = await self.orchestrator.process_query(
+                    job.query, deadline_s=job.deadline_s, on_event=on_event
+                )
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error("Job %s failed", job.id, exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.touch()
+
+    async def wait(self, job: Job, timeout_s: float, since: Optional[int] = None) -> Job:
+        """
+        Long-poll: job bitene ya da versiyonu `since`'ı geçene kadar (since yoksa
+        sadece bitene kadar) en fazla timeout_s bekler.
+        """
+        deadline = time.monotonic() + min(timeout_s, settings.JOB_MAX_WAIT_S)
+        while not job.finished and (since is None or job.version <= since):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(job._changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        return job
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,206 @@
+# app/services/lexical_index.py
+"""
+FAISS index'inin yanında tutulan in-process BM25 inverted index.
+
+MiniLM benzerliği `WebSocketDisconnect`, `OAuth2PasswordBearer`,
+`model_validate` gibi birebir API isimlerini kaçırabiliyor. LexicalIndex
+chunk'ları identifier-farkındalıklı tokenize eder (tam isim + camelCase /
+snake_case parçaları) ve posting'leri CSR düzeninde numpy array'lerde tutar:
+
+    indptr[t] : indptr[t + 1]   -> term t'nin posting aralığı
+    doc_ids / weights           -> chunk index'i ve önceden hesaplanmış BM25 tf ağırlığı
+
+Sorgu, terim başına tek bir dilim + vektörel toplama olduğu için binlerce
+chunk'ta milisaniyenin altında kalır. Index `lexical.npz` olarak FAISS
+index'inin yanına kaydedilir.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# Sorguda birebir API ismi olduğunu gösteren kalıplar
+_API_NAME_RE = re.compile(r"\b(?:[a-z]+[A-Z]\w*|[A-Z][a-z]+[A-Z]\w*|\w+_\w+|\w+\.\w+|\w+\(\))")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it of on or so "
+    "that the this to use used using what when where which with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tam identifier (lowercase) + 2+ parçalıysa camelCase/snake_case parçaları."""
+    out: List[str] = []
+    for word in _IDENT_RE.findall(text or ""):
+        lower = word.lower()
+        if lower in _STOPWORDS:
+            continue
+        out.append(lower)
+        parts = [p.lower() for chunk in word.split("_") for p in _CAMEL_RE.findall(chunk)]
+        if len(parts) > 1:
+            out.extend(p for p in parts if p not in _STOPWORDS and len(p) > 1)
+    return out
+
+
+def corpus_fingerprint(texts: Iterable[str]) -> str:
+    """Chunk metinlerinin hash'i; kayıtlı lexical.npz'nin güncel chunk'larla eşleştiğini doğrular."""
+    h = hashlib.sha1()
+    for text in texts:
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def lexical_weight(query: str) -> float:
+    """Sorgu birebir API ismi içeriyorsa BM25 sonuçları füzyonda daha ağır basar."""
+    if _API_NAME_RE.search(query or ""):
+        return settings.HYBRID_IDENTIFIER_LEXICAL_WEIGHT
+    return settings.HYBRID_LEXICAL_WEIGHT
+
+
+class LexicalIndex:
+    def __init__(
+        self,
+        terms: List[str],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+        fingerprint: str = "",
+    ):
+        self.terms = terms
+        self.fingerprint = fingerprint  # corpus_fingerprint(chunk'lar); eski dosyalarda boş
+        self.vocab: Dict[str, int] = {t: i for i, t in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = settings.BM25_K1 if k1 is None else k1
+        self.b = settings.BM25_B if b is None else b
+        self._prepare()
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def _prepare(self) -> None:
+        n_docs = max(1, len(self.doc_len))
+        df = np.diff(self.indptr).astype("float32")
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype("float32")
+
+        avgdl = float(self.doc_len.mean()) if len(self.doc_len) else 1.0
+        dl = self.doc_len[self.doc_ids]
+        norm = self.k1 * (1.0 - self.b + self.b * dl / max(avgdl, 1e-6))
+        self.weights = (self.tfs * (self.k1 + 1.0) / (self.tfs + norm)).astype("float32")
+
+    # -------------------------
+    # Build / persist
+    # -------------------------
+    @classmethod
+    def build(cls, texts: Iterable[str], fingerprint: str = "") -> "LexicalIndex":
+        vocab: Dict[str, int] = {}
+        term_col: List[int] = []
+        doc_col: List[int] = []
+        tf_col: List[int] = []
+        lengths: List[int] = []
+
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                doc_col.append(doc)
+                tf_col.append(tf)
+
+        term_arr = np.asarray(term_col, dtype="int32")
+        # Stable sort: her term'in posting'leri doc sırasıyla kalır
+        order = np.argsort(term_arr, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype="int64")
+        np.cumsum(np.bincount(term_arr, minlength=len(vocab)), out=indptr[1:])
+
+        return cls(
+            terms=list(vocab),
+            indptr=indptr,
+            doc_ids=np.asarray(doc_col, dtype="int32")[order],
+            tfs=np.asarray(tf_col, dtype="float32")[order],
+            doc_len=np.asarray(lengths, dtype="float32"),
+            fingerprint=fingerprint,
+        )
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.asarray(self.terms, dtype=str),
+                indptr=self.indptr,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs,
+                doc_len=self.doc_len,
+                fingerprint=np.asarray(self.fingerprint, dtype=str),
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                terms=data["terms"].tolist(),
+                indptr=data["indptr"],
+                doc_ids=data["doc_ids"],
+                tfs=data["tfs"],
+                doc_len=data["doc_len"],
+                fingerprint=str(data["fingerprint"]) if "fingerprint" in data.files else "",
+            )
+
+    # -------------------------
+    # Search
+    # -------------------------
+    def search(self, query: str, k: int, candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        BM25 ile en iyi k chunk: [(chunk index, skor)], skora göre azalan.
+        candidates verilirse (ör. bir topic alt index'inin chunk id'leri) sadece onlar arasından.
+        """
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or k <= 0:
+            return []
+
+        scores = np.zeros(len(self.doc_len), dtype="float32")
+        for t in term_ids:
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            # Bir term'in posting'lerinde doc tekrar etmez; fancy-index += güvenli
+            scores[self.doc_ids[lo:hi]] += self.idf[t] * self.weights[lo:hi]
+
+        if candidates is not None:
+            hits = candidates[scores[candidates] > 0]
+        else:
+            hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+
+def rrf_fuse(
+    rankings: List[Tuple[List[int], float]],
+    k: int,
+    rrf_k: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """
+    Reciprocal rank fusion: her liste için weight / (rrf_k + rank).
+    rankings: [(sıralı chunk index'leri, ağırlık)]; dönüş: [(chunk index, füzyon skoru)].
+    """
+    rrf_k = rrf_k or settings.RRF_K
+    fused: Dict[int, float] = {}
+    for ranked, weight in rankings:
+        for rank, idx in enumerate(ranked, 1):
+            fused[idx] = fused.get(idx, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda x: -x[1])[:k]
@@ -2,10 +2,14 @@
 LLM Service - Ollama (Multi-Agent Compatible)
 """
 
+import asyncio
+import json
 import logging
+import httpx
 import requests
-from typing import Optional
+from typing import Any, Dict, Optional
 from app.config import settings
+from app.orchestrator.deadline import remaining_time
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,35 @@ logger = logging.getLogger(__name__)
 class LLMService:
     def __init__(self, base_url: Optional[str] = None):
         self.base_url = (base_url or settings.OLLAMA_BASE_URL).rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _payload(
+        self,
+        prompt: str,
+        model: Optional[str],
+        temperature: Optional[float],
+        stream: bool,
+        max_tokens: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "model": model or settings.OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": temperature or settings.TEMPERATURE,
+                "num_predict": max_tokens or settings.MAX_TOKENS,
+                "num_ctx": settings.OLLAMA_NUM_CTX,
+            }
+        }
+
+    @staticmethod
+    def _timeout() -> float:
+        # Aktif stage bütçesini aşma
+        timeout = settings.OLLAMA_TIMEOUT
+        budget = remaining_time()
+        if budget is not None:
+            timeout = max(0.1, min(timeout, budget))
+        return timeout
 
     def generate(
         self,
@@ -32,26 +65,14 @@ class LLMService:
             str: LLM yanıtı
         """
 
-        selected_model = model or settings.OLLAMA_MODEL
-        selected_temp = temperature or settings.TEMPERATURE
-
         url = f"{self.base_url}/api/generate"
-
-        payload = {
-            "model": selected_model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": selected_temp,
-                "num_predict": settings.MAX_TOKENS,
-            }
-        }
+        payload = self._payload(prompt, model, temperature, stream=False)
 
         try:
             response = requests.post(
                 url,
                 json=payload,
-                timeout=settings.OLLAMA_TIMEOUT
+                timeout=self._timeout()
             )
 
             response.raise_for_status()
@@ -63,6 +84,59 @@ class LLMService:
             logger.error("Ollama LLM çağrısı başarısız", exc_info=True)
             raise RuntimeError("LLM servisi ile iletişim kurulamadı") from e
 
+    async def agenerate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """
+        generate() ile aynı sözleşme; ama stream üzerinden, iptal edilebilir.
+
+        Çağıran task iptal edilirse (ör. client bağlantıyı kapattı) HTTP stream'i
+        kapatılır; Ollama bağlantı kopunca üretimi durdurur, inference kapasitesi
+        boşa harcanmaz. Stage bütçesi dolarsa asyncio.TimeoutError yükselir.
+        max_tokens verilirse num_predict'i (MAX_TOKENS) o çağrı için düşürür.
+        """
+        payload = self._payload(prompt, model, temperature, stream=True, max_tokens=max_tokens)
+
+        try:
+            return await asyncio.wait_for(self._stream(payload), timeout=self._timeout())
+        except asyncio.CancelledError:
+            logger.info("LLM çağrısı iptal edildi; Ollama stream'i kapatıldı")
+            raise
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            logger.error("Ollama LLM çağrısı başarısız", exc_info=True)
+            raise RuntimeError("LLM servisi ile iletişim kurulamadı") from e
+
+    async def _stream(self, payload: Dict[str, Any]) -> str:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(settings.OLLAMA_TIMEOUT, connect=10.0),
+            )
+
+        parts = []
+        # `async with` çıkışında (iptal dahil) response ve bağlantı kapanır
+        async with self._client.stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama hatası: {chunk['error']}")
+                parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    break
+        return "".join(parts)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     # Backward compatibility (eski kod kırılmasın diye)
     def chat(self, message: str) -> str:
         return self.generate(message)
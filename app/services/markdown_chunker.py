@@ -0,0 +1,226 @@
+# app/services/markdown_chunker.py
+"""
+Yapıya duyarlı markdown chunker.
+
+SimpleTextSplitter temizlenmiş metni her CHUNK_SIZE karakterde keser; kod
+örnekleri ve başlıklar ortadan bölünür. MarkdownChunker ham markdown'ı
+başlık bölümlerine ve fenced code block'lara ayırır:
+
+- Her chunk başlık yolu ile başlar ("Request Body > Create your data model")
+- Bölüm sınırı chunk sınırıdır; çok küçük bölümler sonraki bölümle birleşir
+- Kod blokları bölünmez; MARKDOWN_MAX_CODE_CHUNK'ı aşanlar yalnızca
+  top-level statement sınırlarından parçalanır
+- Düz metin blokları DocumentService._clean_markdown ile temizlenir; kod
+  blokları olduğu gibi (fence'siz) kalır
+"""
+from __future__ import annotations
+
+import ast
+import re
+import textwrap
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_ANCHOR_RE = re.compile(r"\s*\{\s*#[^}]*\}\s*$")
+_FENCE_RE = re.compile(r"^(\s*)(`{3,}|~{3,})(.*)$")
+# {!> ../docs_src/x.py !} ve {* ../docs_src/x.py hl[3] *} — içeriği olmayan include referansları
+_INCLUDE_RE = re.compile(r"^\s*(\{!>.*?!\}|\{\*.*?\*\})\s*$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?:])\s+")
+
+
+@dataclass
+class Block:
+    kind: str                    # "text" | "code"
+    text: str
+    headings: Tuple[str, ...]    # bloğun bulunduğu bölümün başlık yolu
+
+
+class MarkdownChunker:
+    def __init__(
+        self,
+        chunk_size: int = 600,
+        max_code_size: int = 1500,
+        clean: Optional[Callable[[str], str]] = None,
+    ):
+        self.chunk_size = chunk_size
+        self.max_code_size = max(max_code_size, chunk_size)
+        self.clean = clean or (lambda s: s.strip())
+
+    # -------------------------
+    # Parse
+    # -------------------------
+    def parse(self, raw: str) -> List[Block]:
+        blocks: List[Block] = []
+        path: List[Tuple[int, str]] = []   # (seviye, başlık)
+        para: List[str] = []
+
+        def headings() -> Tuple[str, ...]:
+            return tuple(title for _, title in path)
+
+        def flush_para() -> None:
+            if para:
+                text = self.clean("\n".join(para))
+                if text:
+                    blocks.append(Block("text", text, headings()))
+                para.clear()
+
+        lines = raw.splitlines()
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            fence = _FENCE_RE.match(line)
+            if fence:
+                flush_para()
+                marker = fence.group(2)
+                close = re.compile(r"^\s*" + re.escape(marker[0]) + "{" + str(len(marker)) + r",}\s*$")
+                body: List[str] = []
+                i += 1
+                while i < len(lines) and not close.match(lines[i]):
+                    body.append(lines[i])
+                    i += 1
+                i += 1  # kapanış fence'i (dosya sonunda kapanmamışsa da sorun yok)
+                code = textwrap.dedent("\n".join(l for l in body if not _INCLUDE_RE.match(l))).strip("\n")
+                if code.strip():
+                    blocks.append(Block("code", code, headings()))
+                continue
+
+            heading = _HEADING_RE.match(line)
+            if heading:
+                flush_para()
+                level = len(heading.group(1))
+                title = self.clean(_ANCHOR_RE.sub("", heading.group(2)))
+                while path and path[-1][0] >= level:
+                    path.pop()
+                if title:
+                    path.append((level, title))
+            elif not line.strip():
+                flush_para()
+            elif not _INCLUDE_RE.match(line):
+                para.append(line)
+            i += 1
+
+        flush_para()
+        return blocks
+
+    # -------------------------
+    # Chunk
+    # -------------------------
+    def chunk(self, raw: str) -> List[str]:
+        return [f"{head}\n\n{body}" if head else body for head, body in self.sections(raw)]
+
+    def sections(self, raw: str) -> List[Tuple[str, str]]:
+        """chunk() ile aynı parçalar, (başlık yolu öneki, gövde) olarak."""
+        chunks: List[Tuple[str, str]] = []
+        prefix: Tuple[str, ...] = ()    # chunk'ın başlık yolu
+        section: Tuple[str, ...] = ()   # son bloğun bölümü
+        parts: List[str] = []
+        size = 0
+
+        def flush() -> None:
+            nonlocal parts, size
+            if parts:
+                chunks.append((" > ".join(prefix), "\n\n".join(parts)))
+            parts, size = [], 0
+
+        for block in self.parse(raw):
+            if block.headings != section:
+                section = block.headings
+                if parts and size < self.chunk_size // 3:
+                    # Küçük bölüm tek başına chunk olmasın; yeni bölüm başlığıyla devam et
+                    title = block.headings[-1] if block.headings else ""
+                    if title:
+                        parts.append(title)
+                        size += len(title) + 2
+                else:
+                    flush()
+                    prefix = block.headings
+
+            for unit in self._units(block):
+                if parts and size + len(unit) > self.chunk_size:
+                    flush()
+                    prefix = block.headings
+                parts.append(unit)
+                size += len(unit) + 2
+
+        flush()
+        return chunks
+
+    def _units(self, block: Block) -> List[str]:
+        """Bloğu chunk'a girecek parçalara ayırır: kod bütün, uzun metin cümle sınırından."""
+        if block.kind == "code":
+            if len(block.text) <= self.max_code_size:
+                return [block.text]
+            return split_code(block.text, self.max_code_size)
+        if len(block.text) <= self.chunk_size:
+            return [block.text]
+
+        # Önce satır (liste maddesi) sınırları, satır sığmıyorsa cümle sınırları
+        pieces: List[str] = []
+        for line in block.text.split("\n"):
+            pieces.extend([line] if len(line) <= self.chunk_size else _SENTENCE_RE.split(line))
+
+        units: List[str] = []
+        current = ""
+        for piece in pieces:
+            while len(piece) > self.chunk_size:
+                # Tek cümle bile sığmıyorsa sert kes
+                if current:
+                    units.append(current)
+                    current = ""
+                units.append(piece[: self.chunk_size])
+                piece = piece[self.chunk_size :]
+            if current and len(current) + len(piece) + 1 > self.chunk_size:
+                units.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+        if current.strip():
+            units.append(current.strip())
+        return units
+
+
+def split_code(code: str, limit: int) -> List[str]:
+    """
+    Büyük kod bloğunu top-level statement sınırlarından (decorator'lar ve
+    önündeki yorumlar statement'la birlikte) limit'i aşmayan parçalara böler.
+    Tek statement limit'ten büyükse bölünmeden kalır.
+    """
+    lines = code.split("\n")
+    starts = _statement_starts(code, lines)
+
+    # Statement'tan önceki yorum / boş satırlar o statement'a aittir
+    bounds = []
+    for s in starts:
+        while s > 0 and (not lines[s - 1].strip() or lines[s - 1].startswith("#")) and (s - 1) not in bounds:
+            s -= 1
+        bounds.append(s)
+    bounds = sorted(set([0] + bounds)) + [len(lines)]
+
+    pieces: List[str] = []
+    current: List[str] = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        segment = lines[lo:hi]
+        if current and sum(len(l) + 1 for l in current + segment) > limit:
+            pieces.append("\n".join(current).strip("\n"))
+            current = []
+        current.extend(segment)
+    if current:
+        pieces.append("\n".join(current).strip("\n"))
+    return [p for p in pieces if p.strip()]
+
+
+def _statement_starts(code: str, lines: List[str]) -> List[int]:
+    """Top-level statement'ların (decorator dahil) 0-tabanlı başlangıç satırları."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        # Python değil ya da eksik örnek: girintisiz satırlar statement başı sayılır
+        return [
+            i for i, line in enumerate(lines)
+            if line.strip() and not line[0].isspace() and line[0] not in ")]}"
+        ]
+    starts = []
+    for node in tree.body:
+        first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        starts.append(first - 1)
+    return starts
@@ -1,6 +1,8 @@
 # app/services/model_selector.py
 from __future__ import annotations
 
+from typing import Optional
+
 from app.config import settings
 
 
@@ -9,13 +11,28 @@ class ModelSelector:
     Basit ama iş gören routing:
     - classify / kısa işler -> FAST
     - explain / deep / uzun input -> POWERFUL
+    - kalan zaman bütçesi kısaysa her durumda FAST
+    - planner yeterli güven bulduysa (prefer_fast) FAST
     """
 
     @staticmethod
-    def select_model(task_type: str, input_length: int, reasoning_depth: str) -> str:
+    def select_model(
+        task_type: str,
+        input_length: int,
+        reasoning_depth: str,
+        time_budget_s: Optional[float] = None,
+        prefer_fast: bool = False,
+    ) -> str:
         task_type = (task_type or "").lower()
         reasoning_depth = (reasoning_depth or "shallow").lower()
 
+        # Deadline yaklaşıyorsa büyük modeli bekleyecek vakit yok
+        if time_budget_s is not None and time_budget_s < settings.FAST_MODEL_BUDGET_S:
+            return settings.FAST_MODEL
+
+        if prefer_fast:
+            return settings.FAST_MODEL
+
         # Agent bazlı net kural (en garantisi)
         if reasoning_depth == "deep":
             return settings.POWERFUL_MODEL
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import threading
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 
@@ -8,13 +8,35 @@ import faiss
 import numpy as np
 
 from app.config import settings
+from app.services.chunk_sizer import EmbeddingTokenBudget
+from app.services.chunk_tagger import ChunkTagger
 from app.services.document_service import DocumentService
+from app.services.ingestion import ChunkRecord, IngestionPipeline, read_store
+from app.services.lexical_index import LexicalIndex, corpus_fingerprint, lexical_weight, rrf_fuse
 
 
-@dataclass
-class ChunkRecord:
-    source: str       # filename
-    chunk: str        # text chunk
+def _join(left: Dict[str, Any], right: Dict[str, Any], max_overlap: int) -> str:
+    """
+    Ardışık iki chunk'ı overlap'i bir kez içerecek şekilde birleştirir.
+    Offset'ler varsa overlap onlardan hesaplanır; yoksa (eski index) left'in
+    sonu ile right'ın başı arasındaki en uzun ortak parça aranır.
+    MarkdownChunker chunk'ları aynı başlık yolu önekiyle başlıyorsa önek bir kez kalır.
+    """
+    a, b = left["chunk"], right["chunk"]
+    if left.get("start", -1) >= 0 and right.get("start", -1) >= 0:
+        overlap = left["start"] + len(a) - right["start"]
+        if overlap <= 0:
+            return a + "\n" + b
+        return a + b[overlap:]
+
+    head, sep, rest = b.partition("\n\n")
+    if sep and a.startswith(head + sep):
+        return a + "\n\n" + rest
+
+    for n in range(min(max_overlap, len(a), len(b)), 0, -1):
+        if a.endswith(b[:n]):
+            return a + b[n:]
+    return a + "\n" + b
 
 
 class RAGService:
@@ -23,25 +45,53 @@ class RAGService:
     - data/documents altındaki dokümanları chunk'lar
     - FAISS index oluşturur / yükler
     - search(query) -> en alakalı chunk'ları döndürür
+    - HYBRID_SEARCH_ENABLED ise BM25 (LexicalIndex) sonuçlarıyla RRF füzyonu
+    - topic etiketli chunk'lardan alt index'ler; topic'i bilinen sorgu önce orada aranır
     """
-    def __init__(self, embedding_model, top_k: Optional[int] = None):
+    def __init__(self, embedding_model, top_k: Optional[int] = None, reranker: Any = None):
         self.embedding_model = embedding_model
         self.top_k = top_k or settings.TOP_K_RESULTS
+        # Opsiyonel CrossEncoderReranker: RERANK_CANDIDATES aday içinden en iyi k
+        self.reranker = reranker
 
         self.doc_service = DocumentService(
             documents_path=settings.DOCUMENTS_PATH,
             chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP
+            chunk_overlap=settings.CHUNK_OVERLAP,
+            structured_markdown=settings.MARKDOWN_CHUNKER_ENABLED,
+            max_code_chunk=settings.MARKDOWN_MAX_CODE_CHUNK,
+            token_budget=(
+                EmbeddingTokenBudget.from_model(embedding_model)
+                if settings.EMBEDDING_TOKEN_AWARE_CHUNKS else None
+            ),
         )
 
         self.index: Optional[faiss.IndexFlatL2] = None
         self.records: List[ChunkRecord] = []   # index -> chunk mapping
+        # (source, ordinal) -> records index; komşu chunk'lara erişim için
+        self._by_position: Dict[Tuple[str, int], int] = {}
+        # Index yeniden build/yüklenince değişir; stage memo invalidation'ı için
+        self.index_version: str = ""
 
         self.vdb_path = Path(settings.VECTOR_DB_PATH).resolve()
         self.vdb_path.mkdir(parents=True, exist_ok=True)
 
         self.index_file = self.vdb_path / "faiss.index"
-        self.meta_file = self.vdb_path / "chunks.npy"  # basit persist
+        # Append-only chunk store (satır başına ChunkRecord); chunks.npy eski index'lerden okunur
+        self.store_file = self.vdb_path / "chunks.jsonl"
+        self.meta_file = self.vdb_path / "chunks.npy"
+        self.ingest_dir = self.vdb_path / "ingest"  # build checkpoint'i
+        self.lexical_file = self.vdb_path / "lexical.npz"
+        self.lexical: Optional[LexicalIndex] = None
+
+        self.tagger = ChunkTagger()
+        # topic -> (alt IndexFlatL2, alt index sırası -> global chunk id)
+        self.partitions: Dict[str, Tuple[faiss.IndexFlatL2, np.ndarray]] = {}
+
+        # search() to_thread'den eşzamanlı çağrılır; build/load tek thread'de yapılır
+        # ve index + lexical + partitions hazır olunca _ready ile yayınlanır
+        self._index_lock = threading.Lock()
+        self._ready = False
 
 
     def _embed(self, texts: List[str]) -> np.ndarray:
@@ -50,90 +100,352 @@ class RAGService:
 
 
     def ensure_index(self) -> None:
-        """Index yoksa yükle; yoksa build et."""
-        if self.index is not None and self.records:
+        """
+        Index yoksa yükle; yoksa build et. Thread-safe (double-checked lock):
+        cold start'ta eşzamanlı aramalar tek bir build'i bekler, yarım durumu görmez.
+        """
+        if self._ready:
             return
-
-        if self.index_file.exists() and self.meta_file.exists():
+        with self._index_lock:
+            if self._ready:
+                return
+            self._prepare_index()
+            self._ready = self.index is not None and bool(self.records)
+
+    def _prepare_index(self) -> None:
+        if self.index_file.exists() and (self.store_file.exists() or self.meta_file.exists()):
             self._load()
+        else:
+            self._build_from_documents()
+        self._index_positions()
+        if settings.HYBRID_SEARCH_ENABLED:
+            self._ensure_lexical()
+        if settings.RAG_PARTITIONS_ENABLED:
+            self._build_partitions()
+        self._refresh_version()
+
+
+    def _build_partitions(self) -> None:
+        """
+        Topic etiketlerine göre alt IndexFlatL2'ler (vektörler ana index'ten alınır,
+        diske yazılmaz). RAG_PARTITION_MIN_CHUNKS'tan küçük topic'ler global'de kalır.
+        """
+        self.partitions = {}
+        if self.index is None or not self.records:
             return
 
-        self._build_from_documents()
-        self._save()
-
+        by_topic: Dict[str, List[int]] = {}
+        for i, r in enumerate(self.records):
+            if r.topic and r.topic != "general":
+                by_topic.setdefault(r.topic, []).append(i)
 
-    def _build_from_documents(self) -> None:
-        files = self.doc_service.list_documents()
-        if not files:
-            # boş kalabilir; Agent 2 bunu handle eder
-            self.index = None
-            self.records = []
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        for topic, ids in by_topic.items():
+            if len(ids) < settings.RAG_PARTITION_MIN_CHUNKS:
+                continue
+            ids_arr = np.asarray(ids, dtype="int64")
+            sub = faiss.IndexFlatL2(self.index.d)
+            sub.add(vectors[ids_arr])
+            self.partitions[topic] = (sub, ids_arr)
+
+
+    def _ensure_lexical(self) -> None:
+        """
+        Kayıtlı BM25 index'ini yükler; yoksa ya da chunk'lar değiştiyse (fingerprint
+        tutmuyorsa; aynı sayıda chunk'la rebuild dahil) records'tan kurar.
+        """
+        if not self.records:
+            self.lexical = None
             return
+        fingerprint = corpus_fingerprint(r.chunk for r in self.records)
+        if self.lexical_file.exists():
+            lexical = LexicalIndex.load(self.lexical_file)
+            if lexical.fingerprint == fingerprint and len(lexical) == len(self.records):
+                self.lexical = lexical
+                return
+        self.lexical = LexicalIndex.build((r.chunk for r in self.records), fingerprint)
+        self.lexical.save(self.lexical_file)
 
-        all_chunks: List[str] = []
-        all_records: List[ChunkRecord] = []
 
-        for fp in files:
-            text = self.doc_service.read_document(fp)
-            chunks = self.doc_service.split_text(text)
-            filename = Path(fp).name
+    def _index_positions(self) -> None:
+        self._by_position = {(r.source, r.ordinal): i for i, r in enumerate(self.records)}
 
-            for ch in chunks:
-                all_chunks.append(ch)
-                all_records.append(ChunkRecord(source=filename, chunk=ch))
 
-        if not all_chunks:
-            self.index = None
-            self.records = []
+    def _refresh_version(self) -> None:
+        if self.index is None or not self.index_file.exists():
+            self.index_version = "empty"
             return
+        st = self.index_file.stat()
+        self.index_version = f"{self.index.ntotal}-{st.st_mtime_ns}"
 
-        embeddings = self._embed(all_chunks)
-        dim = embeddings.shape[1]
-
-        index = faiss.IndexFlatL2(dim)
-        index.add(embeddings)
-
-        self.index = index
-        self.records = all_records
 
-
-    def _save(self) -> None:
-        if self.index is None:
-            return
-        faiss.write_index(self.index, str(self.index_file))
-
-        # records'u basitçe (source, chunk) array olarak sakla
-        arr = np.array([(r.source, r.chunk) for r in self.records], dtype=object)
-        np.save(self.meta_file, arr, allow_pickle=True)
+    def _build_from_documents(self) -> None:
+        """
+        Akışlı build (IngestionPipeline): chunk'lar INGEST_BATCH_SIZE'lık batch'lerle
+        embed edilip index'e ve chunks.jsonl'e eklenir; yarım kalan build checkpoint'ten devam eder.
+        """
+        self.meta_file.unlink(missing_ok=True)
+        # Eski chunk'lara ait BM25 index'i yeni build'le karışmasın
+        self.lexical_file.unlink(missing_ok=True)
+        pipeline = IngestionPipeline(
+            doc_service=self.doc_service,
+            tagger=self.tagger,
+            embed=self._embed,
+            store_file=self.store_file,
+            work_dir=self.ingest_dir,
+        )
+        # boş kalabilir (index None); Agent 2 bunu handle eder
+        self.index, self.records = pipeline.run(self.index_file)
 
 
     def _load(self) -> None:
         self.index = faiss.read_index(str(self.index_file))
-        arr = np.load(self.meta_file, allow_pickle=True)
-        self.records = [ChunkRecord(source=s, chunk=c) for (s, c) in arr.tolist()]
-
+        if self.store_file.exists():
+            self.records = read_store(self.store_file)
+            return
 
-    def search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        arr = np.load(self.meta_file, allow_pickle=True)
+        records: List[ChunkRecord] = []
+        ordinals: Dict[str, int] = {}
+        for row in arr.tolist():
+            if isinstance(row, dict):
+                records.append(ChunkRecord(**row))
+                continue
+            # Eski format: chunk'lar dosya sırasıyla kaydedildi; ordinal sıradan türetilir
+            s, c = row
+            ordinal = ordinals.get(s, 0)
+            ordinals[s] = ordinal + 1
+            records.append(ChunkRecord(source=s, chunk=c, ordinal=ordinal))
+
+        # Etiketsiz (eski) kayıtlar yüklenirken etiketlenir
+        for r in records:
+            if not r.topic:
+                tags = self.tagger.tag(r.source, r.chunk)
+                r.family, r.framework, r.topic = tags["family"], tags["framework"], tags["topic"]
+        self.records = records
+
+
+    def search(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        lexical_query: Optional[str] = None,
+        partition: Optional[str] = None,
+        variants: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        lexical_queries = [lexical_query] if lexical_query is not None else None
+        variant_lists = [variants] if variants else None
+        return self.search_many([query], k, lexical_queries, [partition], variant_lists)[0]
+
+
+    def search_many(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        lexical_queries: Optional[List[str]] = None,
+        partitions: Optional[List[Optional[str]]] = None,
+        variants: Optional[List[List[str]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Birden çok query için tek `encode` + hedef index başına tek FAISS `search`.
+        Sonuç query sırasıyla hizalı listelerdir.
+
+        variants: sorgu başına ek ifadeler (ham soru, topic + subtopic, ...). Tüm
+        ifadeler aynı encode ve aynı matris aramasına girer; bir sorgunun
+        ifadelerinin hit'leri RAG_MULTI_QUERY_FUSION ("max" | "rrf") ile birleştirilir.
+
+        Hybrid modda vektör ve BM25 aramaları HYBRID_CANDIDATES genişliğinde yapılıp
+        RRF ile birleştirilir. lexical_queries BM25 tarafının sorgularıdır (ör. ham
+        kullanıcı sorusu + keyword'ler); verilmezse queries kullanılır.
+
+        partitions: sorgu başına topic (QueryAnalysis.topic). O topic'in alt index'i
+        varsa arama (BM25 dahil) onunla sınırlanır; yoksa global index kullanılır.
+        """
         self.ensure_index()
 
-        if self.index is None or not self.records:
+        if not queries:
             return []
+        if self.index is None or not self.records:
+            return [[] for _ in queries]
 
         k = k or self.top_k
-        query_emb = self._embed([query])
-        distances, indices = self.index.search(query_emb, k)
-
+        hybrid = self.lexical is not None
+        # Rerank varsa önce daha geniş bir aday penceresi seçilir
+        keep = max(k, settings.RERANK_CANDIDATES) if self.reranker is not None else k
+        window = max(keep, settings.HYBRID_CANDIDATES) if hybrid else keep
+
+        # Sorgu başına ifadeler (ana sorgu önce, tekrarlar atılır) -> tek encode
+        texts: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        for row, q in enumerate(queries):
+            extra = variants[row] if variants and row < len(variants) else []
+            phrases = list(dict.fromkeys(p for p in [q, *extra] if p and p.strip())) or [q]
+            spans.append((len(texts), len(texts) + len(phrases)))
+            texts.extend(phrases)
+        query_emb = self._embed(texts)
+
+        # Sorgular hedef index'e göre gruplanır; grup başına tek matris araması
+        groups: Dict[Optional[str], List[int]] = {}
+        for row in range(len(queries)):
+            part = partitions[row] if partitions else None
+            groups.setdefault(part if part in self.partitions else None, []).append(row)
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for part, rows in groups.items():
+            index, ids = self.partitions[part] if part is not None else (self.index, None)
+            emb_rows = [i for row in rows for i in range(*spans[row])]
+            distances, indices = index.search(query_emb[emb_rows], window)
+            if ids is not None:
+                # Alt index sırası -> global chunk id
+                indices = np.where(indices >= 0, ids[np.maximum(indices, 0)], -1)
+            pos = {e: j for j, e in enumerate(emb_rows)}
+
+            for row in rows:
+                lo, hi = spans[row]
+                ranked, vec_dist = self._fuse_variants(
+                    [(distances[pos[e]], indices[pos[e]]) for e in range(lo, hi)]
+                )
+                text_query = lexical_queries[row] if lexical_queries else queries[row]
+                if hybrid:
+                    out = self._fuse(query_emb[lo:hi], ranked, vec_dist, text_query, window, keep, ids)
+                else:
+                    out = [self._hit(idx, vec_dist[idx], rank) for rank, idx in enumerate(ranked[:keep], 1)]
+                if hi - lo > 1:
+                    for h in out:
+                        h["variants"] = hi - lo
+                if self.reranker is not None:
+                    out = self.reranker.rerank(text_query, out, k)
+                if settings.RAG_EXPAND_NEIGHBORS > 0:
+                    out = self.expand_neighbors(out, settings.RAG_EXPAND_NEIGHBORS)
+                if settings.RAG_MERGE_ADJACENT:
+                    out = self.merge_adjacent(out)
+                for h in out:
+                    h["partition"] = part or "global"
+                results[row] = out
+        return results
+
+
+    def _fuse_variants(
+        self, per_variant: List[Tuple[np.ndarray, np.ndarray]]
+    ) -> Tuple[List[int], Dict[int, float]]:
+        """
+        Bir sorgunun ifadelerinin FAISS sonuçlarını birleştirir.
+        Dönüş: (sıralı chunk id'leri, chunk id -> en küçük mesafe).
+        "max": en iyi benzerliğe göre; "rrf": ifadelerdeki sıralara göre.
+        """
+        vec_dist: Dict[int, float] = {}
+        rankings: List[Tuple[List[int], float]] = []
+        for distances, indices in per_variant:
+            ranked = []
+            for idx, dist in zip(indices, distances):
+                idx = int(idx)
+                if idx < 0 or idx >= len(self.records):
+                    continue
+                ranked.append(idx)
+                if idx not in vec_dist or dist < vec_dist[idx]:
+                    vec_dist[idx] = float(dist)
+            rankings.append((ranked, 1.0))
+
+        if len(rankings) == 1:
+            return rankings[0][0], vec_dist
+        if settings.RAG_MULTI_QUERY_FUSION == "rrf":
+            return [idx for idx, _ in rrf_fuse(rankings, len(vec_dist))], vec_dist
+        return sorted(vec_dist, key=vec_dist.get), vec_dist
+
+
+    def _fuse(
+        self,
+        query_vecs: np.ndarray,
+        ranked: List[int],
+        vec_dist: Dict[int, float],
+        lexical_query: str,
+        window: int,
+        k: int,
+        candidates: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """Vektör + BM25 sıralamalarını sorgu başına ağırlıklarla RRF'de birleştirir."""
+        lexical = self.lexical.search(lexical_query, window, candidates)
+        bm25 = dict(lexical)
+
+        fused = rrf_fuse(
+            [(ranked[:window], 1.0), ([i for i, _ in lexical], lexical_weight(lexical_query))],
+            k,
+        )
         out: List[Dict[str, Any]] = []
-        for rank, idx in enumerate(indices[0]):
-            if idx < 0 or idx >= len(self.records):
-                continue
-            dist = float(distances[0][rank])
-            rec = self.records[idx]
-            out.append({
-                "file": rec.source,
-                "chunk": rec.chunk,
-                "distance": dist,
-                "relevance": 1.0 / (1.0 + dist),
-                "rank": rank + 1,
-            })
+        for rank, (idx, score) in enumerate(fused, 1):
+            dist = vec_dist.get(idx)
+            if dist is None:
+                # Sadece BM25'in bulduğu chunk: relevance yine embedding mesafesinden
+                vec = self.index.reconstruct(idx)
+                dist = float(np.min(np.sum((query_vecs - vec) ** 2, axis=1)))
+            hit = self._hit(idx, dist, rank)
+            hit["rrf"] = score
+            if idx in bm25:
+                hit["bm25"] = bm25[idx]
+            out.append(hit)
+        return out
+
+
+    def _hit(self, idx: int, dist: float, rank: int) -> Dict[str, Any]:
+        rec = self.records[idx]
+        return {
+            "file": rec.source,
+            "tags": {"family": rec.family, "framework": rec.framework, "topic": rec.topic},
+            "chunk": rec.chunk,
+            "distance": dist,
+            "relevance": 1.0 / (1.0 + dist),
+            "rank": rank,
+            "ordinal": rec.ordinal,
+            "start": rec.start,
+        }
+
+
+    def expand_neighbors(self, hits: List[Dict[str, Any]], window: int) -> List[Dict[str, Any]]:
+        """
+        Small-to-big: her hit'e dosyadaki ±window komşu chunk'ları ekler.
+        Komşular hit'in skorunu taşır; zaten sonuçta olanlar tekrar eklenmez.
+        """
+        seen = {(h["file"], h["ordinal"]) for h in hits}
+        out = list(hits)
+        for h in hits:
+            for ordinal in range(h["ordinal"] - window, h["ordinal"] + window + 1):
+                idx = self._by_position.get((h["file"], ordinal))
+                if idx is None or (h["file"], ordinal) in seen:
+                    continue
+                seen.add((h["file"], ordinal))
+                out.append(self._hit(idx, h["distance"], h["rank"]))
         return out
+
+
+    def merge_adjacent(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Aynı dosyanın ardışık (ordinal'leri komşu) chunk'larını overlap'i çıkarılmış
+        tek span'a birleştirir. Span en iyi parçasının skorunu/rank'ini alır;
+        sonuç rank sırasıyla döner.
+        """
+        by_file: Dict[str, List[Dict[str, Any]]] = {}
+        merged: List[Dict[str, Any]] = []
+        for h in hits:
+            if h.get("ordinal", -1) < 0:
+                merged.append(dict(h, ordinals=[]))  # konumu bilinmiyor: tek başına kalır
+            else:
+                by_file.setdefault(h["file"], []).append(h)
+
+        for group in by_file.values():
+            group.sort(key=lambda h: h["ordinal"])
+            span = dict(group[0], ordinals=[group[0]["ordinal"]])
+            for h in group[1:]:
+                if h["ordinal"] == span["ordinals"][-1] + 1:
+                    span["chunk"] = _join(span, h, settings.CHUNK_OVERLAP)
+                    span["ordinals"].append(h["ordinal"])
+                    span["start"] = span["start"] if span["start"] >= 0 and h["start"] >= 0 else -1
+                    if h["distance"] < span["distance"]:
+                        span.update(distance=h["distance"], relevance=h["relevance"])
+                    span["rank"] = min(span["rank"], h["rank"])
+                else:
+                    merged.append(span)
+                    span = dict(h, ordinals=[h["ordinal"]])
+            merged.append(span)
+
+        merged.sort(key=lambda h: (h["rank"], h["distance"]))
+        return merged
@@ -0,0 +1,112 @@
+# app/services/reranker.py
+"""
+Opsiyonel cross-encoder rerank stage'i.
+
+Bi-encoder (MiniLM) skorları ANN sıralaması için yeterli ama hassasiyet düşük.
+RAGService RERANK_ENABLED ise RERANK_CANDIDATES kadar aday getirir; reranker
+(query, chunk) çiftlerini küçük bir lokal cross-encoder ile CPU'da batch'ler
+halinde puanlayıp en iyi k'yı tutar.
+
+- Skorlar (query hash, chunk id) ile LRU cache'lenir; tekrar eden sorgular modele gitmez
+- Puanlama RERANK_MAX_LATENCY_S'i aşarsa ANN/füzyon sırasına geri dönülür
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+try:
+    from sentence_transformers import CrossEncoder
+except Exception:  # pragma: no cover
+    CrossEncoder = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(hit: Dict[str, Any]) -> str:
+    """Index rebuild'lerinde de kararlı id: dosya + sıra + içerik checksum'ı."""
+    return f"{hit['file']}:{hit.get('ordinal', -1)}:{zlib.crc32(hit['chunk'].encode('utf-8')):08x}"
+
+
+class CrossEncoderReranker:
+    def __init__(
+        self,
+        model: Any = None,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_latency_s: Optional[float] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.batch_size = batch_size or settings.RERANK_BATCH_SIZE
+        self.max_latency_s = max_latency_s or settings.RERANK_MAX_LATENCY_S
+        self.cache_size = cache_size or settings.RERANK_CACHE_SIZE
+        self._model = model
+        self._load_failed = False
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    def _get_model(self) -> Any:
+        if self._model is None and not self._load_failed:
+            if CrossEncoder is None:
+                logger.warning("sentence_transformers not installed; reranking disabled")
+                self._load_failed = True
+            else:
+                try:
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                except Exception:
+                    logger.warning("Cross-encoder %s could not be loaded", self.model_name, exc_info=True)
+                    self._load_failed = True
+        return self._model
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[float]:
+        score = self._cache.get(key)
+        if score is not None:
+            self._cache.move_to_end(key)
+        return score
+
+    def _store(self, key: Tuple[str, str], score: float) -> None:
+        self._cache[key] = score
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def rerank(self, query: str, hits: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """
+        hits: ANN / füzyon sırasındaki adaylar. Dönüş: cross-encoder skoruna göre en iyi k
+        (her hit'te rerank_score, rank yeniden numaralı). Model yoksa ya da latency cap
+        aşılırsa girişteki sıranın ilk k'sı döner.
+        """
+        if len(hits) <= 1:
+            return hits[:k]
+        model = self._get_model()
+        if model is None:
+            return hits[:k]
+
+        qh = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        keys = [(qh, chunk_id(h)) for h in hits]
+        scores: List[Optional[float]] = [self._cached(key) for key in keys]
+        todo = [i for i, s in enumerate(scores) if s is None]
+
+        t0 = time.perf_counter()
+        for start in range(0, len(todo), self.batch_size):
+            batch = todo[start : start + self.batch_size]
+            predicted = model.predict([(query, hits[i]["chunk"]) for i in batch], show_progress_bar=False)
+            for i, score in zip(batch, predicted):
+                scores[i] = float(score)
+                self._store(keys[i], scores[i])
+            if start + self.batch_size < len(todo) and time.perf_counter() - t0 > self.max_latency_s:
+                # Kalan batch'ler bütçeyi aşar; puanlananlar cache'te kalır, ANN sırası döner
+                logger.warning("Rerank exceeded %.2fs; falling back to ANN order", self.max_latency_s)
+                return hits[:k]
+
+        order = sorted(range(len(hits)), key=lambda i: -scores[i])[:k]
+        out = []
+        for rank, i in enumerate(order, 1):
+            out.append(dict(hits[i], rerank_score=scores[i], rank=rank))
+        return out
@@ -0,0 +1,343 @@
+# app/services/sandbox.py
+"""
+Üretilen code_example için izole smoke test.
+
+ast.parse import anında patlayan kodu yakalamaz. Burada kod ayrı bir process'te
+import edilir, FastAPI app'i bulunur, route'lar TestClient ile çağrılır;
+startup süresi ve route başına latency raporlanır.
+
+İstek başına maliyeti onlarca ms'de tutmak için:
+- forkserver fastapi / pydantic / TestClient'ı önceden import eder (warm)
+- havuzda her zaman `size` kadar hazır, iş bekleyen worker vardır
+- her worker tek iş çalıştırır ve ölür (izolasyon); yerine arka plan thread'inde
+  yenisi fork edilir (istek yolu fork'u beklemez)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from app.config import settings
+
+try:
+    import resource  # sadece POSIX
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_PRELOAD = ["fastapi", "pydantic", "fastapi.testclient"]
+_BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+def _result(stage: str, error: Optional[str] = None) -> Dict[str, Any]:
+    return {"ok": False, "stage": stage, "error": error, "startup_ms": None, "routes": []}
+
+
+# -------------------------
+# Worker process tarafı
+# -------------------------
+def _current_vsize() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+def _apply_limits(cpu_seconds: float, memory_mb: int) -> None:
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (int(used + cpu_seconds) + 1, hard))
+
+    if memory_mb:
+        # RLIMIT_AS adres alanının tamamını sayar; warm import'ların üstüne bütçe ekle
+        _, hard_as = resource.getrlimit(resource.RLIMIT_AS)
+        limit = _current_vsize() + memory_mb * 1024 * 1024
+        if hard_as != resource.RLIM_INFINITY:
+            limit = min(limit, hard_as)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard_as))
+
+
+def _find_app(namespace: Dict[str, Any]):
+    from fastapi import FastAPI
+
+    app = namespace.get("app")
+    if isinstance(app, FastAPI):
+        return app
+    for value in namespace.values():
+        if isinstance(value, FastAPI):
+            return value
+    return None
+
+
+def _fill_path(path: str) -> str:
+    # /items/{item_id} -> /items/1 ; {file_path:path} -> 1
+    out, depth = [], 0
+    for ch in path:
+        if ch == "{":
+            depth += 1
+            if depth == 1:
+                out.append("1")
+        elif ch == "}":
+            depth -= 1
+        elif depth == 0:
+            out.append(ch)
+    return "".join(out)
+
+
+def _exercise_routes(app, client) -> list:
+    from fastapi.routing import APIRoute, APIWebSocketRoute
+    from starlette.routing import WebSocketRoute
+
+    checks = []
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            for method in sorted(route.methods - {"HEAD", "OPTIONS"}):
+                t0 = time.perf_counter()
+                try:
+                    resp = client.request(
+                        method,
+                        _fill_path(route.path),
+                        json={} if method in _BODY_METHODS else None,
+                    )
+                    status, error = resp.status_code, None
+                except Exception as e:
+                    status, error = None, f"{type(e).__name__}: {e}"
+                checks.append({
+                    "path": route.path,
+                    "method": method,
+                    "status": status,
+                    "latency_ms": round((time.perf_counter() - t0) * 1000, 2),
+                    "error": error,
+                })
+        elif isinstance(route, (APIWebSocketRoute, WebSocketRoute)):
+            t0 = time.perf_counter()
+            try:
+                with client.websocket_connect(_fill_path(route.path)):
+                    pass
+                status, error = 101, None
+            except Exception as e:
+                status, error = None, f"{type(e).__name__}: {e}"
+            checks.append({
+                "path": route.path,
+                "method": "WEBSOCKET",
+                "status": status,
+                "latency_ms": round((time.perf_counter() - t0) * 1000, 2),
+                "error": error,
+            })
+    return checks
+
+
+def _smoke_test(code: str, cpu_seconds: float, memory_mb: int) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+
+    _apply_limits(cpu_seconds, memory_mb)
+    os.chdir(tempfile.mkdtemp(prefix="sandbox-"))
+
+    t0 = time.perf_counter()
+    module = types.ModuleType("sandbox_example")
+    sys.modules["sandbox_example"] = module
+    try:
+        exec(compile(code, "<code_example>", "exec"), module.__dict__)
+    except BaseException as e:
+        return _result("import", f"{type(e).__name__}: {e}")
+
+    app = _find_app(module.__dict__)
+    if app is None:
+        return _result("import", "No FastAPI app instance found")
+
+    try:
+        client = TestClient(app, raise_server_exceptions=False)
+        client.__enter__()  # startup / lifespan event'leri
+    except BaseException as e:
+        return _result("startup", f"{type(e).__name__}: {e}")
+
+    out = _result("routes")
+    out["startup_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    try:
+        out["routes"] = _exercise_routes(app, client)
+    finally:
+        try:
+            client.__exit__(None, None, None)
+        except BaseException:
+            pass
+
+    out["ok"] = all(r["error"] is None and (r["status"] or 500) < 500 for r in out["routes"])
+    return out
+
+
+def _worker_main(conn, cpu_seconds: float, memory_mb: int) -> None:
+    # forkserver preload ile bunlar zaten yüklü; spawn fallback'inde burada ısınır
+    import fastapi  # noqa: F401
+    import fastapi.testclient  # noqa: F401
+
+    try:
+        code = conn.recv()
+    except (EOFError, OSError):
+        return
+    try:
+        result = _smoke_test(code, cpu_seconds, memory_mb)
+    except BaseException as e:
+        result = _result("worker", f"{type(e).__name__}: {e}")
+    try:
+        conn.send(result)
+    finally:
+        conn.close()
+
+
+# -------------------------
+# Parent (API) tarafı
+# -------------------------
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+
+
+class SandboxPool:
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        timeout_s: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        max_code_chars: Optional[int] = None,
+    ):
+        self.size = size or settings.SANDBOX_POOL_SIZE
+        self.timeout_s = timeout_s or settings.SANDBOX_TIMEOUT_S
+        self.cpu_seconds = cpu_seconds or settings.SANDBOX_CPU_SECONDS
+        self.memory_mb = memory_mb if memory_mb is not None else settings.SANDBOX_MEMORY_MB
+        self.max_code_chars = max_code_chars or settings.SANDBOX_MAX_CODE_CHARS
+
+        self._ctx = None
+        self._idle: Deque[_Worker] = deque()
+        self._lock = threading.Lock()
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._closed = False
+        self._pending = 0  # arka planda fork edilmekte olan worker sayısı
+
+    def _context(self):
+        if self._ctx is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                self._ctx = multiprocessing.get_context("forkserver")
+                # forkserver ilk kez başlamadan önce çağrılmalı (start() uygulama açılışında)
+                self._ctx.set_forkserver_preload(_PRELOAD)
+            else:
+                self._ctx = multiprocessing.get_context("spawn")
+        return self._ctx
+
+    def _spawn(self) -> _Worker:
+        ctx = self._context()
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_seconds, self.memory_mb),
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        return _Worker(process=proc, conn=parent_conn)
+
+    def start(self) -> None:
+        """Havuzu warm worker'larla doldurur."""
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+
+    def _take(self) -> _Worker:
+        dead = []
+        with self._lock:
+            worker = None
+            while self._idle and worker is None:
+                w = self._idle.popleft()
+                if w.process.is_alive():
+                    worker = w
+                else:
+                    dead.append(w)
+        for w in dead:
+            self._dispose(w)
+        if worker is None:
+            worker = self._spawn()  # cold path
+        self._refill()
+        return worker
+
+    def _refill(self) -> None:
+        """Havuzu `size`'a tamamlayan worker'ları arka plan thread'inde fork eder."""
+        with self._lock:
+            missing = self.size - len(self._idle) - self._pending
+            if self._closed or missing <= 0:
+                return
+            self._pending += missing
+        threading.Thread(target=self._fill, args=(missing,), name="sandbox-refill", daemon=True).start()
+
+    def _fill(self, count: int) -> None:
+        for _ in range(count):
+            try:
+                worker: Optional[_Worker] = self._spawn()
+            except Exception:
+                logger.warning("Sandbox worker spawn failed", exc_info=True)
+                worker = None
+            with self._lock:
+                self._pending -= 1
+                if worker is not None and not self._closed:
+                    self._idle.append(worker)
+                    worker = None
+            if worker is not None:
+                self._dispose(worker)
+
+    @staticmethod
+    def _dispose(worker: _Worker) -> None:
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=0.5)
+        worker.conn.close()
+
+    def _run_sync(self, code: str) -> Dict[str, Any]:
+        worker = self._take()
+        try:
+            worker.conn.send(code)
+            if worker.conn.poll(self.timeout_s):
+                return worker.conn.recv()
+            return _result("timeout", f"Smoke test exceeded {self.timeout_s}s")
+        except (EOFError, OSError):
+            # CPU / bellek limitinde kernel worker'ı öldürür
+            worker.process.join(timeout=0.5)
+            return _result("crashed", f"Worker exited (exitcode={worker.process.exitcode})")
+        finally:
+            self._dispose(worker)
+
+    async def smoke_test(self, code: str) -> Dict[str, Any]:
+        code = (code or "").strip()
+        if not code:
+            return _result("skipped", "Empty code")
+        if len(code) > self.max_code_chars:
+            return _result("skipped", f"Code too large ({len(code)} chars > {self.max_code_chars})")
+
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.size)
+
+        async with self._sem:
+            t0 = time.perf_counter()
+            result = await asyncio.to_thread(self._run_sync, code)
+            result["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._dispose(self._idle.popleft())
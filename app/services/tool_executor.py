@@ -0,0 +1,114 @@
+# app/services/tool_executor.py
+"""
+CPU-bound araçlar (AST / radon) için sınırlı process pool.
+
+- Event loop hiçbir zaman bloklanmaz: çağrılar run_in_executor ile awaitlenir.
+- Her çağrı için CPU-time limiti (RLIMIT_CPU + SIGXCPU) worker içinde uygulanır.
+- Duvar saati timeout'unda / worker çöktüğünde çağıranın verdiği fallback döner.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+
+try:
+    import resource  # sadece POSIX
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class ToolTimeoutError(Exception):
+    """Worker içinde CPU-time limiti aşıldı."""
+
+
+def _on_cpu_limit(signum, frame):
+    raise ToolTimeoutError("CPU time limit exceeded")
+
+
+def _run_with_cpu_limit(fn: Callable[..., Any], args: tuple, cpu_seconds: Optional[float]) -> Any:
+    """
+    Worker process'te çalışır. RLIMIT_CPU kümülatif olduğu için (pool worker'ları
+    tekrar kullanılıyor) limit "şu ana kadar harcanan + cpu_seconds" olarak kurulur
+    ve çağrı bitince eski haline döner.
+    """
+    if resource is None or not cpu_seconds or not hasattr(signal, "SIGXCPU"):
+        return fn(*args)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+
+    limit = int(used + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+
+    old_handler = signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    try:
+        return fn(*args)
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+        signal.signal(signal.SIGXCPU, old_handler)
+
+
+def _mp_context():
+    # Thread'li (uvicorn, torch) bir process'ten fork etmek yerine temiz worker'lar
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ToolExecutor:
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout_s: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or settings.TOOL_POOL_WORKERS
+        self.timeout_s = timeout_s or settings.TOOL_TIMEOUT_S
+        self.cpu_seconds = cpu_seconds or settings.TOOL_CPU_SECONDS
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context())
+        return self._pool
+
+    def _reset_pool(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, fallback: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        fn(*args)'ı pool'da çalıştırır. fn ve args pickle edilebilir olmalı
+        (modül seviyesinde fonksiyon). Hata / timeout durumunda fallback(reason) döner.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            fut = loop.run_in_executor(self._get_pool(), _run_with_cpu_limit, fn, args, self.cpu_seconds)
+            return await asyncio.wait_for(fut, timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            logger.warning("Tool %s timed out after %ss", getattr(fn, "__name__", fn), self.timeout_s)
+            return fallback("timeout")
+        except ToolTimeoutError:
+            logger.warning("Tool %s exceeded CPU limit (%ss)", getattr(fn, "__name__", fn), self.cpu_seconds)
+            return fallback("cpu_limit")
+        except BrokenProcessPool:
+            logger.error("Tool process pool broken; recreating", exc_info=True)
+            self._reset_pool()
+            return fallback("worker_crashed")
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,13 @@
 from .web_search import WebSearchTool
-from .code_validator import CodeValidatorTool
-from .complexity_analyzer import ComplexityAnalyzerTool
+from .code_ranker import CodeCandidateRanker
+from .code_analyzer import CodeAnalyzerTool
+from .blocking_call_detector import BlockingCallDetectorTool
+from .line_explainer import LineExplainerTool
 
-__all__ = ["WebSearchTool", "CodeValidatorTool", "ComplexityAnalyzerTool"]
+__all__ = [
+    "WebSearchTool",
+    "CodeCandidateRanker",
+    "CodeAnalyzerTool",
+    "BlockingCallDetectorTool",
+    "LineExplainerTool",
+]
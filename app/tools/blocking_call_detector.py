@@ -0,0 +1,255 @@
+# app/tools/blocking_call_detector.py
+from __future__ import annotations
+
+import ast
+from typing import Any, Dict, List, Optional, Set
+
+# Tam nitelikli çağrı adı -> öneri.
+# Modül prefix'i ile biten anahtarlar ("requests.") o modüldeki her çağrıyı kapsar.
+_BLOCKING_CALLS: Dict[str, str] = {
+    "time.sleep": "use `await asyncio.sleep(...)`",
+    "requests.": "use `httpx.AsyncClient` and await the request",
+    "urllib.request.urlopen": "use `httpx.AsyncClient` and await the request",
+    "subprocess.run": "use `asyncio.create_subprocess_exec`",
+    "subprocess.call": "use `asyncio.create_subprocess_exec`",
+    "subprocess.check_call": "use `asyncio.create_subprocess_exec`",
+    "subprocess.check_output": "use `asyncio.create_subprocess_exec`",
+    "os.system": "use `asyncio.create_subprocess_shell`",
+    "sqlite3.connect": "use `aiosqlite`, or declare the endpoint with plain `def`",
+    "psycopg2.connect": "use `asyncpg` or psycopg's async connection",
+    "pymysql.connect": "use `aiomysql`",
+    "mysql.connector.connect": "use `aiomysql`",
+    "pymongo.MongoClient": "use `motor.motor_asyncio.AsyncIOMotorClient`",
+    "redis.Redis": "use `redis.asyncio.Redis`",
+    "redis.StrictRedis": "use `redis.asyncio.Redis`",
+    "socket.create_connection": "use `asyncio.open_connection`",
+}
+
+# Sync SQLAlchemy Session metodları (async def içinde await'siz çağrılırsa)
+_SYNC_ORM_METHODS = {"query", "commit", "execute", "refresh", "flush", "scalars"}
+
+# Parametre tipi -> await edilmesi gereken metodlar
+_COROUTINE_METHODS: Dict[str, Set[str]] = {
+    "WebSocket": {
+        "accept", "close", "receive", "receive_text", "receive_bytes", "receive_json",
+        "send", "send_text", "send_bytes", "send_json",
+    },
+    "Request": {"json", "body", "form"},
+    "UploadFile": {"read", "write", "seek", "close"},
+}
+
+_COROUTINE_FUNCS = {"asyncio.sleep", "asyncio.wait_for", "asyncio.open_connection"}
+
+# Coroutine'i await etmeden alıp zamanlayan çağrılar. "run"/"wait" gibi genel
+# isimler (subprocess.run, event.wait) yalnızca asyncio üzerinden sayılır.
+_SCHEDULERS = {"create_task", "ensure_future", "gather", "wait_for", "shield", "run_until_complete"}
+_ASYNCIO_SCHEDULERS = {"asyncio.run", "asyncio.wait"}
+
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def _annotation_name(node: Optional[ast.AST]) -> Optional[str]:
+    if node is None:
+        return None
+    name = _dotted(node)
+    return name.rsplit(".", 1)[-1] if name else None
+
+
+class _Visitor(ast.NodeVisitor):
+    def __init__(self, aliases: Dict[str, str], async_defs: Set[str], uses_sync_orm: bool):
+        self.aliases = aliases
+        self.async_defs = async_defs  # aynı isimde sync def'i olmayan yerel async def'ler
+        self.uses_sync_orm = uses_sync_orm
+        self.findings: List[Dict[str, Any]] = []
+        self._func_stack: List[ast.AST] = []
+        self._typed_params: List[Dict[str, str]] = []
+        self._awaited: Set[int] = set()
+        self._scheduled: Set[int] = set()
+
+    # ---- scope ----
+    def _enter(self, node, is_async: bool):
+        # Decorator'lar, default'lar ve annotation'lar tanım anında, dış scope'ta çalışır
+        args = node.args
+        for outer in [*node.decorator_list, *args.defaults, *(d for d in args.kw_defaults if d is not None)]:
+            self.visit(outer)
+
+        params = {}
+        if is_async:
+            for a in args.posonlyargs + args.args + args.kwonlyargs:
+                t = _annotation_name(a.annotation)
+                if t in _COROUTINE_METHODS:
+                    params[a.arg] = t
+        self._func_stack.append(node)
+        self._typed_params.append(params)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._typed_params.pop()
+        self._func_stack.pop()
+
+    def visit_AsyncFunctionDef(self, node):
+        self._enter(node, True)
+
+    def visit_FunctionDef(self, node):
+        # async def içindeki sync nested def'ler genelde executor'a verilir; taranmaz
+        self._enter(node, False)
+
+    def visit_Lambda(self, node):
+        args = node.args
+        for outer in [*args.defaults, *(d for d in args.kw_defaults if d is not None)]:
+            self.visit(outer)
+        self._func_stack.append(node)
+        self.visit(node.body)
+        self._func_stack.pop()
+
+    @property
+    def _in_async(self) -> bool:
+        return bool(self._func_stack) and isinstance(self._func_stack[-1], ast.AsyncFunctionDef)
+
+    # ---- await / scheduling bağlamı ----
+    def visit_Await(self, node):
+        if isinstance(node.value, ast.Call):
+            self._awaited.add(id(node.value))
+        self.generic_visit(node)
+
+    def _resolve(self, func: ast.AST) -> Optional[str]:
+        name = _dotted(func)
+        if not name:
+            return None
+        head, _, rest = name.partition(".")
+        head = self.aliases.get(head, head)
+        return f"{head}.{rest}" if rest else head
+
+    def _add(self, node, kind: str, call: str, message: str, suggestion: str):
+        fn = self._func_stack[-1]
+        self.findings.append(
+            {
+                "line": node.lineno,
+                "kind": kind,
+                "call": call,
+                "function": getattr(fn, "name", "<lambda>"),
+                "message": message,
+                "suggestion": suggestion,
+            }
+        )
+
+    def visit_Call(self, node):
+        qual = self._resolve(node.func)
+        short = qual.rsplit(".", 1)[-1] if qual else None
+
+        if short in _SCHEDULERS or qual in _ASYNCIO_SCHEDULERS:
+            for arg in node.args:
+                if isinstance(arg, ast.Call):
+                    self._scheduled.add(id(arg))
+
+        if self._in_async and qual:
+            awaited = id(node) in self._awaited or id(node) in self._scheduled
+            self._check_blocking(node, qual, awaited)
+            if not awaited:
+                self._check_missing_await(node, _dotted(node.func) or qual, qual)
+
+        self.generic_visit(node)
+
+    def _check_blocking(self, node, qual: str, awaited: bool):
+        for pattern, suggestion in _BLOCKING_CALLS.items():
+            hit = qual.startswith(pattern) if pattern.endswith(".") else qual == pattern
+            if hit:
+                self._add(
+                    node, "blocking_call", qual,
+                    f"`{qual}` blocks the event loop inside an async handler",
+                    suggestion,
+                )
+                return
+
+        if self.uses_sync_orm and not awaited and isinstance(node.func, ast.Attribute):
+            if node.func.attr in _SYNC_ORM_METHODS and "." in qual:
+                self._add(
+                    node, "blocking_call", qual,
+                    f"sync SQLAlchemy call `{qual}` blocks the event loop inside an async handler",
+                    "use `AsyncSession` from sqlalchemy.ext.asyncio, or declare the endpoint with plain `def`",
+                )
+
+    def _check_missing_await(self, node, name: str, qual: str):
+        head, _, method = name.rpartition(".")
+        params = self._typed_params[-1] if self._typed_params else {}
+
+        if head in params and method in _COROUTINE_METHODS[params[head]]:
+            coroutine = True
+        elif qual in _COROUTINE_FUNCS:
+            coroutine = True
+        else:
+            # Yerel async def'ler yalnızca çıplak isim ya da self.<isim> ile eşleşir;
+            # app.get(...) / d.get(...) yerel bir `async def get` yüzünden işaretlenmez
+            coroutine = method in self.async_defs and (head == "self" or (not head and qual == name))
+
+        if coroutine:
+            self._add(
+                node, "missing_await", qual,
+                f"coroutine `{qual}(...)` is called without `await`",
+                f"write `await {qual}(...)`",
+            )
+
+
+class BlockingCallDetectorTool:
+    """
+    Üretilen kodun AST'ini gezer:
+    - async def handler'lar içindeki bloklayan çağrılar (requests, time.sleep, sync DB driver'ları)
+    - bilinen coroutine'lerin await'siz çağrılması (websocket.accept(), request.json(), yerel async def'ler)
+    """
+
+    def detect(self, code: str) -> Dict[str, Any]:
+        try:
+            tree = ast.parse(code or "")
+        except (SyntaxError, ValueError):
+            return {"checked": False, "findings": [], "blocking_calls": 0, "missing_awaits": 0}
+
+        aliases: Dict[str, str] = {}
+        async_defs: Set[str] = set()
+        sync_defs: Set[str] = set()
+        uses_sync_orm = False
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for a in node.names:
+                    aliases[(a.asname or a.name).split(".")[0]] = a.name if a.asname else a.name.split(".")[0]
+                    if a.name.startswith("sqlalchemy"):
+                        uses_sync_orm = True
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                for a in node.names:
+                    aliases[a.asname or a.name] = f"{node.module}.{a.name}"
+                if node.module.startswith("sqlalchemy"):
+                    uses_sync_orm = uses_sync_orm or not node.module.startswith("sqlalchemy.ext.asyncio")
+            elif isinstance(node, ast.AsyncFunctionDef):
+                async_defs.add(node.name)
+            elif isinstance(node, ast.FunctionDef):
+                sync_defs.add(node.name)
+
+        # async engine kullanılıyorsa ORM çağrıları zaten await ediliyordur
+        if any(v.startswith("sqlalchemy.ext.asyncio") for v in aliases.values()):
+            uses_sync_orm = False
+
+        visitor = _Visitor(aliases, async_defs - sync_defs, uses_sync_orm)
+        visitor.visit(tree)
+
+        findings = sorted(visitor.findings, key=lambda f: f["line"])
+        return {
+            "checked": True,
+            "findings": findings,
+            "blocking_calls": sum(f["kind"] == "blocking_call" for f in findings),
+            "missing_awaits": sum(f["kind"] == "missing_await" for f in findings),
+        }
+
+    @staticmethod
+    def as_best_practices(report: Dict[str, Any], limit: int = 4) -> List[str]:
+        out: List[str] = []
+        for f in (report or {}).get("findings", [])[:limit]:
+            out.append(f"Line {f['line']} in `{f['function']}`: {f['message']}; {f['suggestion']}.")
+        return out
@@ -0,0 +1,199 @@
+# app/tools/code_analyzer.py
+from __future__ import annotations
+
+import ast
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+try:
+    from radon.complexity import cc_rank
+    from radon.visitors import ComplexityVisitor
+except Exception:
+    cc_rank = None
+    ComplexityVisitor = None
+
+
+def _empty_result(error: Optional[str], valid: Optional[bool] = False) -> Dict[str, Any]:
+    return {
+        "valid": valid,
+        "error": error,
+        "skipped_reason": None,
+        "complexity_unavailable": False,
+        "line": None,
+        "offset": None,
+        "cyclomatic_complexity": None,
+        "rank": None,
+        "loc": None,
+        "avg_cc": None,
+        "max_cc": None,
+        "blocks": [],
+        "imports": [],
+        "async_functions": 0,
+        "sync_functions": 0,
+    }
+
+
+def _count_loc(code: str) -> int:
+    # Boş ve sadece yorum olan satırlar sayılmaz
+    return sum(1 for ln in code.splitlines() if ln.strip() and not ln.lstrip().startswith("#"))
+
+
+def _collect_imports(tree: ast.AST) -> List[str]:
+    imports: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            mod = "." * node.level + (node.module or "")
+            imports.extend(f"{mod}.{a.name}" if mod else a.name for a in node.names)
+    return sorted(set(imports))
+
+
+def analyze_code(code: str) -> Dict[str, Any]:
+    """
+    Tek parse: sözdizimi geçerliliği, cyclomatic complexity, LOC,
+    import'lar ve async/sync fonksiyon sayıları aynı AST'ten hesaplanır.
+    Cache'siz saf fonksiyon (process pool'a gönderilebilir).
+    """
+    if not code or not code.strip():
+        return _empty_result("Empty code")
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        out = _empty_result(str(e))
+        out["line"] = getattr(e, "lineno", None)
+        out["offset"] = getattr(e, "offset", None)
+        return out
+    except ValueError as e:  # ör. null byte
+        return _empty_result(str(e))
+
+    out = _empty_result(None)
+    out["valid"] = True
+    out["loc"] = _count_loc(code)
+    out["imports"] = _collect_imports(tree)
+    out["async_functions"] = sum(isinstance(n, ast.AsyncFunctionDef) for n in ast.walk(tree))
+    out["sync_functions"] = sum(isinstance(n, ast.FunctionDef) for n in ast.walk(tree))
+
+    if ComplexityVisitor is None:
+        # radon opsiyonel: kod geçerli, yalnızca complexity alanları boş kalır
+        out["complexity_unavailable"] = True
+        return out
+
+    visitor = ComplexityVisitor.from_ast(tree)
+    blocks = visitor.blocks
+    if blocks:
+        ccs = [b.complexity for b in blocks]
+        max_cc = max(ccs)
+        out["avg_cc"] = sum(ccs) / len(ccs)
+        out["blocks"] = [{"name": b.name, "cc": b.complexity, "line": b.lineno} for b in blocks]
+    else:
+        # Fonksiyon/sınıf yoksa modül seviyesindeki karmaşıklık
+        max_cc = visitor.complexity
+        out["avg_cc"] = float(max_cc)
+
+    out["max_cc"] = max_cc
+    out["cyclomatic_complexity"] = max_cc
+    out["rank"] = cc_rank(max_cc)
+    return out
+
+
+def fallback_result(reason: str) -> Dict[str, Any]:
+    """
+    Analiz yapılamadığında (timeout, boyut limiti, worker hatası, aday yok) dönen sonuç.
+    valid None'dır: kod hakkında bir şey bilinmiyor, sözdizimi hatası varsayılmamalı.
+    """
+    out = _empty_result(None, valid=None)
+    out["skipped_reason"] = reason
+    return out
+
+
+class CodeAnalyzerTool:
+    """
+    Sözdizim doğrulama + radon complexity, tek geçişte (eski CodeValidatorTool /
+    ComplexityAnalyzerTool'un yerini alır).
+    Sonuçlar kod hash'ine göre LRU cache'te tutulur.
+    executor verilirse analiz process pool'da, CPU/zaman limitleriyle çalışır.
+    """
+
+    def __init__(
+        self,
+        cache_size: Optional[int] = None,
+        executor: Any = None,
+        max_input_chars: Optional[int] = None,
+        max_input_lines: Optional[int] = None,
+    ):
+        self.cache_size = cache_size if cache_size is not None else settings.CODE_ANALYSIS_CACHE_SIZE
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.executor = executor
+        self.max_input_chars = max_input_chars or settings.TOOL_MAX_INPUT_CHARS
+        self.max_input_lines = max_input_lines or settings.TOOL_MAX_INPUT_LINES
+
+    @staticmethod
+    def code_hash(code: str) -> str:
+        return hashlib.sha256((code or "").encode("utf-8", errors="replace")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            return dict(hit)
+        return None
+
+    def _cache_put(self, key: str, result: Dict[str, Any]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = dict(result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def analyze(self, code: str) -> Dict[str, Any]:
+        key = self.code_hash(code)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        result = analyze_code(code)
+        self._cache_put(key, result)
+        return dict(result)
+
+    def _size_violation(self, code: str) -> Optional[str]:
+        if len(code or "") > self.max_input_chars:
+            return f"input too large ({len(code)} chars > {self.max_input_chars})"
+        lines = (code or "").count("\n") + 1
+        if lines > self.max_input_lines:
+            return f"input too large ({lines} lines > {self.max_input_lines})"
+        return None
+
+    async def analyze_async(self, code: str) -> Dict[str, Any]:
+        """
+        Event loop'u bloklamayan sürüm. Cache parent process'te tutulur;
+        fallback sonuçları cache'lenmez.
+        """
+        key = self.code_hash(code)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        too_large = self._size_violation(code)
+        if too_large:
+            return fallback_result(too_large)
+
+        if self.executor is None:
+            result = await asyncio.to_thread(analyze_code, code)
+        else:
+            result = await self.executor.run(analyze_code, code, fallback=fallback_result)
+            if result.get("skipped_reason"):
+                return result
+
+        self._cache_put(key, result)
+        return dict(result)
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,215 @@
+# app/tools/code_ranker.py
+from __future__ import annotations
+
+import ast
+import re
+import textwrap
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import settings
+
+# Fence satırları: ```python, ```py, ``` ...
+_FENCE_RE = re.compile(r"^\s*```[\w+-]*\s*$", re.MULTILINE)
+
+# Satır başında gerçekten kod olduğunu gösteren yapılar.
+# Eski _CODE_SIGNALS "from " / "return " gibi düz yazıda da geçen alt string'lere bakıyordu.
+_SIGNAL_LINE_RE = re.compile(
+    r"""^\s*(?:
+        (?:async\s+)?def\s+\w+\s*\(
+      | class\s+\w+\s*[(:]
+      | from\s+[\w.]+\s+import\s+\w
+      | import\s+[\w.]+\s*(?:$|,|\bas\b)
+      | @\w+(?:\.\w+)*
+      | return\b
+      | await\s+\w
+      | (?:async\s+)?with\s+.+:\s*$
+      | (?:if|elif|for|while|try|except|finally)\b.*:\s*$
+      | [\w.\[\]]+\s*(?::\s*[\w.\[\], ]+)?\s*=\s*[\w.]+\(
+    )""",
+    re.MULTILINE | re.VERBOSE,
+)
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+# Skor ağırlıkları (toplam 1.0)
+_W_PARSE = 0.4
+_W_DENSITY = 0.3
+_W_OVERLAP = 0.2
+_W_LENGTH = 0.1
+
+# Kullanışlı bir örnek için satır aralığı
+_MIN_LINES = 4
+_MAX_LINES = 200
+
+
+def strip_fences(code: str) -> str:
+    """```python ... ``` ile sarılı snippet'lerden fence satırlarını soyar."""
+    code = (code or "").strip()
+    if "```" not in code:
+        return code
+    return _FENCE_RE.sub("", code).strip()
+
+
+@dataclass
+class CodeCandidate:
+    code: str
+    source: str           # "web" | "docs"
+    origin: str = ""      # url veya dosya adı
+    score: float = 0.0
+    parses: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "code": self.code,
+            "source": self.source,
+            "origin": self.origin,
+            "score": round(self.score, 4),
+            "parses": self.parses,
+        }
+
+
+class CodeCandidateRanker:
+    """
+    Web ve doküman snippet'lerini tek havuzda puanlar:
+    - parse başarısı (ast.parse)
+    - kod sinyali yoğunluğu (sinyal satırı / dolu satır)
+    - QueryAnalysis.keywords ile framework sembolü örtüşmesi
+    - uzunluk (çok kısa / çok uzun cezalandırılır)
+    En yüksek puanlı aday, pahalı AST/radon analizine giden tek adaydır.
+
+    Çalışma modeli: ExampleFinder ve tools stage'i rank/best'i asyncio.to_thread ile
+    worker thread'de çağırır (cache bu yüzden lock'lu). Planner yalnızca en iyi tek
+    doküman snippet'ini event loop'ta puanlar; bu, boyut sınırı ve cache sayesinde
+    kısa kalır. TOOL_MAX_INPUT_CHARS / TOOL_MAX_INPUT_LINES'ı aşan adaylar parse
+    edilmeden elenir (CodeAnalyzerTool da bunları analiz etmezdi). Aynı instance
+    paylaşılır; parse sonuçları metin başına bir kez hesaplanıp LRU'da tutulur,
+    böylece aynı web snippet'i tekrar parse edilmez.
+    """
+
+    def __init__(
+        self,
+        min_score: float = 0.35,
+        max_input_chars: Optional[int] = None,
+        max_input_lines: Optional[int] = None,
+        cache_size: int = 512,
+    ):
+        self.min_score = min_score
+        self.max_input_chars = max_input_chars or settings.TOOL_MAX_INPUT_CHARS
+        self.max_input_lines = max_input_lines or settings.TOOL_MAX_INPUT_LINES
+        self.cache_size = cache_size
+        self._parse_cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _too_large(self, text: str) -> bool:
+        return len(text) > self.max_input_chars or text.count("\n") + 1 > self.max_input_lines
+
+    @staticmethod
+    def _keyword_terms(keywords: Optional[Iterable[str]]) -> set:
+        terms = set()
+        for kw in keywords or []:
+            terms.update(_WORD_RE.findall(str(kw).lower()))
+        return terms
+
+    def _parses(self, code: str) -> float:
+        with self._lock:
+            if code in self._parse_cache:
+                self._parse_cache.move_to_end(code)
+                return self._parse_cache[code]
+        result = self._parse_score(code)
+        with self._lock:
+            self._parse_cache[code] = result
+            while len(self._parse_cache) > self.cache_size:
+                self._parse_cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _parse_score(code: str) -> float:
+        try:
+            ast.parse(code)
+            return 1.0
+        except (SyntaxError, ValueError):
+            pass
+        # Web snippet'leri çoğu zaman girintili kesitlerdir
+        try:
+            ast.parse(textwrap.dedent(code))
+            return 0.8
+        except (SyntaxError, ValueError):
+            return 0.0
+
+    def score(self, code: str, keyword_terms: set) -> CodeCandidate:
+        code = strip_fences(code)
+        cand = CodeCandidate(code=code, source="")
+        lines = [ln for ln in code.splitlines() if ln.strip()]
+        if not lines:
+            return cand
+
+        signal_lines = len(_SIGNAL_LINE_RE.findall(code))
+        if signal_lines == 0:
+            # Hiç kod yapısı yoksa düz yazıdır; parse başarısı anlamsız
+            return cand
+
+        density = min(1.0, signal_lines / len(lines))
+        parse = self._parses(code)
+
+        if keyword_terms:
+            idents = {m.lower() for m in _IDENT_RE.findall(code)}
+            overlap = len(keyword_terms & idents) / len(keyword_terms)
+        else:
+            overlap = 0.0
+
+        n = len(lines)
+        length = min(1.0, n / _MIN_LINES)
+        if n > _MAX_LINES:
+            length *= _MAX_LINES / n
+
+        cand.parses = parse > 0.0
+        cand.score = (
+            _W_PARSE * parse
+            + _W_DENSITY * density
+            + _W_OVERLAP * overlap
+            + _W_LENGTH * length
+        )
+        return cand
+
+    def rank(self, candidates: Iterable[Dict[str, Any]], keywords: Optional[Iterable[str]] = None) -> List[CodeCandidate]:
+        """
+        candidates: [{"text": "...", "source": "web|docs", "origin": "..."}]
+        Aynı metin iki kez gelirse (web + docs) bir kez puanlanır.
+        """
+        terms = self._keyword_terms(keywords)
+        seen = set()
+        ranked: List[CodeCandidate] = []
+
+        for c in candidates or []:
+            text = (c.get("text") or "").strip()
+            if not text or text in seen or self._too_large(text):
+                continue
+            seen.add(text)
+
+            cand = self.score(text, terms)
+            if cand.score < self.min_score:
+                continue
+            cand.source = c.get("source", "")
+            cand.origin = c.get("origin", "")
+            ranked.append(cand)
+
+        ranked.sort(key=lambda x: x.score, reverse=True)
+        return ranked
+
+    def best(self, candidates: Iterable[Dict[str, Any]], keywords: Optional[Iterable[str]] = None) -> Optional[CodeCandidate]:
+        ranked = self.rank(candidates, keywords)
+        return ranked[0] if ranked else None
+
+    @staticmethod
+    def candidates_from(doc_res: Dict[str, Any], ex_res: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """DocumentationResult + ExampleFinderResult dict'lerinden aday listesi üretir."""
+        out: List[Dict[str, Any]] = []
+        for r in (ex_res or {}).get("results", []) or []:
+            out.append({"text": r.get("snippet") or "", "source": "web", "origin": r.get("url", "")})
+        for s in (doc_res or {}).get("snippets", []) or []:
+            out.append({"text": s.get("text") or "", "source": "docs", "origin": s.get("source", "")})
+        return out
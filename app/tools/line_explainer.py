@@ -0,0 +1,355 @@
+# app/tools/line_explainer.py
+from __future__ import annotations
+
+import ast
+import re
+from typing import Any, Dict, List, Optional, Set
+
+_HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options"}
+_PATH_PARAM_RE = re.compile(r"{(\w+)(?::\w+)?}")
+
+# Kurucu çağrı (son isim) -> açıklama şablonu; {target} atanan isim
+_CONSTRUCTORS: Dict[str, str] = {
+    "FastAPI": "Creates the FastAPI application instance `{target}`.",
+    "APIRouter": "Creates an APIRouter `{target}` to group related routes.",
+    "Flask": "Creates the Flask application instance `{target}`.",
+    "OAuth2PasswordBearer": "Declares an OAuth2 bearer-token scheme `{target}`; it reads the token from the Authorization header.",
+    "HTTPBearer": "Declares an HTTP bearer security scheme `{target}`.",
+    "APIKeyHeader": "Declares an API-key header security scheme `{target}`.",
+    "CryptContext": "Creates a password hashing context `{target}`.",
+    "create_engine": "Creates the SQLAlchemy engine `{target}` that manages database connections.",
+    "create_async_engine": "Creates an async SQLAlchemy engine `{target}`.",
+    "sessionmaker": "Creates a session factory `{target}` for database sessions.",
+    "async_sessionmaker": "Creates an async session factory `{target}`.",
+    "declarative_base": "Creates the declarative base class `{target}` for ORM models.",
+    "Jinja2Templates": "Configures Jinja2 templates as `{target}`.",
+    "TestClient": "Creates a test client `{target}` that calls the app in-process.",
+    "getLogger": "Creates the logger `{target}`.",
+}
+
+# Await edilen bilinen metodlar (son isim) -> açıklama
+_AWAITED_METHODS: Dict[str, str] = {
+    "accept": "Accepts the WebSocket handshake so messages can flow.",
+    "receive_text": "Waits for the next text message from the client.",
+    "receive_json": "Waits for the next JSON message from the client.",
+    "receive_bytes": "Waits for the next binary message from the client.",
+    "send_text": "Sends a text message to the client.",
+    "send_json": "Sends a JSON message to the client.",
+    "send_bytes": "Sends binary data to the client.",
+    "close": "Closes the connection.",
+    "sleep": "Pauses without blocking the event loop.",
+    "json": "Reads and parses the request body as JSON.",
+    "body": "Reads the raw request body.",
+    "form": "Reads the submitted form data.",
+    "read": "Reads the uploaded file content.",
+    "call_next": "Passes the request to the next handler and waits for its response.",
+    "commit": "Commits the current database transaction.",
+    "refresh": "Reloads the object from the database.",
+    "execute": "Executes the database statement.",
+}
+
+# Await'siz bilinen çağrılar (son isim) -> açıklama
+_PLAIN_CALLS: Dict[str, str] = {
+    "add_middleware": "Registers middleware that wraps every request.",
+    "include_router": "Mounts the router's routes on the app.",
+    "mount": "Mounts a sub-application or static files at a path.",
+    "run": "Starts the server when the module is executed directly.",
+    "create_all": "Creates the database tables for all declared models.",
+    "add": "Adds the object to the database session.",
+    "commit": "Commits the current database transaction.",
+    "refresh": "Reloads the object from the database.",
+    "close": "Closes the resource.",
+    "append": "Appends the item to the list.",
+    "remove": "Removes the item from the list.",
+    "basicConfig": "Configures logging.",
+}
+
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def _last(node: ast.AST) -> Optional[str]:
+    name = _dotted(node)
+    return name.rsplit(".", 1)[-1] if name else None
+
+
+def _literal(node: Optional[ast.AST]) -> Optional[Any]:
+    try:
+        return ast.literal_eval(node) if node is not None else None
+    except Exception:
+        return None
+
+
+def _kw(call: ast.Call, name: str) -> Optional[ast.AST]:
+    for kw in call.keywords:
+        if kw.arg == name:
+            return kw.value
+    return None
+
+
+def _targets(node: ast.AST) -> str:
+    if isinstance(node, ast.Assign):
+        return ", ".join(ast.unparse(t) for t in node.targets)
+    return ast.unparse(node.target)
+
+
+class LineExplainerTool:
+    """
+    Kodun AST'ini gezip statement başına deterministik açıklama üretir (kural tablosu:
+    route decorator'ları, Depends, websocket.accept, HTTPException, Pydantic modelleri, ...).
+    Kuralların karşılamadığı satırlar `uncovered` olarak döner; sadece onlar LLM'e sorulur.
+    """
+
+    def explain(self, code: str) -> Dict[str, Any]:
+        try:
+            tree = ast.parse(code or "")
+        except (SyntaxError, ValueError):
+            return {"checked": False, "lines": [], "covered": 0, "uncovered": []}
+
+        self._lines = (code or "").splitlines()
+        self._models: Set[str] = {
+            n.name for n in ast.walk(tree)
+            if isinstance(n, ast.ClassDef) and any(_last(b) == "BaseModel" for b in n.bases)
+        }
+        out: List[Dict[str, Any]] = []
+        self._walk(tree.body, out, path_params=set(), in_class=None)
+        out.sort(key=lambda x: x["line"])
+
+        return {
+            "checked": True,
+            "lines": out,
+            "covered": sum(1 for x in out if x["text"]),
+            "uncovered": [x["line"] for x in out if not x["text"]],
+        }
+
+    @staticmethod
+    def as_line_by_line(report: Dict[str, Any], extra: Optional[Dict[int, str]] = None) -> List[str]:
+        """Rapor + LLM'in doldurduğu satırlar -> FinalAnswer.line_by_line listesi."""
+        extra = extra or {}
+        items = []
+        for x in report.get("lines", []):
+            text = x["text"] or extra.get(x["line"])
+            if text:
+                items.append(f"Line {x['line']} (`{x['code']}`): {text}")
+        return items
+
+    # -------------------------
+    # AST gezintisi
+    # -------------------------
+    def _add(self, out: List[Dict[str, Any]], node: ast.AST, text: Optional[str]) -> None:
+        src = self._lines[node.lineno - 1].strip() if node.lineno <= len(self._lines) else ""
+        if len(src) > 60:
+            src = src[:57] + "..."
+        out.append({"line": node.lineno, "code": src, "text": text})
+
+    def _walk(self, body: List[ast.stmt], out, path_params: Set[str], in_class: Optional[ast.ClassDef]) -> None:
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                params = set(path_params)
+                for dec in node.decorator_list:
+                    self._add(out, dec, self._decorator(dec, node))
+                    params |= self._route_params(dec)
+                self._add(out, node, self._function(node, params))
+                self._walk(node.body, out, params, None)
+            elif isinstance(node, ast.ClassDef):
+                for dec in node.decorator_list:
+                    self._add(out, dec, None)
+                self._add(out, node, self._class(node))
+                self._walk(node.body, out, set(), node)
+            elif isinstance(node, ast.Try):
+                self._add(out, node, "Starts a try block so the errors below can be handled.")
+                self._walk(node.body, out, path_params, in_class)
+                for h in node.handlers:
+                    self._add(out, h, self._handler(h))
+                    self._walk(h.body, out, path_params, in_class)
+                self._walk(node.orelse, out, path_params, in_class)
+                if node.finalbody:
+                    self._walk(node.finalbody, out, path_params, in_class)
+            elif isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.If, ast.With, ast.AsyncWith)):
+                self._add(out, node, self._compound(node))
+                self._walk(node.body, out, path_params, in_class)
+                self._walk(getattr(node, "orelse", []), out, path_params, in_class)
+            else:
+                self._add(out, node, self._simple(node, in_class))
+
+    # -------------------------
+    # Kurallar
+    # -------------------------
+    def _route_params(self, dec: ast.AST) -> Set[str]:
+        if isinstance(dec, ast.Call) and dec.args:
+            path = _literal(dec.args[0])
+            if isinstance(path, str):
+                return set(_PATH_PARAM_RE.findall(path))
+        return set()
+
+    def _decorator(self, dec: ast.AST, fn: ast.AST) -> Optional[str]:
+        call = dec if isinstance(dec, ast.Call) else None
+        name = _last(call.func if call else dec)
+        target = _literal(call.args[0]) if call and call.args else None
+
+        if name in _HTTP_METHODS and isinstance(target, str):
+            status = _literal(_kw(call, "status_code"))
+            model = _kw(call, "response_model")
+            text = f"Registers `{fn.name}` as the handler for {name.upper()} {target}"
+            if model is not None:
+                text += f"; the response is validated against `{ast.unparse(model)}`"
+            if status:
+                text += f"; success status is {status}"
+            return text + "."
+        if name == "websocket" and isinstance(target, str):
+            return f"Registers `{fn.name}` as the WebSocket endpoint at {target}."
+        if name == "route" and isinstance(target, str):
+            return f"Registers `{fn.name}` for requests to {target}."
+        if name == "middleware":
+            return f"Registers `{fn.name}` as middleware that runs around every {target or 'http'} request."
+        if name == "on_event" and isinstance(target, str):
+            return f"Runs `{fn.name}` on application {target}."
+        if name == "exception_handler" and call and call.args:
+            return f"Registers `{fn.name}` to turn `{ast.unparse(call.args[0])}` exceptions into responses."
+        if name == "lru_cache":
+            return f"Caches the return value of `{fn.name}`."
+        return None
+
+    def _function(self, fn: ast.AST, path_params: Set[str]) -> str:
+        kind = "async function" if isinstance(fn, ast.AsyncFunctionDef) else "function"
+        args = fn.args
+        defaults = [None] * (len(args.args) - len(args.defaults)) + list(args.defaults)
+        pairs = list(zip(args.args, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults))
+
+        parts = []
+        for a, default in pairs:
+            if a.arg in ("self", "cls"):
+                continue
+            ann = ast.unparse(a.annotation) if a.annotation is not None else None
+            ann_name = _last(a.annotation) if a.annotation is not None else None
+            if isinstance(default, ast.Call) and _last(default.func) in ("Depends", "Security"):
+                dep = ast.unparse(default.args[0]) if default.args else ann or "the dependency"
+                parts.append(f"`{a.arg}` is injected via Depends({dep})")
+            elif ann_name == "WebSocket":
+                parts.append(f"`{a.arg}` is the WebSocket connection")
+            elif ann_name == "Request":
+                parts.append(f"`{a.arg}` is the incoming request")
+            elif ann_name in self._models:
+                parts.append(f"`{a.arg}` is parsed and validated from the JSON body as `{ann_name}`")
+            elif a.arg in path_params:
+                parts.append(f"`{a.arg}` comes from the URL path" + (f" as {ann}" if ann else ""))
+            elif isinstance(default, ast.Call) and _last(default.func) in ("Query", "Header", "Cookie", "Body", "File", "Form"):
+                parts.append(f"`{a.arg}` is read from the {_last(default.func).lower()}")
+            elif default is not None:
+                parts.append(f"`{a.arg}` is optional (default {ast.unparse(default)})")
+            else:
+                parts.append(f"`{a.arg}`" + (f" ({ann})" if ann else ""))
+
+        text = f"Defines the {kind} `{fn.name}`"
+        return text + (": " + "; ".join(parts) + "." if parts else " with no parameters.")
+
+    def _class(self, node: ast.ClassDef) -> Optional[str]:
+        bases = {_last(b) for b in node.bases}
+        if "BaseModel" in bases:
+            return f"Declares the Pydantic model `{node.name}`; FastAPI uses it to validate and document data."
+        if "BaseSettings" in bases:
+            return f"Declares `{node.name}` settings loaded from environment variables."
+        if bases & {"Base", "DeclarativeBase", "Model"}:
+            return f"Declares the ORM model `{node.name}` mapped to a database table."
+        if "Exception" in bases or any(b and b.endswith("Error") for b in bases):
+            return f"Declares the custom exception `{node.name}`."
+        if bases & {"Enum", "IntEnum", "StrEnum"}:
+            return f"Declares the enumeration `{node.name}`."
+        if not node.bases:
+            return f"Declares the class `{node.name}`."
+        return None
+
+    def _handler(self, h: ast.ExceptHandler) -> str:
+        if h.type is None:
+            return "Catches any error raised in the try block."
+        name = ast.unparse(h.type)
+        if "WebSocketDisconnect" in name:
+            return "Handles the client disconnecting (WebSocketDisconnect)."
+        return f"Handles `{name}` raised in the try block."
+
+    def _compound(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.While) and _literal(node.test) is True:
+            return "Loops until the connection closes or an error breaks out."
+        if isinstance(node, ast.If):
+            test = ast.unparse(node.test)
+            if test.replace("'", '"') == '__name__ == "__main__"':
+                return "Runs the block below only when the file is executed directly."
+            return None
+        if isinstance(node, (ast.With, ast.AsyncWith)):
+            ctx = node.items[0].context_expr
+            if isinstance(ctx, ast.Call) and _last(ctx.func) in ("TestClient", "Session", "SessionLocal"):
+                return f"Opens `{ast.unparse(ctx.func)}` and closes it automatically afterwards."
+            return None
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            return f"Iterates over `{ast.unparse(node.iter)}`."
+        return None
+
+    def _call_text(self, call: ast.Call, awaited: bool) -> Optional[str]:
+        name = _last(call.func)
+        table = _AWAITED_METHODS if awaited else _PLAIN_CALLS
+        if name in table:
+            return table[name]
+        if name == "print":
+            return "Prints a message to stdout."
+        return None
+
+    def _simple(self, node: ast.stmt, in_class: Optional[ast.ClassDef]) -> Optional[str]:
+        if isinstance(node, ast.Import):
+            return "Imports " + ", ".join(f"`{a.name}`" for a in node.names) + "."
+        if isinstance(node, ast.ImportFrom):
+            names = ", ".join(f"`{a.name}`" for a in node.names)
+            return f"Imports {names} from `{node.module}`."
+        if isinstance(node, ast.Pass):
+            return "Does nothing; the block intentionally stays empty."
+
+        if isinstance(node, ast.AnnAssign) and in_class is not None:
+            field = f"`{ast.unparse(node.target)}: {ast.unparse(node.annotation)}`"
+            if node.value is None:
+                return f"Declares the required field {field}."
+            return f"Declares the field {field} with default `{ast.unparse(node.value)}`."
+
+        if isinstance(node, ast.Raise) and isinstance(node.exc, ast.Call) and _last(node.exc.func) == "HTTPException":
+            status = _kw(node.exc, "status_code") or (node.exc.args[0] if node.exc.args else None)
+            detail = _kw(node.exc, "detail")
+            text = f"Stops the request with HTTP {ast.unparse(status) if status is not None else 'error'}"
+            return text + (f" and detail {ast.unparse(detail)}." if detail is not None else ".")
+
+        if isinstance(node, ast.Return):
+            if node.value is None:
+                return "Returns without a value."
+            if isinstance(node.value, (ast.Dict, ast.List)):
+                return "Returns the data; FastAPI serializes it to JSON."
+            if isinstance(node.value, ast.Call) and _last(node.value.func) in ("JSONResponse", "HTMLResponse", "StreamingResponse", "FileResponse", "RedirectResponse"):
+                return f"Returns a `{_last(node.value.func)}` directly."
+            return None
+
+        if isinstance(node, (ast.Expr, ast.Assign, ast.AnnAssign)):
+            value = node.value
+            awaited = isinstance(value, ast.Await)
+            if awaited:
+                value = value.value
+            if isinstance(value, (ast.Yield, ast.YieldFrom)):
+                return "Hands the value to the caller; code after `yield` runs as teardown."
+            if not isinstance(value, ast.Call):
+                return None
+
+            if isinstance(node, ast.Expr):
+                return self._call_text(value, awaited)
+
+            target = _targets(node)
+            ctor = _last(value.func)
+            if ctor in _CONSTRUCTORS:
+                return _CONSTRUCTORS[ctor].format(target=target)
+            text = self._call_text(value, awaited)
+            if text and awaited and ctor and ctor.startswith("receive"):
+                return text.rstrip(".") + f" and stores it in `{target}`."
+            return None
+        return None
@@ -203,7 +203,11 @@ if submit:
     else:
         with st.spinner("Working… Query Analyzer → FastAPI Docs (RAG) → GitHub Example Finder → Code Explainer"):
             try:
-                r = requests.post(API_URL, json={"query": query}, timeout=480)
+                r = requests.post(API_URL, json={"query": query, "deadline_ms": 450_000}, timeout=480)
+                if r.status_code in (429, 503):
+                    wait = r.headers.get("Retry-After", "a few")
+                    st.warning(f"⏳ The server is busy. Please retry in {wait} seconds.")
+                    st.stop()
                 r.raise_for_status()
                 data = r.json()
             except requests.exceptions.ConnectionError:
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+async def _hold(ctrl, release: asyncio.Event):
+    async with ctrl.slot():
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_429():
+    ctrl = AdmissionController(max_concurrency=1, max_queue=1, max_queue_wait_s=5)
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(ctrl, release))
+    queued = asyncio.create_task(_hold(ctrl, release))
+    await asyncio.sleep(0.01)
+    assert ctrl.gauges()["active"] == 1 and ctrl.gauges()["queue_depth"] == 1
+
+    with pytest.raises(AdmissionRejected) as exc:
+        async with ctrl.slot():
+            pass
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after_s >= 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert ctrl.gauges()["admitted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_timeout_is_rejected_with_503():
+    ctrl = AdmissionController(max_concurrency=1, max_queue=4, max_queue_wait_s=0.05)
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(ctrl, release))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        async with ctrl.slot():
+            pass
+    assert exc.value.status_code == 503
+    assert ctrl.gauges()["queue_depth"] == 0
+
+    release.set()
+    await running
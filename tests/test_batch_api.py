@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.agents.code_explainer import CodeExplainerAgent
+from app.agents.documentation_reader import DocumentationReaderAgent
+from app.agents.example_finder import ExampleFinderAgent
+from app.agents.query_analyzer import QueryAnalyzerAgent
+from app.api.routes import router
+from app.orchestrator.workflow import AgentOrchestrator
+from app.services.admission import AdmissionController
+from app.tools.blocking_call_detector import BlockingCallDetectorTool
+from app.tools.code_analyzer import CodeAnalyzerTool
+from app.tools.code_ranker import CodeCandidateRanker
+
+
+class _LLM:
+    async def agenerate(self, prompt, model=None, temperature=None, **kw):
+        return self.generate(prompt)
+
+    def generate(self, prompt, model=None, temperature=None, **kw):
+        if "query analyzer" in prompt:
+            return json.dumps({"language": "python", "framework": "fastapi", "topic": "websocket",
+                               "keywords": ["fastapi", "websocket"]})
+        return json.dumps({"explanation": "ok", "code_example": "", "line_by_line": [],
+                           "best_practices": [], "sources": []})
+
+
+class _Selector:
+    def select_model(self, **kwargs):
+        return "m"
+
+
+class _RAG:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def search(self, q, k=None, lq=None, part=None, variants=None):
+        return self.search_many([q])[0]
+
+    def search_many(self, qs, k=None, lqs=None, parts=None, variants=None):
+        if self.fail:
+            raise RuntimeError("faiss exploded")
+        return [[{"file": "ws.md", "chunk": "websocket docs", "relevance": 0.5}] for _ in qs]
+
+
+class _Web:
+    def search(self, q, max_results=5):
+        return []
+
+
+def _app(rag, max_concurrency=1):
+    llm, selector, ranker = _LLM(), _Selector(), CodeCandidateRanker()
+    agents = {
+        "query_analyzer": QueryAnalyzerAgent(llm, selector),
+        "doc_reader": DocumentationReaderAgent(llm, selector, rag),
+        "example_finder": ExampleFinderAgent(llm, selector, _Web(), ranker),
+        "code_explainer": CodeExplainerAgent(llm, selector, BlockingCallDetectorTool()),
+    }
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.state.orchestrator = AgentOrchestrator(agents, {"code_ranker": ranker, "code_analyzer": CodeAnalyzerTool()})
+    app.state.admission = AdmissionController(max_concurrency, 0, 0.1)
+    return app
+
+
+async def _post(app, queries):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t", timeout=30) as client:
+        res = await client.post("/api/v1/ask/batch", json={"queries": queries})
+        return res.status_code, [json.loads(line) for line in res.text.splitlines() if line]
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_one_line_per_query_and_releases_slot():
+    app = _app(_RAG())
+
+    status, lines = await _post(app, ["How do websockets work?", "How do websockets work?"])
+
+    assert status == 200
+    assert sorted(l["index"] for l in lines) == [0, 1]
+    assert all(l["result"] and l["error"] is None for l in lines)
+    assert app.state.admission.gauges()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_retrieval_failure_yields_errors_and_does_not_leak_slot():
+    app = _app(_RAG(fail=True), max_concurrency=1)
+
+    for _ in range(3):
+        status, lines = await _post(app, ["How do websockets work?", "What is middleware?"])
+        assert status == 200
+        assert len(lines) == 2 and all("shared retrieval failed" in l["error"] for l in lines)
+
+    assert app.state.admission.gauges()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_is_released_when_batch_generator_raises():
+    app = _app(_RAG(), max_concurrency=1)
+
+    async def broken_batch(queries, deadline_s=None):
+        raise RuntimeError("boom")
+        yield  # pragma: no cover
+
+    app.state.orchestrator.process_batch = broken_batch
+    # ASGITransport hatayı (anyio ExceptionGroup içinde) client'a taşır
+    with pytest.raises(Exception):
+        await _post(app, ["q"])
+    await asyncio.sleep(0)
+
+    assert app.state.admission.gauges()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_is_rejected_with_429_when_no_slot_is_free():
+    app = _app(_RAG(), max_concurrency=1)
+
+    async with app.state.admission.slot():
+        status, _ = await _post(app, ["q"])
+
+    assert status == 429
+    assert app.state.admission.gauges()["active"] == 0
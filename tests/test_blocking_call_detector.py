@@ -0,0 +1,76 @@
+from app.tools.blocking_call_detector import BlockingCallDetectorTool
+
+
+def _findings(code):
+    return [(f["kind"], f["call"]) for f in BlockingCallDetectorTool().detect(code)["findings"]]
+
+
+def test_blocking_calls_and_missing_awaits_are_flagged():
+    code = """
+import time
+import requests
+from fastapi import FastAPI, WebSocket
+
+app = FastAPI()
+
+async def notify(msg):
+    return msg
+
+class Manager:
+    async def broadcast(self, msg):
+        return msg
+
+    async def run_all(self):
+        self.broadcast("x")
+
+@app.websocket("/ws")
+async def ws(websocket: WebSocket):
+    websocket.accept()
+    time.sleep(1)
+    requests.get("http://x")
+    notify("hi")
+    await websocket.send_text("ok")
+"""
+    assert _findings(code) == [
+        ("missing_await", "self.broadcast"),
+        ("missing_await", "websocket.accept"),
+        ("blocking_call", "time.sleep"),
+        ("blocking_call", "requests.get"),
+        ("missing_await", "notify"),
+    ]
+
+
+def test_local_async_def_does_not_flag_same_named_attribute_calls():
+    code = """
+from fastapi import FastAPI
+
+app = FastAPI()
+
+async def get(key):
+    return key
+
+@app.get("/x")
+async def handler(d: dict, default=app.get("/y")):
+    value = d.get("a")
+    return await get(value)
+"""
+    assert _findings(code) == []
+
+
+def test_generic_run_and_wait_do_not_hide_missing_awaits():
+    code = """
+import asyncio
+import subprocess
+
+async def fetch():
+    return 1
+
+async def handler(event):
+    subprocess.run(fetch())
+    event.wait(fetch())
+    asyncio.run(fetch())
+    await asyncio.gather(fetch())
+"""
+    findings = _findings(code)
+    assert findings.count(("missing_await", "fetch")) == 2
+    assert ("blocking_call", "subprocess.run") in findings
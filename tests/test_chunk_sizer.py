@@ -0,0 +1,76 @@
+import re
+
+from app.services.chunk_report import build_report
+from app.services.chunk_sizer import EmbeddingTokenBudget
+from app.services.document_service import DocumentService
+
+
+class _WordTokenizer:
+    """Fast tokenizer arayüzü: kelime / noktalama başına bir token, offset'lerle."""
+
+    is_fast = True
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False, **_):
+        spans = [[m.span() for m in re.finditer(r"\w+|[^\w\s]", t)] for t in texts]
+        out = {"input_ids": [list(range(len(s))) for s in spans]}
+        if return_offsets_mapping:
+            out["offset_mapping"] = spans
+        return out
+
+
+class _Model:
+    tokenizer = _WordTokenizer()
+    max_seq_length = 22
+
+
+def test_budget_from_model_and_split_keeps_pieces_under_limit():
+    budget = EmbeddingTokenBudget.from_model(_Model())
+    assert budget.max_tokens == 20
+
+    text = "\n".join(f"value_{i} = compute({i})" for i in range(12))
+    [pieces] = budget.fit([text])
+
+    assert len(pieces) > 1
+    assert all(c <= 20 for c in budget.count_many([p for _, p in pieces]))
+    # Offset'ler orijinal metne işaret eder ve bölme satır sınırındadır
+    for offset, piece in pieces:
+        assert text[offset : offset + len(piece)] == piece
+        assert piece.startswith("value_")
+
+
+def test_markdown_pieces_repeat_heading_and_report_shows_no_truncation(tmp_path):
+    body = " ".join(f"word{i}" for i in range(60))
+    (tmp_path / "guide.md").write_text(f"# Guide\n\n## Setup\n\n{body}\n", encoding="utf-8")
+    budget = EmbeddingTokenBudget.from_model(_Model())
+    service = DocumentService(
+        str(tmp_path), chunk_size=600, chunk_overlap=50, structured_markdown=True, token_budget=budget
+    )
+
+    chunks = [c for _, c in service.chunk_document(tmp_path / "guide.md")]
+
+    assert len(chunks) > 1
+    assert all(c.startswith("Guide > Setup\n\n") for c in chunks)
+
+    report = build_report(str(tmp_path), budget)
+    assert report["before"]["truncated"] == 1
+    assert report["after"]["truncated"] == 0
+
+
+def test_long_heading_is_shortened_so_chunks_stay_within_budget(tmp_path):
+    long_title = " ".join(f"t{i}" for i in range(30))
+    body = " ".join(f"word{i}" for i in range(60))
+    (tmp_path / "guide.md").write_text(f"# Guide\n\n## {long_title}\n\n{body}\n", encoding="utf-8")
+    budget = EmbeddingTokenBudget.from_model(_Model())
+    service = DocumentService(
+        str(tmp_path), chunk_size=600, chunk_overlap=50, structured_markdown=True, token_budget=budget
+    )
+
+    chunks = [c for _, c in service.chunk_document(tmp_path / "guide.md")]
+
+    assert len(chunks) > 1
+    assert all(c <= budget.max_tokens for c in budget.count_many(chunks))
+    # Genel başlık atılır, bölüm başlığı kesilerek kalır
+    assert all(c.startswith("t0 t1 ") and not c.startswith("Guide") for c in chunks)
@@ -0,0 +1,71 @@
+from app.models.schemas import CodeValidationResult, ComplexityResult
+from app.tools.code_analyzer import CodeAnalyzerTool
+
+
+CODE = """import asyncio
+from fastapi import FastAPI
+
+app = FastAPI()
+
+# comment
+@app.get("/items/{item_id}")
+async def read_item(item_id: int):
+    if item_id > 10:
+        return {"big": True}
+    return {"big": False}
+
+def helper(x):
+    return x
+"""
+
+
+def test_single_pass_populates_schemas():
+    report = CodeAnalyzerTool().analyze(CODE)
+
+    val = CodeValidationResult.model_validate(report)
+    cx = ComplexityResult.model_validate(report)
+
+    assert val.valid and val.error is None
+    assert cx.cyclomatic_complexity == 2
+    assert cx.rank == "A"
+    assert cx.loc == 10
+    assert cx.imports == ["asyncio", "fastapi.FastAPI"]
+    assert (cx.async_functions, cx.sync_functions) == (1, 1)
+
+
+def test_syntax_error_reports_position():
+    report = CodeAnalyzerTool().analyze("def broken(:\n    pass")
+    assert report["valid"] is False
+    assert report["line"] == 1
+    assert report["cyclomatic_complexity"] is None
+
+
+def test_results_are_cached_by_hash():
+    tool = CodeAnalyzerTool(cache_size=1)
+    first = tool.analyze(CODE)
+    first["valid"] = False  # dönen kopya cache'i bozmamalı
+    assert tool.analyze(CODE)["valid"] is True
+    assert len(tool._cache) == 1
+
+    tool.analyze("x = 1")
+    assert len(tool._cache) == 1
+    assert tool.code_hash("x = 1") in tool._cache
+
+
+def test_fallback_is_unknown_not_invalid():
+    from app.tools.code_analyzer import fallback_result
+
+    val = CodeValidationResult.model_validate(fallback_result("timeout"))
+    assert val.valid is None and val.error is None
+    assert val.skipped_reason == "timeout"
+
+
+def test_missing_radon_keeps_code_valid(monkeypatch):
+    import app.tools.code_analyzer as code_analyzer
+
+    monkeypatch.setattr(code_analyzer, "ComplexityVisitor", None)
+    report = code_analyzer.analyze_code(CODE)
+
+    assert report["valid"] is True and report["error"] is None
+    assert ComplexityResult.model_validate(report).complexity_unavailable
+    assert report["cyclomatic_complexity"] is None
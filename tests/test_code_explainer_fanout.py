@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.agents.code_explainer import CodeExplainerAgent
+
+
+class _Selector:
+    def select_model(self, **kwargs):
+        return "test-model"
+
+
+class _SectionLLM:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.max_tokens = []
+
+    async def agenerate(self, prompt, model=None, temperature=None, max_tokens=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.max_tokens.append(max_tokens)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if "```python block" in prompt:
+            return "```python\nfrom fastapi import FastAPI\napp = FastAPI()\n```"
+        if "line by line" in prompt:
+            return '["Imports FastAPI.", "Creates the app."]'
+        if "best practices" in prompt:
+            return "- Keep handlers async.\n- Validate inputs."
+        return "FastAPI builds APIs from type hints."
+
+
+@pytest.mark.asyncio
+async def test_fanout_generates_sections_concurrently_and_normalizes():
+    llm = _SectionLLM()
+    agent = CodeExplainerAgent(llm, _Selector(), mode="fanout")
+    out = await agent.execute({
+        "query": "What is FastAPI?",
+        "analysis": {"framework": "fastapi", "topic": "rest_api"},
+        "examples": {"results": [{"url": "https://fastapi.tiangolo.com"}]},
+    })
+
+    assert llm.max_running == 2  # (code, explanation) sonra (line_by_line, best_practices)
+    assert all(t is not None for t in llm.max_tokens)
+    assert out["code_example"] == "from fastapi import FastAPI\napp = FastAPI()"
+    assert out["line_by_line"][:2] == ["Imports FastAPI.", "Creates the app."]
+    assert len(out["line_by_line"]) >= 6 and len(out["best_practices"]) >= 4
+    assert out["sources"] == ["https://fastapi.tiangolo.com"]
+
+
+@pytest.mark.asyncio
+async def test_fanout_code_and_explanation_see_tool_results(capsys):
+    prompts = []
+
+    class _RecordingLLM(_SectionLLM):
+        async def agenerate(self, prompt, **kw):
+            prompts.append(prompt)
+            return await super().agenerate(prompt, **kw)
+
+    agent = CodeExplainerAgent(_RecordingLLM(), _Selector(), mode="fanout")
+    await agent.execute({
+        "query": "What is FastAPI?",
+        "analysis": {"framework": "fastapi", "topic": "rest_api"},
+        "validation": {"valid": None, "skipped_reason": "timeout"},
+        "complexity": {"cyclomatic_complexity": 7, "rank": "B"},
+    })
+
+    first_round = prompts[:2]
+    assert all("Not analyzed (timeout)" in p and "'rank': 'B'" in p for p in first_round)
+    assert "FANOUT CODE" not in capsys.readouterr().out
@@ -0,0 +1,69 @@
+from app.tools.code_ranker import CodeCandidateRanker, strip_fences
+
+
+WS_CODE = """```python
+from fastapi import FastAPI, WebSocket
+
+app = FastAPI()
+
+@app.websocket("/ws")
+async def ws(websocket: WebSocket):
+    await websocket.accept()
+    return None
+```"""
+
+PROSE = "Learn how to return data from FastAPI and import your routers from other modules."
+
+
+def test_prose_with_signal_words_is_not_code():
+    ranker = CodeCandidateRanker()
+    assert ranker.best([{"text": PROSE, "source": "web"}], ["fastapi"]) is None
+
+
+def test_best_candidate_across_web_and_docs():
+    ranker = CodeCandidateRanker()
+    candidates = [
+        {"text": PROSE, "source": "web", "origin": "https://example.com"},
+        {"text": "import os\nx = os.getcwd()", "source": "web", "origin": "https://other.com"},
+        {"text": WS_CODE, "source": "docs", "origin": "advanced-websockets.md"},
+    ]
+    best = ranker.best(candidates, ["fastapi", "websocket"])
+    assert best is not None
+    assert best.source == "docs"
+    assert best.parses
+    assert best.code == strip_fences(WS_CODE)
+    assert "```" not in best.code
+
+
+def test_oversized_candidates_are_not_parsed():
+    ranker = CodeCandidateRanker(max_input_chars=10_000, max_input_lines=50)
+    huge = "\n".join(f"x{i} = {i}" for i in range(200))
+    candidates = [{"text": huge, "source": "docs"}, {"text": WS_CODE, "source": "web"}]
+
+    ranked = ranker.rank(candidates, ["fastapi"])
+
+    assert [c.source for c in ranked] == ["web"]
+
+
+def test_parse_results_are_reused_across_rankings(monkeypatch):
+    ranker = CodeCandidateRanker()
+    calls = []
+    real = CodeCandidateRanker._parse_score
+    monkeypatch.setattr(CodeCandidateRanker, "_parse_score", staticmethod(lambda code: calls.append(code) or real(code)))
+
+    candidates = [{"text": WS_CODE, "source": "web"}]
+    first = ranker.best(candidates, ["fastapi"])
+    second = ranker.best(candidates + [{"text": WS_CODE, "source": "docs"}], ["websocket"])
+
+    assert first.code == second.code
+    assert len(calls) == 1
+
+
+def test_example_finder_falls_back_to_longest_snippet():
+    from app.agents.example_finder import ExampleFinderAgent
+
+    agent = ExampleFinderAgent(None, None, None, CodeCandidateRanker())
+    results = [{"body": "Short prose."}, {"body": PROSE}]
+
+    assert agent._extract_best_code_snippet(results, ["fastapi"]) == PROSE
+    assert agent._extract_best_code_snippet(results + [{"body": WS_CODE}], ["fastapi"]).startswith("from fastapi")
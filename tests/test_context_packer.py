@@ -0,0 +1,31 @@
+from app.services.context_packer import ContextPacker, TokenCounter
+
+OVERLAP = "Use websocket.accept() before receiving messages and catch WebSocketDisconnect when the client leaves the chat room"
+
+
+def test_packs_by_relevance_per_token_under_budget_and_dedupes_overlap():
+    counter = TokenCounter(tokenizer_name="")
+    snippets = [
+        {"source": "big.md", "text": "word " * 400, "relevance": 0.6},
+        {"source": "ws.md", "text": OVERLAP, "relevance": 0.5},
+        {"source": "di.md", "text": "Depends() injects a dependency into the route handler.", "relevance": 0.4},
+    ]
+    results = [{"title": "Chat", "url": "https://e", "snippet": OVERLAP + "."}]
+
+    out = ContextPacker(counter, budget_tokens=100, dedupe_threshold=0.6).pack(snippets, results)
+    report = out["report"]
+
+    assert [s["source"] for s in out["snippets"]] == ["ws.md", "di.md"]
+    assert out["results"] == []
+    assert report["duplicates"] == 1 and report["dropped"] == 1
+    assert report["packed_tokens"] <= 100
+    assert report["packed_tokens"] == counter.count(OVERLAP) + counter.count(snippets[2]["text"])
+    assert report["dropped_tokens"] > 400
+
+
+def test_estimate_counts_code_denser_than_prose():
+    counter = TokenCounter(tokenizer_name="")
+    prose = "The application returns a list of items to the client"
+    code = "app.get('/x/{id}')(lambda id: {'id': id})"
+    assert 10 <= counter.count(prose) <= 13
+    assert counter.count(code) / len(code) > counter.count(prose) / len(prose)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app.api.routes import ClientDisconnected, run_until_disconnect
+from app.config import settings
+
+
+class _FakeRequest:
+    def __init__(self, disconnect_after: int):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        self.polls += 1
+        return self.polls >= self.disconnect_after
+
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_when_client_disconnects(monkeypatch):
+    monkeypatch.setattr(settings, "DISCONNECT_POLL_S", 0.01)
+    state = {}
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    with pytest.raises(ClientDisconnected):
+        await run_until_disconnect(_FakeRequest(disconnect_after=3), work())
+    assert state == {"cancelled": True}
+
+
+@pytest.mark.asyncio
+async def test_result_is_returned_while_connected(monkeypatch):
+    monkeypatch.setattr(settings, "DISCONNECT_POLL_S", 0.01)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert await run_until_disconnect(_FakeRequest(disconnect_after=10**6), work()) == "ok"
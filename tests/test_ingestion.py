@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.rag_service import RAGService
+
+
+class _CountingEmbedder:
+    """Deterministik embedding; fail_after batch'ten sonra çöker (build'in ortasında crash)."""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.calls = 0
+        self.embedded = 0
+
+    def encode(self, texts, show_progress_bar=False):
+        if self.fail_after is not None and self.calls >= self.fail_after:
+            raise RuntimeError("embedding crashed")
+        self.calls += 1
+        self.embedded += len(texts)
+        out = np.zeros((len(texts), 32), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, sum(map(ord, w)) % 32] += 1.0
+        return out
+
+
+def _setup(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for n in range(3):
+        words = " ".join(f"doc{n}_w{i:03d}" for i in range(120))
+        (docs / f"guide{n}.txt").write_text(words, encoding="utf-8")
+    monkeypatch.setattr(settings, "DOCUMENTS_PATH", str(docs))
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(tmp_path / "vdb"))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 120)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 20)
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", 4)
+
+
+def test_build_streams_batches_into_jsonl_store(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    embedder = _CountingEmbedder()
+    rag = RAGService(embedder)
+    rag.ensure_index()
+
+    assert embedder.calls > 1 and embedder.embedded == len(rag.records) == rag.index.ntotal
+    assert rag.store_file.exists() and not rag.ingest_dir.exists()
+    assert [r.ordinal for r in rag.records if r.source == "guide0.txt"] == list(
+        range(sum(r.source == "guide0.txt" for r in rag.records))
+    )
+
+    reloaded = RAGService(_CountingEmbedder())
+    reloaded.ensure_index()
+    assert reloaded.records == rag.records
+
+
+def test_crashed_build_resumes_from_last_committed_batch(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    crashing = RAGService(_CountingEmbedder(fail_after=3))
+    with pytest.raises(RuntimeError):
+        crashing.ensure_index()
+    assert not crashing.index_file.exists()
+    assert (crashing.ingest_dir / "checkpoint.json").exists()
+
+    embedder = _CountingEmbedder()
+    resumed = RAGService(embedder)
+    resumed.ensure_index()
+
+    clean_path = tmp_path / "clean"
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(clean_path))
+    clean = RAGService(_CountingEmbedder())
+    clean.ensure_index()
+
+    # Commit edilmiş 3 batch (12 chunk) yeniden embed edilmez
+    assert embedder.embedded == len(clean.records) - 12
+    assert resumed.records == clean.records
+    assert np.array_equal(
+        resumed.index.reconstruct_n(0, resumed.index.ntotal), clean.index.reconstruct_n(0, clean.index.ntotal)
+    )
+
+
+def test_concurrent_cold_searches_build_the_index_once(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    _setup(tmp_path, monkeypatch)
+    rag = RAGService(_CountingEmbedder())
+    builds = []
+    real_build = rag._build_from_documents
+
+    def counting_build():
+        builds.append(1)
+        real_build()
+
+    monkeypatch.setattr(rag, "_build_from_documents", counting_build)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        hits = list(pool.map(lambda _: rag.search("doc1_w005"), range(8)))
+
+    assert len(builds) == 1
+    assert all(h for h in hits)
+    assert rag.index.ntotal == len(rag.records)
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.jobs import JobRunner, JobStore, JobStoreFull
+
+
+class _FakeOrchestrator:
+    async def process_query(self, query, deadline_s=None, on_event=None):
+        for stage in ("query_analyzer", "code_explainer"):
+            on_event(stage, {"status": "running"})
+            await asyncio.sleep(0.02)
+            on_event(stage, {"status": "done"})
+        return {"explanation": query.upper()}
+
+
+@pytest.mark.asyncio
+async def test_long_poll_reports_progress_then_result():
+    runner = JobRunner(_FakeOrchestrator(), concurrency=1)
+    job = runner.submit("hello")
+    assert job.status == "queued"
+
+    job = await runner.wait(job, timeout_s=1, since=job.version)
+    assert job.status == "running"
+
+    job = await runner.wait(job, timeout_s=1)
+    assert job.status == "done"
+    assert job.result == {"explanation": "HELLO"}
+    assert job.stages["code_explainer"]["status"] == "done"
+
+
+def test_store_is_bounded_and_expires_finished_jobs():
+    store = JobStore(max_jobs=2, ttl_s=60)
+    first = store.create("a")
+    store.create("b")
+    with pytest.raises(JobStoreFull):
+        store.create("c")  # ikisi de henüz bitmedi
+
+    first.status, first.finished_at = "done", time.time()
+    store.create("c")  # en eski biten atılır
+    assert store.get(first.id) is None
+
+    second = next(iter(store._jobs.values()))
+    second.status, second.finished_at = "done", time.time() - 120
+    assert store.get(second.id) is None  # TTL doldu
@@ -0,0 +1,110 @@
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.lexical_index import LexicalIndex, lexical_weight, rrf_fuse, tokenize
+from app.services.rag_service import RAGService
+
+DOCS = [
+    "Handle the client leaving by catching WebSocketDisconnect inside the receive loop.",
+    "OAuth2PasswordBearer reads the bearer token from the Authorization header.",
+    "Use model_validate to build a Pydantic model from a dict.",
+    "Websockets keep a connection open between the client and the server.",
+]
+
+
+class _HashEmbedder:
+    def encode(self, texts, show_progress_bar=False):
+        out = np.zeros((len(texts), 64), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, hash(w) % 64] += 1.0
+            out[i] /= max(1e-6, np.linalg.norm(out[i]))
+        return out
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    tokens = tokenize("OAuth2PasswordBearer and model_validate()")
+    assert "oauth2passwordbearer" in tokens and "password" in tokens and "bearer" in tokens
+    assert "model_validate" in tokens and "validate" in tokens
+    assert "and" not in tokens
+
+
+def test_bm25_finds_exact_identifier_and_roundtrips(tmp_path):
+    index = LexicalIndex.build(DOCS)
+    assert index.search("how do I use WebSocketDisconnect", 2)[0][0] == 0
+    assert index.search("model_validate", 2)[0][0] == 2
+
+    path = tmp_path / "lexical.npz"
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert loaded.search("OAuth2PasswordBearer token", 3) == index.search("OAuth2PasswordBearer token", 3)
+
+
+def test_lexical_lookup_is_sub_millisecond_on_a_few_thousand_chunks():
+    words = [f"term{i}" for i in range(2000)]
+    docs = [" ".join(words[(i * 7 + j) % 2000] for j in range(80)) + " WebSocketDisconnect" * (i % 50 == 0)
+            for i in range(3000)]
+    index = LexicalIndex.build(docs)
+
+    index.search("WebSocketDisconnect term5 term77", 20)
+    t0 = time.perf_counter()
+    for _ in range(200):
+        index.search("WebSocketDisconnect term5 term77", 20)
+    assert (time.perf_counter() - t0) / 200 < 1e-3
+
+
+def test_rrf_weights_and_hybrid_search(tmp_path, monkeypatch):
+    assert lexical_weight("WebSocketDisconnect") > lexical_weight("how websockets work")
+    assert rrf_fuse([([1, 2], 1.0), ([2, 3], 2.0)], k=3)[0][0] == 2
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i, text in enumerate(DOCS):
+        (docs / f"d{i}.txt").write_text(text, encoding="utf-8")
+    monkeypatch.setattr(settings, "DOCUMENTS_PATH", str(docs))
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(tmp_path / "vdb"))
+
+    rag = RAGService(_HashEmbedder(), top_k=2)
+    hits = rag.search("client connection", lexical_query="WebSocketDisconnect")
+
+    assert rag.lexical_file.exists()
+    assert hits[0]["file"] == "d0.txt" and "bm25" in hits[0]
+    assert 0.0 < hits[0]["relevance"] <= 1.0
+
+
+def test_stale_lexical_file_with_same_chunk_count_is_rebuilt(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    monkeypatch.setattr(settings, "DOCUMENTS_PATH", str(docs))
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(tmp_path / "vdb"))
+
+    (docs / "d.txt").write_text(DOCS[1], encoding="utf-8")
+    RAGService(_HashEmbedder()).ensure_index()
+
+    # Aynı chunk sayısı, farklı içerik; eski lexical.npz kullanılmamalı
+    (docs / "d.txt").write_text(DOCS[0], encoding="utf-8")
+    rag = RAGService(_HashEmbedder())
+    rag.index_file.unlink()
+    rag.ensure_index()
+
+    assert rag.lexical.search("WebSocketDisconnect", 1)[0][0] == 0
+    assert rag.lexical.fingerprint == LexicalIndex.load(rag.lexical_file).fingerprint != ""
+
+
+def test_merged_docs_keep_fused_order_over_vector_relevance():
+    from app.orchestrator.workflow import AgentOrchestrator
+
+    # BM25-only hit: üst sırada ama vektör relevance'ı düşük
+    refined = {"snippets": [
+        {"source": "a.md", "text": "WebSocketDisconnect", "relevance": 0.2, "rank": 1},
+        {"source": "b.md", "text": "websockets", "relevance": 0.9, "rank": 2},
+    ]}
+    spec = {"snippets": [{"source": "a.md", "text": "WebSocketDisconnect", "relevance": 0.2, "rank": 1}]}
+
+    merged, kept_spec = AgentOrchestrator._merge_docs(refined, spec)
+
+    assert [s["source"] for s in merged["snippets"]] == ["a.md", "b.md"]
+    assert [s["rank"] for s in merged["snippets"]] == [1, 2]
+    assert kept_spec == 0
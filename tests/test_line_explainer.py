@@ -0,0 +1,77 @@
+from app.tools.line_explainer import LineExplainerTool
+
+
+CODE = """from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+
+app = FastAPI()
+
+class Item(BaseModel):
+    name: str
+
+def get_db():
+    yield {}
+
+@app.post("/items/{item_id}")
+async def create(item_id: int, item: Item, db=Depends(get_db)):
+    total = item_id * 2
+    if total > 10:
+        raise HTTPException(status_code=400, detail="too big")
+    return {"total": total}
+
+@app.websocket("/ws")
+async def ws(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        while True:
+            msg = await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+"""
+
+
+def test_rules_cover_fastapi_patterns_and_leave_the_rest_uncovered():
+    report = LineExplainerTool().explain(CODE)
+    by_line = {x["line"]: x["text"] for x in report["lines"]}
+
+    assert report["checked"]
+    assert "POST /items/{item_id}" in by_line[12]
+    assert "URL path" in by_line[13] and "JSON body as `Item`" in by_line[13] and "Depends(get_db)" in by_line[13]
+    assert "HTTP 400" in by_line[16]
+    assert "handshake" in by_line[21]
+    assert "`msg`" in by_line[24]
+    assert "WebSocketDisconnect" in by_line[25]
+    # Hesaplama ve koşul satırları kurala girmiyor -> LLM'e kalır
+    assert report["uncovered"] == [14, 15]
+
+    items = LineExplainerTool.as_line_by_line(report, {14: "Doubles the id."})
+    assert any(i.startswith("Line 14 ") and i.endswith("Doubles the id.") for i in items)
+    assert not any(i.startswith("Line 15 ") for i in items)
+
+
+def test_unparseable_code_is_not_checked():
+    report = LineExplainerTool().explain("def broken(:\n")
+    assert report == {"checked": False, "lines": [], "covered": 0, "uncovered": []}
+
+
+def test_unparseable_code_asks_llm_for_line_by_line():
+    import asyncio
+
+    from app.agents.code_explainer import CodeExplainerAgent
+
+    class _Selector:
+        def select_model(self, **kwargs):
+            return "m"
+
+    class _LLM:
+        async def agenerate(self, prompt, model=None, temperature=None, max_tokens=None):
+            assert "line by line" in prompt
+            return '["Defines broken.", "Has a syntax error."]'
+
+    agent = CodeExplainerAgent(_LLM(), _Selector(), line_explainer=LineExplainerTool())
+    answer = {"code_example": "def broken(:\n    pass", "line_by_line": ["generic"], "meta": {}}
+
+    out = asyncio.run(agent._explain_lines(answer, "fastapi", "m"))
+
+    assert out["line_by_line"] == ["Defines broken.", "Has a syntax error."]
+    assert out["meta"]["line_explainer"] == {"fallback": "llm"}
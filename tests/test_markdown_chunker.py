@@ -0,0 +1,67 @@
+import ast
+
+from app.services.document_service import DocumentService
+from app.services.markdown_chunker import MarkdownChunker, split_code
+
+DOC = """# Request Body { #request-body }
+
+To declare a **request** body, you use Pydantic models.
+
+## Create your data model { #create-your-data-model }
+
+Then you declare your data model as a class that inherits from `BaseModel`.
+
+```Python hl_lines="5"
+from pydantic import BaseModel
+
+
+class Item(BaseModel):
+    name: str
+    description: str | None = None
+    price: float
+```
+
+## Results { #results }
+
+With just that Python type declaration, **FastAPI** will read the body of the request as JSON.
+"""
+
+
+def _chunker(size=120, max_code=400):
+    return MarkdownChunker(size, max_code, DocumentService()._clean_markdown)
+
+
+def test_chunks_carry_heading_path_and_keep_code_whole():
+    chunks = _chunker().chunk(DOC)
+
+    code_chunk = next(c for c in chunks if "class Item(BaseModel):" in c)
+    assert code_chunk.startswith("Request Body > Create your data model\n\n")
+    # Kod bloğu bölünmez ve girinti korunur
+    assert "from pydantic import BaseModel" in code_chunk
+    assert "    price: float" in code_chunk
+    assert "```" not in code_chunk and "{ #" not in code_chunk
+    assert chunks[-1].startswith("Request Body > Results\n\n")
+
+
+def test_oversized_code_splits_only_at_top_level_statements():
+    code = "\n\n".join(
+        f"@app.get('/items/{i}')\nasync def read_{i}():\n    value = {i}\n    return {{'item': value}}"
+        for i in range(12)
+    )
+    pieces = split_code(code, 200)
+
+    assert len(pieces) > 1
+    assert "\n\n".join(pieces) == code
+    for piece in pieces:
+        ast.parse(piece)
+        assert piece.startswith("@app.get")
+
+
+def test_document_service_uses_chunker_for_markdown(tmp_path):
+    (tmp_path / "body.md").write_text(DOC, encoding="utf-8")
+    service = DocumentService(str(tmp_path), chunk_size=120, chunk_overlap=20, structured_markdown=True)
+
+    chunks = service.chunk_document(tmp_path / "body.md")
+
+    assert all(start == -1 for start, _ in chunks)
+    assert any("class Item(BaseModel):\n    name: str" in c for _, c in chunks)
@@ -0,0 +1,78 @@
+import os
+import re
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services.document_service import DocumentService
+
+DOCS = Path(__file__).resolve().parent.parent / "data" / "documents"
+
+
+def _legacy_clean_markdown(text: str) -> str:
+    """Önceki 15 adımlı _clean_markdown, birebir (golden referans)."""
+    text = re.sub(r"\{!>.*?!\}", "", text, flags=re.DOTALL)
+    text = re.sub(r"```[Pp]ython\s+hl_lines=[\"'][^\"']*[\"']", "```python", text)
+    text = re.sub(r"^////.*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^///.*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"```[a-zA-Z]*\n?", "", text)
+    text = re.sub(r"```", "", text)
+    text = re.sub(r"`([^`]+)`", r"\1", text)
+    text = re.sub(r"!\[.*?\]\(.*?\)", "", text)
+    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\*{1,3}([^*]+)\*{1,3}", r"\1", text)
+    text = re.sub(r"(?<!\w)_{1,3}([^_]+)_{1,3}(?!\w)", r"\1", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+EDGE_CASES = [
+    "# Title\n####### not a header\n#no-space\n  # indented",
+    "//// tab | Python 3.10+\n/// tip\ntext /// inline\n///\n",
+    '```Python hl_lines="1 2"\ncode\n```\n````\n``````\n',
+    "_a_ __b__ snake_case_name x_y _leading trailing_ ___c___",
+    "---\n***\n___\n-*_\n--\ntext ---",
+    "![img](a.png) [link](http://x) [[nested]](y) {!> ../x.py !}",
+    "<div class='x'>**bold** *it* ***both***</div>\n\n\n\n\nend",
+    "",
+]
+
+
+def _corpus():
+    return [p.read_text(encoding="utf-8") for p in sorted(DOCS.rglob("*.md"))]
+
+
+def test_cleaner_matches_legacy_output_on_corpus_and_edge_cases():
+    service = DocumentService()
+    texts = _corpus() + EDGE_CASES
+    assert len(texts) > len(EDGE_CASES)
+
+    for text in texts:
+        assert service._clean_markdown(text) == _legacy_clean_markdown(text)
+
+
+def _throughput(fn, texts, rounds=5):
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return size_mb / best
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="wall-clock benchmark; set RUN_BENCHMARKS=1")
+def test_cleaner_throughput_benchmark():
+    service = DocumentService()
+    texts = _corpus()
+
+    legacy = _throughput(_legacy_clean_markdown, texts)
+    current = _throughput(service._clean_markdown, texts)
+
+    # Zamanlama gürültüsüne pay: en azından eski zincir kadar hızlı olmalı
+    assert current > legacy * 0.9, f"legacy {legacy:.1f} MB/s, current {current:.1f} MB/s"
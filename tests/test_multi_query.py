@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.agents.documentation_reader import DocumentationReaderAgent
+from app.config import settings
+from app.services.rag_service import RAGService
+
+DOCS = {
+    "ws.txt": "websocket accept receive send loop",
+    "auth.txt": "oauth2 bearer token login",
+    "db.txt": "sqlalchemy session engine",
+}
+
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, show_progress_bar=False):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), 64), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, hash(w) % 64] += 1.0
+            out[i] /= max(1e-6, np.linalg.norm(out[i]))
+        return out
+
+
+def test_variants_share_one_encode_and_one_search(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name, text in DOCS.items():
+        (docs / name).write_text(text, encoding="utf-8")
+    monkeypatch.setattr(settings, "DOCUMENTS_PATH", str(docs))
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(tmp_path / "vdb"))
+    monkeypatch.setattr(settings, "HYBRID_SEARCH_ENABLED", False)
+
+    emb = _CountingEmbedder()
+    rag = RAGService(emb, top_k=2)
+    rag.ensure_index()
+    emb.calls.clear()
+
+    searches = []
+    real_search = rag.index.search
+    rag.index.search = lambda x, k: searches.append(len(x)) or real_search(x, k)
+
+    analysis = {"topic": "authentication", "subtopic": "login", "keywords": ["websocket", "accept"]}
+    variants = DocumentationReaderAgent.build_variants(analysis, "oauth2 bearer token")
+    hits = rag.search("websocket accept", variants=variants)
+
+    assert emb.calls == [["websocket accept", "oauth2 bearer token", "authentication login"]]
+    assert searches == [3]
+    # max fusion: her ifadenin en iyi chunk'ı sonuçta
+    assert {h["file"] for h in hits} == {"ws.txt", "auth.txt"}
+    assert all(h["variants"] == 3 for h in hits)
@@ -0,0 +1,34 @@
+import pytest
+
+from app.orchestrator.planner import PipelinePlanner, relevance_to_cosine
+
+_CODE_CHUNK = """```python
+from fastapi import FastAPI, WebSocket
+app = FastAPI()
+
+@app.websocket("/ws")
+async def ws(websocket: WebSocket):
+    await websocket.accept()
+```"""
+
+
+def _docs(relevance, text=_CODE_CHUNK):
+    return {"snippets": [{"source": "websockets.md", "text": text, "relevance": relevance}]}
+
+
+def test_relevance_maps_back_to_cosine():
+    # d = 2 - 2cos ; relevance = 1 / (1 + d)
+    for cos in (1.0, 0.8, 0.5, 0.0):
+        assert relevance_to_cosine(1 / (1 + 2 - 2 * cos)) == pytest.approx(cos)
+
+
+def test_confident_docs_skip_web_and_use_fast_model():
+    plan = PipelinePlanner().plan({"keywords": ["websocket"]}, _docs(1 / (1 + 2 - 2 * 0.95)))
+    assert plan["skip_examples"] and plan["fast_explain"]
+
+
+def test_low_confidence_or_cached_examples_keep_web_search():
+    planner = PipelinePlanner()
+    assert not planner.plan({}, _docs(1 / (1 + 2 - 2 * 0.5)))["skip_examples"]
+    assert not planner.plan({}, _docs(0.95), examples_cached=True)["skip_examples"]
+    assert not planner.plan({}, _docs(0.95, text="Prose only, no code here."))["skip_examples"]
@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.config import settings
+from app.services.rag_service import RAGService
+
+
+class _HashEmbedder:
+    """Deterministik bag-of-words embedding (model indirmeden)."""
+
+    def encode(self, texts, show_progress_bar=False):
+        out = np.zeros((len(texts), 64), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, hash(w) % 64] += 1.0
+            out[i] /= max(1e-6, np.linalg.norm(out[i]))
+        return out
+
+
+def _service(tmp_path, monkeypatch, text):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "guide.txt").write_text(text, encoding="utf-8")
+    monkeypatch.setattr(settings, "DOCUMENTS_PATH", str(docs))
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(tmp_path / "vdb"))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 60)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 20)
+    return RAGService(_HashEmbedder(), top_k=4)
+
+
+TEXT = " ".join(f"w{i:03d}" for i in range(60))
+
+
+def test_adjacent_hits_merge_without_duplicated_overlap(tmp_path, monkeypatch):
+    rag = _service(tmp_path, monkeypatch, TEXT)
+    rag.ensure_index()
+    hits = [rag._hit(2, 0.1, 1), rag._hit(4, 0.2, 2), rag._hit(1, 0.3, 3)]
+
+    merged = rag.merge_adjacent(hits)
+
+    assert [h["ordinals"] for h in merged] == [[1, 2], [4]]
+    span = merged[0]["chunk"]
+    assert span in TEXT and span.startswith(rag.records[1].chunk) and span.endswith(rag.records[2].chunk)
+    assert merged[0]["rank"] == 1 and merged[0]["distance"] == 0.1
+
+
+def test_legacy_tuple_metadata_still_loads_with_ordinals(tmp_path, monkeypatch):
+    rag = _service(tmp_path, monkeypatch, TEXT)
+    rag.ensure_index()
+    legacy = np.array([(r.source, r.chunk) for r in rag.records], dtype=object)
+    np.save(rag.meta_file, legacy, allow_pickle=True)
+
+    reloaded = RAGService(_HashEmbedder(), top_k=4)
+    reloaded.ensure_index()
+
+    assert [r.ordinal for r in reloaded.records] == list(range(len(rag.records)))
+    merged = reloaded.merge_adjacent([reloaded._hit(0, 0.0, 1), reloaded._hit(1, 0.2, 2)])
+    assert len(merged) == 1 and merged[0]["chunk"] in TEXT
@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.config import settings
+from app.services.chunk_tagger import ChunkTagger
+from app.services.rag_service import RAGService
+
+
+class _HashEmbedder:
+    def encode(self, texts, show_progress_bar=False):
+        out = np.zeros((len(texts), 64), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, hash(w) % 64] += 1.0
+            out[i] /= max(1e-6, np.linalg.norm(out[i]))
+        return out
+
+
+def test_tags_come_from_path_then_content():
+    tagger = ChunkTagger()
+    assert tagger.tag("security-oauth2-jwt.md", "anything") == {
+        "family": "fastapi", "framework": "fastapi", "topic": "authentication"
+    }
+    assert tagger.tag("pydantic/concepts/models.md", "password token jwt")["topic"] == "general"
+    assert tagger.tag("pydantic/concepts/models.md", "")["family"] == "pydantic"
+    assert tagger.tag("notes.txt", "Use await websocket.send_text() after websocket.accept()")["topic"] == "websocket"
+    assert tagger.tag("git-version-control.txt", "git commit")["family"] == "general"
+
+
+def test_topic_queries_search_their_sub_index_and_others_fall_back(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    (docs / "pydantic").mkdir(parents=True)
+    (docs / "websockets.md").write_text("\n\n".join(f"ws chunk {i} send receive" for i in range(6)), encoding="utf-8")
+    (docs / "pydantic" / "models.md").write_text("BaseModel fields send receive", encoding="utf-8")
+    monkeypatch.setattr(settings, "DOCUMENTS_PATH", str(docs))
+    monkeypatch.setattr(settings, "VECTOR_DB_PATH", str(tmp_path / "vdb"))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 40)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 5)
+    monkeypatch.setattr(settings, "RAG_PARTITION_MIN_CHUNKS", 2)
+    monkeypatch.setattr(settings, "RAG_MERGE_ADJACENT", False)
+
+    rag = RAGService(_HashEmbedder(), top_k=3)
+    routed, fallback = rag.search_many(["send receive", "send receive"], partitions=["websocket", "database"])
+
+    assert "pydantic/models.md" in {r.source for r in rag.records}
+    assert set(rag.partitions) == {"websocket"}
+    assert {h["partition"] for h in routed} == {"websocket"}
+    assert all(h["tags"]["topic"] == "websocket" for h in routed)
+    assert {h["partition"] for h in fallback} == {"global"}
@@ -0,0 +1,42 @@
+import time
+
+from app.services.reranker import CrossEncoderReranker
+
+
+class _OverlapModel:
+    """Sorgu kelimelerinin chunk'ta geçme oranını skor olarak döner."""
+
+    def __init__(self, delay_s=0.0):
+        self.pairs = 0
+        self.delay_s = delay_s
+
+    def predict(self, pairs, show_progress_bar=False):
+        self.pairs += len(pairs)
+        time.sleep(self.delay_s)
+        return [sum(w in c for w in q.split()) / len(q.split()) for q, c in pairs]
+
+
+HITS = [
+    {"file": "a.md", "ordinal": i, "chunk": text, "rank": i + 1}
+    for i, text in enumerate(["unrelated text", "depends injects", "depends injects a dependency", "other"])
+]
+
+
+def test_rerank_orders_by_cross_encoder_and_caches_pairs():
+    model = _OverlapModel()
+    reranker = CrossEncoderReranker(model=model, batch_size=2)
+
+    out = reranker.rerank("depends injects dependency", HITS, k=2)
+    assert [h["ordinal"] for h in out] == [2, 1]
+    assert [h["rank"] for h in out] == [1, 2]
+    assert model.pairs == 4
+
+    reranker.rerank("depends injects dependency", HITS, k=2)
+    assert model.pairs == 4
+
+
+def test_latency_cap_falls_back_to_ann_order():
+    reranker = CrossEncoderReranker(model=_OverlapModel(delay_s=0.05), batch_size=1, max_latency_s=0.01)
+    out = reranker.rerank("depends injects dependency", HITS, k=2)
+    assert [h["ordinal"] for h in out] == [0, 1]
+    assert "rerank_score" not in out[0]
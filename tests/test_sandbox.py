@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.sandbox import SandboxPool
+
+APP = """
+from fastapi import FastAPI
+
+app = FastAPI()
+
+@app.get("/items/{item_id}")
+def read_item(item_id: int):
+    return {"item_id": item_id}
+"""
+
+
+@pytest.fixture
+def pool():
+    p = SandboxPool(size=1, timeout_s=20, cpu_seconds=1, memory_mb=64)
+    p.start()
+    yield p
+    p.shutdown()
+
+
+def _run(pool, code):
+    return asyncio.run(pool.smoke_test(code))
+
+
+def _wait_refilled(pool, timeout=20.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        with pool._lock:
+            if len(pool._idle) == pool.size and pool._pending == 0:
+                return all(w.process.is_alive() for w in pool._idle)
+        time.sleep(0.05)
+    return False
+
+
+def test_app_routes_are_exercised_and_pool_refills(pool):
+    result = _run(pool, APP)
+
+    assert result["ok"] and result["stage"] == "routes"
+    assert [(r["path"], r["status"]) for r in result["routes"]] == [("/items/{item_id}", 200)]
+    assert _wait_refilled(pool)
+
+
+def test_import_error_is_reported(pool):
+    result = _run(pool, "raise RuntimeError('boom')")
+
+    assert not result["ok"]
+    assert result["stage"] == "import" and "RuntimeError: boom" in result["error"]
+    assert _wait_refilled(pool)
+
+
+def test_cpu_limit_kills_worker(pool):
+    result = _run(pool, "while True:\n    pass")
+
+    assert result["stage"] == "crashed"
+    assert _wait_refilled(pool)
+
+
+def test_memory_limit_stops_allocation(pool):
+    result = _run(pool, "blob = bytearray(1024 * 1024 * 1024)")
+
+    assert not result["ok"]
+    assert result["stage"] == "crashed" or "MemoryError" in result["error"]
+    assert _wait_refilled(pool)
+
+
+def test_wall_clock_timeout_and_next_run_succeeds(pool):
+    pool.timeout_s = 0.5
+    result = _run(pool, "import time\ntime.sleep(30)")
+    assert result["stage"] == "timeout"
+
+    assert _wait_refilled(pool)
+    pool.timeout_s = 20
+    assert _run(pool, APP)["ok"]
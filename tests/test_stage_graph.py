@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import pytest
+
+from app.orchestrator.graph import Stage, StageContext, StageGraph
+
+
+def _sleeper(name, delay, log):
+    async def run(ctx):
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        return name
+    return run
+
+
+@pytest.mark.asyncio
+async def test_ready_stages_run_concurrently():
+    log = []
+    graph = StageGraph([
+        Stage("a", _sleeper("a", 0.1, log)),
+        Stage("b", _sleeper("b", 0.1, log)),
+        Stage("c", _sleeper("c", 0.1, log), after=("a", "b")),
+    ])
+
+    t0 = time.perf_counter()
+    ctx = await graph.run(StageContext())
+    elapsed = time.perf_counter() - t0
+
+    assert ctx.results == {"a": "a", "b": "b", "c": "c"}
+    assert log.index(("start", "c")) == 2
+    assert elapsed < 0.28  # sıralı olsaydı ~0.3s
+    assert graph.summary(ctx)["critical_path_ms"] >= 190
+
+
+@pytest.mark.asyncio
+async def test_unconsumed_speculative_stage_is_cancelled():
+    log = []
+    graph = StageGraph([
+        Stage("main", _sleeper("main", 0.01, log)),
+        Stage("spec", _sleeper("spec", 5, log), speculative=True),
+    ])
+    ctx = await graph.run(StageContext())
+    assert ctx["main"] == "main"
+    assert ctx.trace["spec"]["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_consumer_can_discard_speculative_result():
+    async def consumer(ctx):
+        ctx.discard("spec")
+        return "refined"
+
+    graph = StageGraph([
+        Stage("spec", _sleeper("spec", 0.01, []), speculative=True),
+        Stage("consumer", consumer, after=("spec",)),
+    ])
+    ctx = await graph.run(StageContext())
+    assert ctx["consumer"] == "refined"
+    assert ctx.trace["spec"]["status"] == "discarded"
+
+
+def test_cycles_and_unknown_deps_are_rejected():
+    noop = _sleeper("x", 0, [])
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", noop, after=("b",)), Stage("b", noop, after=("a",))])
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", noop, after=("missing",))])
+
+
+@pytest.mark.asyncio
+async def test_stage_over_budget_uses_fallback():
+    from app.orchestrator.deadline import Deadline
+
+    graph = StageGraph([
+        Stage("query_analyzer", _sleeper("query_analyzer", 5, []), fallback=lambda ctx: "heuristic"),
+    ])
+    ctx = await graph.run(StageContext(deadline=Deadline(0.3)))
+    assert ctx["query_analyzer"] == "heuristic"
+    assert ctx.timed_out() == ["query_analyzer"]
+
+
+@pytest.mark.asyncio
+async def test_provided_results_skip_their_stages():
+    log = []
+    graph = StageGraph([
+        Stage("a", _sleeper("a", 0.01, log)),
+        Stage("b", _sleeper("b", 0.01, log), after=("a",)),
+    ])
+    ctx = StageContext()
+    ctx.results["a"] = "shared"
+    await graph.run(ctx)
+    assert log == [("start", "b")]
+    assert ctx["a"] == "shared" and ctx.trace["a"]["status"] == "provided"
+
+
+@pytest.mark.asyncio
+async def test_memoized_stage_runs_once_per_key():
+    from app.orchestrator.memo import MemoPolicy, StageMemo
+
+    log = []
+    graph = StageGraph(
+        [Stage("a", _sleeper("a", 0.01, log), memo=MemoPolicy(key=lambda ctx: ctx.inputs["q"], ttl_s=60))],
+        memo=StageMemo(),
+    )
+    await graph.run(StageContext({"q": "x"}))
+    ctx = await graph.run(StageContext({"q": "x"}))
+    await graph.run(StageContext({"q": "y"}))
+
+    assert log.count(("start", "a")) == 2
+    assert ctx.trace["a"]["memo"] == "hit"
+    assert graph.memo.stats() == {"a": {"hits": 1, "misses": 2}}
+
+
+@pytest.mark.asyncio
+async def test_failed_speculative_stage_is_dropped_not_fatal():
+    async def broken(ctx):
+        raise RuntimeError("faiss exploded")
+
+    async def consumer(ctx):
+        return "refined" if ctx["spec"] is None else "reused"
+
+    graph = StageGraph([
+        Stage("spec", broken, speculative=True),
+        Stage("consumer", consumer, after=("spec",)),
+    ])
+    ctx = await graph.run(StageContext())
+
+    assert ctx["consumer"] == "refined"
+    assert ctx.trace["spec"]["status"] == "failed"
+    assert "faiss exploded" in ctx.trace["spec"]["error"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("with_deadline", [False, True])
+async def test_stage_error_uses_fallback_with_or_without_deadline(with_deadline):
+    from app.orchestrator.deadline import Deadline
+
+    async def broken(ctx):
+        raise ValueError("bad llm output")
+
+    graph = StageGraph([Stage("a", broken, fallback=lambda ctx: "fallback")])
+    ctx = await graph.run(StageContext(deadline=Deadline(5.0) if with_deadline else None))
+
+    assert ctx["a"] == "fallback"
+    assert ctx.trace["a"]["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_stage_error_without_fallback_still_raises():
+    async def broken(ctx):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await StageGraph([Stage("a", broken)]).run(StageContext())
@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.tool_executor import ToolExecutor
+
+
+def _square(x):
+    return {"value": x * x}
+
+
+def _spin(_):
+    while True:
+        pass
+
+
+def _sleep(seconds):
+    import time
+
+    time.sleep(seconds)
+    return {"value": "late"}
+
+
+def _crash(_):
+    os._exit(1)
+
+
+def _fallback(reason):
+    return {"skipped_reason": reason}
+
+
+@pytest.fixture
+def executor_factory():
+    created = []
+
+    def make(**kw):
+        ex = ToolExecutor(max_workers=1, **kw)
+        created.append(ex)
+        return ex
+
+    yield make
+    for ex in created:
+        ex.shutdown()
+
+
+def test_wall_clock_timeout_returns_fallback(executor_factory):
+    ex = executor_factory(timeout_s=0.5, cpu_seconds=30)
+    assert asyncio.run(ex.run(_sleep, 5, fallback=_fallback)) == {"skipped_reason": "timeout"}
+
+
+def test_cpu_limit_kills_runaway_call_and_worker_is_reused(executor_factory):
+    ex = executor_factory(timeout_s=30, cpu_seconds=0.5)
+
+    async def go():
+        killed = await ex.run(_spin, None, fallback=_fallback)
+        after = await ex.run(_square, 3, fallback=_fallback)
+        return killed, after
+
+    killed, after = asyncio.run(go())
+    assert killed == {"skipped_reason": "cpu_limit"}
+    assert after == {"value": 9}
+
+
+def test_broken_pool_is_reset_and_next_call_succeeds(executor_factory):
+    ex = executor_factory(timeout_s=30, cpu_seconds=30)
+
+    async def go():
+        crashed = await ex.run(_crash, None, fallback=_fallback)
+        broken_pool = ex._pool
+        after = await ex.run(_square, 4, fallback=_fallback)
+        return crashed, broken_pool, after
+
+    crashed, broken_pool, after = asyncio.run(go())
+    assert crashed == {"skipped_reason": "worker_crashed"}
+    assert broken_pool is None
+    assert after == {"value": 16}